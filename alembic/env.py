@@ -8,7 +8,7 @@ from sqlalchemy import pool
 from alembic import context
 
 from app.config import settings
-from database.connection import Base
+from database.connection import Base, sync_database_url
 from database.models import *  # noqa: F401, F403
 
 # this is the Alembic Config object, which provides
@@ -30,7 +30,7 @@ target_metadata = Base.metadata
 
 # other values from the config, defined by the [alembic] section
 # and/or those to be acquired from the database itself
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+config.set_main_option("sqlalchemy.url", sync_database_url(settings.DATABASE_URL))
 
 
 def run_migrations_offline() -> None:
@@ -65,7 +65,7 @@ def run_migrations_online() -> None:
 
     """
     configuration = config.get_section(config.config_ini_section)
-    configuration["sqlalchemy.url"] = settings.DATABASE_URL
+    configuration["sqlalchemy.url"] = sync_database_url(settings.DATABASE_URL)
     connectable = engine_from_config(
         configuration,
         prefix="sqlalchemy.",
@@ -0,0 +1,32 @@
+"""Composite index for keyset pagination of conversation lists"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_conversation_listing_index'
+down_revision = '001_initial_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add (user_id, is_archived, is_pinned DESC, updated_at DESC, id DESC)"""
+    # CONCURRENTLY avoids blocking writes on large tables; it cannot run in a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_conversations_user_listing',
+            'conversations',
+            ['user_id', 'is_archived', sa.text('is_pinned DESC'), sa.text('updated_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the listing index"""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_conversations_user_listing',
+            table_name='conversations',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,31 @@
+"""Composite index for windowed reads of a conversation's messages"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003_message_window_index'
+down_revision = '002_conversation_listing_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add (conversation_id, created_at, id)"""
+    # CONCURRENTLY avoids blocking message inserts; it cannot run in a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_conversation_window',
+            'messages',
+            ['conversation_id', 'created_at', 'id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the window index"""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_messages_conversation_window',
+            table_name='messages',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,23 @@
+"""Track which messages are covered by the rolling conversation summary"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '004_conversation_summary_cursor'
+down_revision = '003_message_window_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add summary_through_at / summary_through_id to conversations"""
+    op.add_column('conversations', sa.Column('summary_through_at', sa.DateTime(), nullable=True))
+    op.add_column('conversations', sa.Column('summary_through_id', postgresql.UUID(as_uuid=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the summary cursor columns"""
+    op.drop_column('conversations', 'summary_through_id')
+    op.drop_column('conversations', 'summary_through_at')
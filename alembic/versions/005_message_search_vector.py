@@ -0,0 +1,44 @@
+"""Full-text search over message content"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '005_message_search_vector'
+down_revision = '004_conversation_summary_cursor'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add a generated tsvector column on messages.content and its GIN index"""
+    # Adding a stored generated column rewrites the table; run in a maintenance window on large installs
+    op.add_column(
+        'messages',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english'::regconfig, content)", persisted=True),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_search_vector',
+            'messages',
+            ['search_vector'],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the search index and column"""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_messages_search_vector',
+            table_name='messages',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('messages', 'search_vector')
@@ -0,0 +1,34 @@
+"""Indexed public prefix for API key lookup"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_api_key_prefix'
+down_revision = '005_message_search_vector'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add api_keys.prefix with a unique index"""
+    op.add_column('api_keys', sa.Column('prefix', sa.String(length=16), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_api_keys_prefix',
+            'api_keys',
+            ['prefix'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the prefix column and its index"""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_api_keys_prefix',
+            table_name='api_keys',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('api_keys', 'prefix')
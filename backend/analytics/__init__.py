@@ -0,0 +1,126 @@
+"""Analytics events: session logs and per-conversation usage
+
+Handlers call `log_session()` / `log_conversation_activity()`, which only
+queue the event; the process-wide EventBuffer writes them in batches.
+"""
+
+import secrets
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from analytics.buffer import EventBuffer
+from app.config import settings
+from database import ConversationMetadata, SessionLog
+
+_buffer: Optional[EventBuffer] = None
+
+async def write_session_logs(db: AsyncSession, rows: List[Dict[str, Any]]):
+    """Append session rows with one multi-row INSERT"""
+    await db.execute(insert(SessionLog.__table__), rows)
+
+async def write_conversation_activity(db: AsyncSession, rows: List[Dict[str, Any]]):
+    """Add the batch's seconds to each conversation's session_duration_seconds (upserting its metadata row)"""
+    totals: Dict[UUID, float] = defaultdict(float)
+    for row in rows:
+        totals[row["conversation_id"]] += row["seconds"]
+
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    table = ConversationMetadata.__table__
+    stmt = dialect.insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.conversation_id],
+        set_={
+            "session_duration_seconds": func.coalesce(table.c.session_duration_seconds, 0)
+            + stmt.excluded.session_duration_seconds,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    now = datetime.utcnow()
+    # One row per conversation: an upsert may not touch the same row twice
+    await db.execute(stmt, [
+        {
+            "id": uuid4(),
+            "conversation_id": conversation_id,
+            "tags": [],
+            "custom_data": {},
+            "session_duration_seconds": round(seconds),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for conversation_id, seconds in totals.items()
+    ])
+
+WRITERS = {
+    "session_log": write_session_logs,
+    "conversation_activity": write_conversation_activity,
+}
+
+def get_event_buffer() -> Optional[EventBuffer]:
+    """The process-wide event buffer, or None when analytics are disabled"""
+    global _buffer
+    if _buffer is None and settings.ANALYTICS_ENABLED:
+        _buffer = EventBuffer(
+            WRITERS,
+            batch_size=settings.ANALYTICS_BATCH_SIZE,
+            max_delay=settings.ANALYTICS_FLUSH_INTERVAL_MS / 1000,
+            max_queue=settings.ANALYTICS_QUEUE_SIZE,
+            spill_dir=settings.ANALYTICS_SPILL_DIR or None,
+        )
+    return _buffer
+
+def set_event_buffer(buffer: Optional[EventBuffer]):
+    """Replace the process-wide buffer (tests and benchmarks)"""
+    global _buffer
+    _buffer = buffer
+
+def start_analytics():
+    """Start background event writes (called from the app lifespan)"""
+    buffer = get_event_buffer()
+    if buffer is not None:
+        buffer.start()
+
+async def close_analytics():
+    """Drain queued events"""
+    global _buffer
+    if _buffer is not None:
+        await _buffer.stop()
+        _buffer = None
+
+def log_session(user_id: UUID, ip_address: Optional[str], user_agent: Optional[str]):
+    """Record a new login session"""
+    buffer = get_event_buffer()
+    if buffer is None:
+        return
+    now = datetime.utcnow()
+    buffer.submit("session_log", {
+        "id": uuid4(),
+        "user_id": user_id,
+        "session_token": secrets.token_hex(32),
+        "ip_address": ip_address[:45] if ip_address else None,
+        "user_agent": user_agent[:500] if user_agent else None,
+        "started_at": now,
+        "ended_at": None,
+        "created_at": now,
+    })
+
+def log_conversation_activity(conversation_id: UUID, seconds: float):
+    """Add time spent on an exchange to the conversation's session duration"""
+    buffer = get_event_buffer()
+    if buffer is not None:
+        buffer.submit("conversation_activity", {"conversation_id": conversation_id, "seconds": seconds})
+
+__all__ = [
+    "EventBuffer",
+    "close_analytics",
+    "get_event_buffer",
+    "log_conversation_activity",
+    "log_session",
+    "set_event_buffer",
+    "start_analytics",
+]
@@ -0,0 +1,230 @@
+"""Buffered, batched writes of analytics events
+
+Request handlers `submit()` events, which only appends to an in-memory
+queue. A background task writes the queue every `max_delay` seconds, or as
+soon as `batch_size` events are waiting, with one statement per event kind
+(a multi-row INSERT ... VALUES for append-only tables). On shutdown
+`stop()` drains whatever is queued.
+
+When the queue is full (the database is slow or down) new events are
+spilled to JSON-lines files in `spill_dir` if one is configured, and
+dropped otherwise. Spilled events are loaded back by the next `start()`.
+
+Each kind is written in its own transaction. A write that fails because the
+database is unreachable is spilled (or dropped) like an overflow, to retry
+later. One that the database rejects (a constraint or data error, such as
+activity for a since-deleted conversation) would fail again on every retry,
+so the batch is bisected and only the offending rows are dropped and
+counted as `rejected`; the rest of the batch is written.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Writes one batch of rows of a kind, inside a session the buffer commits
+Writer = Callable[[AsyncSession, List[Dict[str, Any]]], Awaitable[None]]
+
+# Rows the database refuses; retrying them can never succeed
+REJECTED_ROW_ERRORS = (exc.IntegrityError, exc.DataError)
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a write failed because the database could not be reached (worth retrying later)"""
+    if isinstance(error, exc.DBAPIError):
+        return error.connection_invalidated or isinstance(error, (exc.OperationalError, exc.InterfaceError))
+    return isinstance(error, (exc.TimeoutError, OSError, asyncio.TimeoutError))
+
+def _encode(value):
+    if isinstance(value, UUID):
+        return {"$uuid": str(value)}
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"Cannot spill {type(value).__name__}")
+
+def _decode(value: dict):
+    if "$uuid" in value:
+        return UUID(value["$uuid"])
+    if "$datetime" in value:
+        return datetime.fromisoformat(value["$datetime"])
+    return value
+
+class EventBuffer:
+    """Queues events in memory and writes them to the database in batches"""
+
+    def __init__(
+        self,
+        writers: Dict[str, Writer],
+        session_factory=SessionLocal,
+        batch_size: int = 500,
+        max_delay: float = 0.25,
+        max_queue: int = 50000,
+        spill_dir: Optional[str] = None,
+    ):
+        self.writers = writers
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.spill_dir = spill_dir
+        self._pending: Deque[Tuple[str, Dict[str, Any]]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+        self.rejected = 0
+        self.flushes = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, kind: str, row: Dict[str, Any]) -> bool:
+        """Queue one event (False if it was spilled or dropped instead)"""
+        if len(self._pending) >= self.max_queue:
+            self._overflow([(kind, row)])
+            return False
+        self._pending.append((kind, row))
+        self.submitted += 1
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _overflow(self, events: List[Tuple[str, Dict[str, Any]]]):
+        """Spill events to disk, or drop them when spilling is off or fails"""
+        if self.spill_dir:
+            try:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                path = os.path.join(self.spill_dir, f"events-{os.getpid()}.jsonl")
+                with open(path, "a") as f:
+                    for kind, row in events:
+                        f.write(json.dumps({"kind": kind, "row": row}, default=_encode) + "\n")
+                self.spilled += len(events)
+                return
+            except (OSError, TypeError):
+                logger.exception("Spilling %d analytics events failed", len(events))
+        self.dropped += len(events)
+
+    def _load_spilled(self):
+        """Queue events spilled by earlier processes, then remove their files"""
+        if not self.spill_dir or not os.path.isdir(self.spill_dir):
+            return
+        for name in sorted(os.listdir(self.spill_dir)):
+            if not name.endswith(".jsonl"):
+                continue
+            # Claim the file first so a concurrently starting worker cannot load it too
+            path = os.path.join(self.spill_dir, name)
+            claimed = f"{path}.{uuid4().hex}.loading"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(claimed) as f:
+                for line in f:
+                    try:
+                        event = json.loads(line, object_hook=_decode)
+                    except ValueError:  # Truncated by a crash mid-write
+                        self.dropped += 1
+                        continue
+                    if event["kind"] in self.writers:
+                        self.submit(event["kind"], event["row"])
+                    else:
+                        self.rejected += 1
+            os.remove(claimed)
+
+    def start(self):
+        """Reload spilled events and start the background flush task on the running loop"""
+        if self._task is None:
+            self._load_spilled()
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.max_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.drain()
+        # Events submitted while the last batch was being written, or before the task first ran
+        await self.drain()
+
+    async def drain(self):
+        """Write everything queued so far"""
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        by_kind: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for kind, row in batch:
+            by_kind[kind].append(row)
+        for kind, rows in by_kind.items():
+            await self._write_kind(kind, rows)
+        self.flushes += 1
+
+    async def _write_kind(self, kind: str, rows: List[Dict[str, Any]]):
+        try:
+            async with self.session_factory() as db:
+                await self.writers[kind](db, rows)
+                await db.commit()
+            self.written += len(rows)
+        except REJECTED_ROW_ERRORS as error:
+            if len(rows) > 1:
+                middle = len(rows) // 2
+                await self._write_kind(kind, rows[:middle])
+                await self._write_kind(kind, rows[middle:])
+                return
+            self.rejected += 1
+            logger.warning("Dropping a %s event the database rejected: %s", kind, error.orig or error)
+        except Exception as error:
+            self.failed += len(rows)
+            if _is_transient(error):
+                logger.warning("Writing %d %s events failed, keeping them for later: %s", len(rows), kind, error)
+                self._overflow([(kind, row) for row in rows])
+            else:
+                self.rejected += len(rows)
+                logger.exception("Dropping %d %s events that cannot be written", len(rows), kind)
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop the background task, giving queued events `timeout` seconds to drain"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                logger.warning("%d analytics events still queued at shutdown", len(self._pending))
+                self._overflow(list(self._pending))
+                self._pending.clear()
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+        }
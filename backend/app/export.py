@@ -0,0 +1,147 @@
+"""Streaming conversation exporters (NDJSON, JSON, Markdown, gzip, zip)
+
+Every encoder is an async generator of bytes that consumes message rows as
+they stream from the database, so memory use stays flat no matter how long
+the conversation is. Small writes are coalesced into ~64 KiB chunks.
+"""
+
+import io
+import json
+import zipfile
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict
+
+from sqlalchemy.engine import Row
+
+from database import SessionLocal
+from database.conversations import stream_conversation_messages, stream_user_conversations
+
+CHUNK_SIZE = 64 * 1024
+
+FORMATS: Dict[str, tuple] = {
+    # format: (file extension, media type)
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "json": ("json", "application/json"),
+    "markdown": ("md", "text/markdown"),
+}
+
+def _conversation_dict(conversation: Row) -> dict:
+    return {
+        "id": str(conversation.id),
+        "title": conversation.title,
+        "created_at": conversation.created_at.isoformat(),
+        "updated_at": conversation.updated_at.isoformat(),
+        "message_count": conversation.message_count,
+    }
+
+def _message_dict(message: Row) -> dict:
+    return {
+        "id": str(message.id),
+        "role": message.role,
+        "content": message.content,
+        "token_count": message.token_count,
+        "created_at": message.created_at.isoformat(),
+    }
+
+async def _render_ndjson(conversation: Row, messages: AsyncIterator[Row]) -> AsyncIterator[str]:
+    yield json.dumps({"type": "conversation", **_conversation_dict(conversation)}) + "\n"
+    async for message in messages:
+        yield json.dumps({"type": "message", **_message_dict(message)}) + "\n"
+
+async def _render_json(conversation: Row, messages: AsyncIterator[Row]) -> AsyncIterator[str]:
+    yield '{"conversation": ' + json.dumps(_conversation_dict(conversation)) + ', "messages": ['
+    separator = ""
+    async for message in messages:
+        yield separator + json.dumps(_message_dict(message))
+        separator = ", "
+    yield "]}\n"
+
+async def _render_markdown(conversation: Row, messages: AsyncIterator[Row]) -> AsyncIterator[str]:
+    yield f"# {conversation.title or 'Untitled conversation'}\n\n"
+    yield f"_Exported {datetime.utcnow().isoformat(timespec='seconds')}Z_\n\n"
+    async for message in messages:
+        yield f"### {message.role.capitalize()} — {message.created_at.isoformat(timespec='seconds')}\n\n"
+        yield f"{message.content}\n\n"
+
+RENDERERS: Dict[str, Callable] = {
+    "ndjson": _render_ndjson,
+    "json": _render_json,
+    "markdown": _render_markdown,
+}
+
+async def _encode(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Encode text chunks to UTF-8, coalescing them into CHUNK_SIZE writes"""
+    buffer, size = [], 0
+    async for chunk in chunks:
+        data = chunk.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip a byte stream on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+async def export_conversation(conversation: Row, fmt: str) -> AsyncIterator[bytes]:
+    """Stream one conversation in the given format (opens its own session)"""
+    async with SessionLocal() as db:
+        messages = stream_conversation_messages(db, conversation.id)
+        async for chunk in _encode(RENDERERS[fmt](conversation, messages)):
+            yield chunk
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file that collects what zipfile writes"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+async def export_all_conversations(user_id, fmt: str) -> AsyncIterator[bytes]:
+    """
+    Stream a zip with one file per conversation. Entries are written with
+    data descriptors (the sink is unseekable), so nothing is buffered beyond
+    the chunk currently being compressed.
+    """
+    extension = FORMATS[fmt][0]
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+
+    async with SessionLocal() as db:
+        # A second session streams messages while the first holds the conversation cursor
+        async with SessionLocal() as message_db:
+            async for conversation in stream_user_conversations(db, user_id):
+                name = f"conversation-{conversation.id}.{extension}"
+                with archive.open(name, mode="w", force_zip64=True) as entry:
+                    messages = stream_conversation_messages(message_db, conversation.id)
+                    async for chunk in _encode(RENDERERS[fmt](conversation, messages)):
+                        entry.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                data = sink.drain()
+                if data:
+                    yield data
+
+    archive.close()
+    yield sink.drain()
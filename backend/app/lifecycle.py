@@ -0,0 +1,56 @@
+"""Worker lifecycle: warming up before traffic, draining streams at shutdown
+
+At startup `prewarm()` opens DB_POOL_PREWARM pooled connections, connects
+the shared cache, loads the lazily imported password hashing and JWT
+backends and the tiktoken encodings of TOKENIZER_PREWARM_MODELS (and of the
+fallback models), so a freshly started worker's first requests don't pay
+for them.
+
+At shutdown the server (app.server) stops accepting connections and gives
+in-flight requests SHUTDOWN_GRACE_SECONDS to finish before cancelling them.
+Chat streams can outlast that, so `stream_drain.begin()` sets a deadline a
+little before the cancellation: a stream still generating then ends with an
+`error` event asking the client to retry, instead of being cut off mid-event.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from app.config import settings
+from auth.security import load_backends
+from cache import get_cache
+from database.connection import warm_pool
+from llm.tokenizer import load_encodings
+
+# Streams stop this long before the server cancels them, to send their last event
+STREAM_DRAIN_MARGIN_SECONDS = 1.0
+
+class StreamDrain:
+    """Shutdown deadline checked by streaming responses between tokens"""
+
+    def __init__(self):
+        self.deadline: Optional[float] = None
+
+    def begin(self, grace: float):
+        """Start draining: streams still running after `grace` (less the margin) end early"""
+        if self.deadline is None:
+            self.deadline = time.monotonic() + max(0.0, grace - STREAM_DRAIN_MARGIN_SECONDS)
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def reset(self):
+        self.deadline = None
+
+stream_drain = StreamDrain()
+
+async def prewarm(connections: int) -> int:
+    """Warm this worker's pools and imports; returns the database connections opened"""
+    opened = await warm_pool(connections)
+    await get_cache().get("prewarm")
+    await asyncio.get_running_loop().run_in_executor(None, load_backends)
+    models = [*settings.TOKENIZER_PREWARM_MODELS, *settings.LLM_FALLBACK_MODELS.values()]
+    await asyncio.to_thread(load_encodings, models)
+    return opened
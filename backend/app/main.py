@@ -1,22 +1,70 @@
 """FastAPI Application Main Entry Point"""
 
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
 
+from analytics import close_analytics, start_analytics
 from app.config import settings
-from app.routes import auth, chat, conversations
-from database.connection import Base, engine
+from app.lifecycle import prewarm
+from app.routes import admin, auth, chat, conversations
+from auth.api_keys import last_used_recorder, revocation_listener
+from auth.cache import user_invalidation_listener
+from auth.password_pool import PasswordPoolSaturated, password_pool
+from cache import close_cache
+from llm import close_provider
+from llm.context import summary_refresher
+from memory import close_memory, start_memory
+from metrics import CONTENT_TYPE, render_metrics
+from metrics.exporter import metrics_server
+from metrics.middleware import MetricsMiddleware
+from ratelimit.middleware import RateLimitMiddleware
+from database.connection import engine
+from database.replicas import close_replicas, start_replicas
+from database.schema import prepare_schema
+from database.reconcile import run_periodically as reconcile_counters_periodically
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    # Create database tables if they don't exist
-    Base.metadata.create_all(bind=engine)
-    print("Database tables initialized")
+    await prepare_schema(engine, settings.SCHEMA_CHECK)
     print(f"Starting PersonalGPT API ({settings.ENVIRONMENT})")
+    
+    background_tasks = []
+    if settings.COUNTER_RECONCILE_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(
+            reconcile_counters_periodically(settings.COUNTER_RECONCILE_INTERVAL_SECONDS)
+        ))
+    start_memory()
+    revocation_listener.start()
+    user_invalidation_listener.start()
+    last_used_recorder.start()
+    start_analytics()
+    start_replicas()
+    if settings.METRICS_ENABLED and settings.METRICS_PORT > 0:
+        await metrics_server.start(settings.HOST, settings.METRICS_PORT, max(1, settings.WEB_CONCURRENCY))
+    if settings.STARTUP_PREWARM:
+        await prewarm(settings.DB_POOL_PREWARM)
     yield
     # Shutdown
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await summary_refresher.shutdown()
+    await revocation_listener.stop()
+    await user_invalidation_listener.stop()
+    await last_used_recorder.stop()
+    await close_analytics()
+    await close_replicas()
+    await close_memory()
+    password_pool.shutdown()
+    await close_cache()
+    await close_provider()
+    await metrics_server.stop()
+    await engine.dispose()
     print("Shutting down PersonalGPT API")
 
 app = FastAPI(
@@ -26,6 +74,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# API key authentication and rate limits (inside CORS, so rejections still carry CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -35,17 +86,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency covers every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(PasswordPoolSaturated)
+async def password_pool_saturated_handler(request: Request, exc: PasswordPoolSaturated):
+    """Shed load when the password hashing pool is full"""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many authentication requests, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 # Routes
 app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
 app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
 app.include_router(conversations.router, prefix="/api/conversations", tags=["Conversations"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "ok", "version": "0.1.0"}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus scrape endpoint (this worker's metrics; with several workers scrape METRICS_PORT instead)"""
+        return Response(render_metrics(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
+    # Development server; production runs `python -m app.server`
     import uvicorn
     uvicorn.run(
         "app.main:app",
@@ -1,5 +1,5 @@
 """Routes package initialization"""
 
-from app.routes import auth, chat, conversations
+from app.routes import admin, auth, chat, conversations
 
-__all__ = ["auth", "chat", "conversations"]
+__all__ = ["admin", "auth", "chat", "conversations"]
@@ -0,0 +1,22 @@
+"""Operational endpoints, guarded by ADMIN_TOKEN"""
+
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from auth.dependencies import require_admin
+from database import pool_status
+from database.replicas import get_replicas
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/db-pool")
+async def db_pool() -> Dict[str, Any]:
+    """Connection pool state of the worker serving the request (checked out, overflow, checkout wait)"""
+    return pool_status()
+
+@router.get("/replicas")
+async def replicas() -> Dict[str, Any]:
+    """Read replica health, lag and routed reads as seen by this worker"""
+    replica_set = get_replicas()
+    return replica_set.stats() if replica_set is not None else {"fallbacks": 0, "replicas": []}
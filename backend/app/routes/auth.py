@@ -1,13 +1,15 @@
 """Updated authentication routes with full implementation"""
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from uuid import uuid4
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from uuid import UUID, uuid4
 
-from database import User, UserSettings, get_db
+from analytics import log_session
+from database import APIKey, User, UserSettings, get_db
 from auth.security import (
-    hash_password,
-    verify_password,
     create_access_token,
     create_refresh_token,
     verify_refresh_token,
@@ -23,17 +25,27 @@ from auth.schemas import (
     CurrentUser,
     UserSettingsResponse,
     UserSettingsUpdate,
+    APIKeyCreate,
+    APIKeyCreated,
+    APIKeyResponse,
 )
-from auth.dependencies import get_current_user
+from auth.api_keys import generate_api_key, revoke_api_key
+from auth.cache import invalidate_user, load_user_settings, store_user_settings
+from auth.dependencies import get_current_user, get_read_db
+from auth.password_pool import hash_password_async, verify_password_async
 
 router = APIRouter()
 
+def _log_session(user_id: UUID, http_request: Request):
+    client = http_request.client
+    log_session(user_id, client.host if client else None, http_request.headers.get("user-agent"))
+
 @router.post("/register", response_model=RegisterResponse)
-async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, http_request: Request, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     
     # Check if email already exists
-    existing_email = db.query(User).filter(User.email == request.email).first()
+    existing_email = await db.scalar(select(User.id).where(User.email == request.email))
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -41,7 +53,7 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
         )
     
     # Check if username already exists
-    existing_username = db.query(User).filter(User.username == request.username).first()
+    existing_username = await db.scalar(select(User.id).where(User.username == request.username))
     if existing_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,22 +67,23 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
         email=request.email,
         username=request.username,
         full_name=request.full_name,
-        password_hash=hash_password(request.password),
+        password_hash=await hash_password_async(request.password),
     )
     db.add(user)
-    db.flush()  # Ensure user is created before creating settings
+    await db.flush()  # Ensure user is created before creating settings
     
     # Create default user settings
     user_settings = UserSettings(
         user_id=user_id,
     )
     db.add(user_settings)
-    db.commit()
-    db.refresh(user)
+    db.info["user_id"] = user_id  # Read-your-writes for the new account
+    await db.commit()
     
     # Generate tokens
     access_token = create_access_token(str(user_id))
     refresh_token = create_refresh_token(str(user_id))
+    _log_session(user_id, http_request)
     
     return RegisterResponse(
         user=UserResponse.from_orm(user),
@@ -79,13 +92,13 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=LoginResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, http_request: Request, db: AsyncSession = Depends(get_db)):
     """User login"""
     
     # Find user by email
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await db.scalar(select(User).where(User.email == request.email))
     
-    if not user or not verify_password(request.password, user.password_hash):
+    if not user or not await verify_password_async(request.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -100,6 +113,7 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
     # Generate tokens
     access_token = create_access_token(str(user.id))
     refresh_token = create_refresh_token(str(user.id))
+    _log_session(user.id, http_request)
     
     return LoginResponse(
         access_token=access_token,
@@ -108,20 +122,24 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
     )
 
 @router.post("/refresh", response_model=RefreshTokenResponse)
-async def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+async def refresh_token(request: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
     """Refresh access token using refresh token"""
     
     # Verify refresh token
-    user_id = verify_refresh_token(request.refresh_token)
+    subject = verify_refresh_token(request.refresh_token)
+    try:
+        user_id = UUID(subject) if subject else None
+    except ValueError:  # Signed, but not for a user id
+        user_id = None
     
-    if not user_id:
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token",
         )
     
     # Verify user still exists and is active
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if not user or not user.is_active:
         raise HTTPException(
@@ -137,19 +155,17 @@ async def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_
     )
 
 @router.get("/me", response_model=CurrentUser)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: CurrentUser = Depends(get_current_user)):
     """Get current user information"""
-    return CurrentUser.from_orm(current_user)
+    return current_user
 
 @router.get("/settings", response_model=UserSettingsResponse)
 async def get_user_settings(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get user settings"""
-    settings = db.query(UserSettings).filter(
-        UserSettings.user_id == current_user.id
-    ).first()
+    settings = await load_user_settings(db, current_user.id)
     
     if not settings:
         raise HTTPException(
@@ -157,18 +173,18 @@ async def get_user_settings(
             detail="User settings not found",
         )
     
-    return UserSettingsResponse.from_orm(settings)
+    return settings
 
 @router.put("/settings", response_model=UserSettingsResponse)
 async def update_user_settings(
     request: UserSettingsUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user settings"""
-    settings = db.query(UserSettings).filter(
-        UserSettings.user_id == current_user.id
-    ).first()
+    settings = await db.scalar(
+        select(UserSettings).where(UserSettings.user_id == current_user.id)
+    )
     
     if not settings:
         raise HTTPException(
@@ -181,12 +197,74 @@ async def update_user_settings(
     for field, value in update_data.items():
         setattr(settings, field, value)
     
-    db.commit()
-    db.refresh(settings)
+    await db.commit()
+    
+    # New generation first, so loads that read the old row cannot overwrite the write-through
+    response = UserSettingsResponse.model_validate(settings)
+    await invalidate_user(current_user.id)
+    await store_user_settings(response)
     
-    return UserSettingsResponse.from_orm(settings)
+    return response
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(current_user: CurrentUser = Depends(get_current_user)):
     """Logout user (client should discard tokens)"""
     return {"message": "Successfully logged out"}
+
+@router.post("/api-keys", response_model=APIKeyCreated)
+async def create_api_key(
+    request: APIKeyCreate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Issue an API key (the key is returned only in this response)"""
+    key, prefix, key_hash = generate_api_key()
+    api_key = APIKey(
+        id=uuid4(),
+        user_id=current_user.id,
+        name=request.name,
+        prefix=prefix,
+        key_hash=key_hash,
+        permissions={},
+        created_at=datetime.utcnow(),
+        expires_at=datetime.utcnow() + timedelta(days=request.expires_in_days) if request.expires_in_days else None,
+    )
+    db.add(api_key)
+    await db.commit()
+    
+    return APIKeyCreated(**APIKeyResponse.model_validate(api_key).model_dump(), key=key)
+
+@router.get("/api-keys", response_model=List[APIKeyResponse])
+async def list_api_keys(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """List the user's API keys"""
+    result = await db.scalars(
+        select(APIKey).where(APIKey.user_id == current_user.id).order_by(APIKey.created_at.desc())
+    )
+    return [APIKeyResponse.model_validate(api_key) for api_key in result]
+
+@router.delete("/api-keys/{key_id}", response_model=APIKeyResponse)
+async def revoke_key(
+    key_id: UUID,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Revoke an API key (effective immediately on every worker)"""
+    api_key = await db.scalar(
+        select(APIKey).where(APIKey.id == key_id, APIKey.user_id == current_user.id)
+    )
+    
+    if not api_key:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="API key not found",
+        )
+    
+    api_key.is_active = False
+    await db.commit()
+    if api_key.prefix:
+        await revoke_api_key(api_key.prefix)
+    
+    return APIKeyResponse.model_validate(api_key)
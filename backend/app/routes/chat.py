@@ -1,8 +1,31 @@
 """Chat routes"""
 
-from fastapi import APIRouter, Depends
+import json
+import time
+from typing import AsyncIterator, List, Optional
+from uuid import UUID, uuid4
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from analytics import log_conversation_activity
+from app.config import settings
+from app.lifecycle import stream_drain
+from auth.cache import load_user_settings
+from auth.dependencies import get_current_user
+from auth.schemas import CurrentUser, UserSettingsResponse
+from database import Conversation, Message, SessionLocal, get_db
+from database.messages import add_message, add_messages
+from llm import LLMProvider, PromptMessages, ProviderError, get_provider
+from llm.context import AssembledContext, assemble_context, summary_refresher
+from llm.response_cache import CacheLookup, get_response_cache
+from llm.tokenizer import count_tokens
+from memory import get_memory, recall
+from metrics import SSE_STREAMS_ACTIVE, SSE_STREAMS_INTERRUPTED
 
 router = APIRouter()
 
@@ -20,17 +43,269 @@ class ChatResponse(BaseModel):
     timestamp: str
 
 @router.post("/message", response_model=ChatResponse)
-async def send_message(request: ChatRequest):
+async def send_message(
+    request: ChatRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    provider: LLMProvider = Depends(get_provider),
+):
     """Send a message and get AI response"""
-    # TODO: Implement message handling with LangChain
-    return {
-        "message": "AI response placeholder",
-        "conversation_id": request.conversation_id or "new",
-        "timestamp": "2026-02-19T00:00:00Z"
-    }
+    started = time.monotonic()
+    user_settings = await load_user_settings(db, current_user.id)
+    conversation = await _get_or_create_conversation(db, request.conversation_id, current_user.id, user_settings)
+    context = await _assemble_context(db, conversation, request.message, current_user.id, user_settings)
+    cache_lookup = await _lookup_cached_reply(conversation, context, request.message, current_user.id, user_settings)
+    await db.commit()  # Release the connection while the model runs
+    
+    try:
+        if cache_lookup is not None and cache_lookup.hit is not None:
+            answer = cache_lookup.hit.answer
+        else:
+            completion = await provider.complete(
+                context.prompt,
+                conversation.model_used,
+                conversation.temperature,
+                _max_tokens(user_settings),
+                hedge=True,
+            )
+            answer = completion.content
+    except ProviderError as exc:
+        # Keep the user's message even though the model failed
+        sent = await add_message(
+            db, conversation.id, "user", request.message, count_tokens(request.message, conversation.model_used)
+        )
+        await db.commit()
+        _remember(current_user.id, sent)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Model provider unavailable: {exc}",
+        )
+    
+    sent, reply = await add_messages(db, conversation.id, [
+        ("user", request.message, count_tokens(request.message, conversation.model_used)),
+        ("assistant", answer, count_tokens(answer, conversation.model_used)),
+    ])
+    await db.commit()
+    _remember(current_user.id, sent, reply)
+    if cache_lookup is not None:
+        await get_response_cache().store(cache_lookup, answer, reply.token_count)
+    if context.needs_summary:
+        summary_refresher.schedule(conversation.id, provider)
+    log_conversation_activity(conversation.id, time.monotonic() - started)
+    
+    return ChatResponse(
+        message=answer,
+        conversation_id=str(conversation.id),
+        timestamp=reply.created_at.isoformat() + "Z",
+    )
 
 @router.get("/stream")
-async def stream_message(conversation_id: str, message: str):
+async def stream_message(
+    message: str,
+    conversation_id: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    provider: LLMProvider = Depends(get_provider),
+):
     """Stream AI response (Server-Sent Events)"""
-    # TODO: Implement SSE streaming with LangChain
-    return {"status": "streaming"}
+    user_settings = await load_user_settings(db, current_user.id)
+    conversation = await _get_or_create_conversation(db, conversation_id, current_user.id, user_settings)
+    context = await _assemble_context(db, conversation, message, current_user.id, user_settings)
+    cache_lookup = await _lookup_cached_reply(conversation, context, message, current_user.id, user_settings)
+    
+    # Persist the user's message before generation starts
+    sent = await add_message(db, conversation.id, "user", message, count_tokens(message, conversation.model_used))
+    await db.commit()
+    _remember(current_user.id, sent)
+    
+    return StreamingResponse(
+        stream_reply(
+            provider,
+            context.prompt,
+            conversation.id,
+            conversation.model_used,
+            conversation.temperature,
+            _max_tokens(user_settings),
+            refresh_summary=context.needs_summary,
+            user_id=current_user.id,
+            cache_lookup=cache_lookup,
+        ),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering so tokens flush immediately
+        },
+    )
+
+async def stream_reply(
+    provider: LLMProvider,
+    prompt: PromptMessages,
+    conversation_id: UUID,
+    model: str,
+    temperature: float = 0.7,
+    max_tokens: int = 2000,
+    refresh_summary: bool = False,
+    user_id: Optional[UUID] = None,
+    cache_lookup: Optional[CacheLookup] = None,
+) -> AsyncIterator[str]:
+    """
+    Relay provider tokens as SSE events, then persist the assembled reply.
+
+    The provider is pulled one token at a time and each event is awaited on
+    the socket before the next is requested, so a slow client slows
+    generation rather than buffering it. If the client disconnects the
+    response task is cancelled, which closes the provider stream (stopping
+    upstream generation) and skips persistence, as does a worker shutdown
+    that outlasts the drain deadline (app.lifecycle). A response cache hit is
+    replayed as a single token.
+    """
+    started = time.monotonic()
+    message_id = uuid4()
+    parts = []
+    if cache_lookup is not None and cache_lookup.hit is not None:
+        tokens = _replay(cache_lookup.hit.answer)
+    else:
+        tokens = provider.stream(prompt, model, temperature, max_tokens)
+    SSE_STREAMS_ACTIVE.inc()
+    try:
+        yield _sse("start", {"conversation_id": str(conversation_id), "message_id": str(message_id)})
+        async for token in tokens:
+            if stream_drain.expired:
+                # The worker is shutting down; end cleanly before the server cancels the response
+                SSE_STREAMS_INTERRUPTED.inc()
+                yield _sse("error", {"detail": "Server is restarting, please retry", "retry": True})
+                return
+            parts.append(token)
+            yield _sse("token", {"content": token})
+    except ProviderError as exc:
+        yield _sse("error", {"detail": f"Model provider unavailable: {exc}"})
+        return
+    finally:
+        SSE_STREAMS_ACTIVE.dec()
+        with anyio.CancelScope(shield=True):
+            await tokens.aclose()
+    
+    # Single write for the whole assistant message
+    content = "".join(parts)
+    async with SessionLocal(info={"user_id": user_id}) as db:
+        reply = await add_message(
+            db, conversation_id, "assistant", content, count_tokens(content, model), message_id=message_id
+        )
+        await db.commit()
+    if user_id is not None:
+        _remember(user_id, reply)
+    if cache_lookup is not None:
+        await get_response_cache().store(cache_lookup, content, reply.token_count)
+    if refresh_summary:
+        summary_refresher.schedule(conversation_id, provider)
+    log_conversation_activity(conversation_id, time.monotonic() - started)
+    
+    yield _sse("done", {"message_id": str(message_id), "tokens": len(parts)})
+
+async def _replay(content: str) -> AsyncIterator[str]:
+    yield content
+
+def _sse(event: str, data: dict) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _assemble_context(
+    db: AsyncSession,
+    conversation: Conversation,
+    message: str,
+    user_id: UUID,
+    user_settings: Optional[UserSettingsResponse],
+) -> AssembledContext:
+    """Prompt for the model: instructions, memories, summary and recent history within the token budget"""
+    memories = []
+    memory = get_memory()
+    if memory is not None and (user_settings is None or user_settings.search_history_enabled):
+        recollections = await recall(
+            memory,
+            db,
+            user_id,
+            message,
+            k=settings.MEMORY_TOP_K,
+            min_score=settings.MEMORY_MIN_SCORE,
+            exclude_conversation_id=conversation.id,  # Recent turns already come from the history
+        )
+        memories = [f"{item.role}: {item.content}" for item in recollections]
+    
+    return await assemble_context(
+        db,
+        conversation,
+        message,
+        custom_instructions=user_settings.custom_instructions if user_settings else None,
+        max_tokens=_max_tokens(user_settings),
+        memories=memories,
+    )
+
+async def _lookup_cached_reply(
+    conversation: Conversation,
+    context: AssembledContext,
+    message: str,
+    user_id: UUID,
+    user_settings: Optional[UserSettingsResponse],
+) -> Optional[CacheLookup]:
+    """Response cache lookup, only for standalone prompts (no earlier turns or summary to depend on)"""
+    response_cache = get_response_cache()
+    if response_cache is None or context.history_messages or conversation.summary:
+        return None
+    instructions = [conversation.system_prompt, user_settings.custom_instructions if user_settings else None]
+    return await response_cache.lookup(
+        user_id,
+        conversation.model_used,
+        conversation.temperature,
+        "\n".join(part or "" for part in instructions),
+        message,
+        prompt_tokens=context.prompt_tokens,
+        memories=context.memories,
+    )
+
+def _remember(user_id: UUID, *messages: Message):
+    """Queue persisted messages for embedding into long-term memory"""
+    memory = get_memory()
+    if memory is not None:
+        for message in messages:
+            memory.submit(message.id, user_id, message.conversation_id, message.content)
+
+def _max_tokens(user_settings: Optional[UserSettingsResponse]) -> int:
+    return user_settings.max_tokens if user_settings else 2000
+
+async def _get_or_create_conversation(
+    db: AsyncSession,
+    conversation_id: Optional[str],
+    user_id: UUID,
+    user_settings: Optional[UserSettingsResponse] = None,
+) -> Conversation:
+    """Load the caller's conversation, or start a new one when no id is given"""
+    if not conversation_id or conversation_id == "new":
+        conversation = Conversation(
+            id=uuid4(),
+            user_id=user_id,
+            model_used=user_settings.preferred_model if user_settings else "gpt-4",
+            temperature=user_settings.temperature if user_settings else 0.7,
+        )
+        db.add(conversation)
+        return conversation
+    
+    try:
+        conversation_uuid = UUID(conversation_id)
+    except ValueError:
+        conversation_uuid = None
+    
+    conversation = None
+    if conversation_uuid is not None:
+        conversation = await db.scalar(
+            select(Conversation).where(
+                Conversation.id == conversation_uuid,
+                Conversation.user_id == user_id,
+            )
+        )
+    
+    if conversation is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found",
+        )
+    return conversation
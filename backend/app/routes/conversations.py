@@ -1,40 +1,168 @@
 """Conversation routes"""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import datetime
+from uuid import UUID
+
+from app import export
+from app.config import settings
+from app.export import FORMATS
+from app.search import hybrid_search
+from auth.cache import load_user_settings
+from auth.dependencies import get_current_user, get_read_db
+from auth.schemas import CurrentUser
+from database import get_db
+from database.conversations import get_message_window, get_user_conversation, list_user_conversations
+from database.pagination import InvalidCursor
 
 router = APIRouter()
 
 class Message(BaseModel):
-    id: str
+    id: UUID
     role: str
     content: str
-    timestamp: datetime
+    token_count: int
+    is_liked: Optional[bool] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
 
 class Conversation(BaseModel):
-    id: str
-    title: str
+    id: UUID
+    title: Optional[str] = None
+    is_pinned: bool
     created_at: datetime
     updated_at: datetime
     message_count: int
 
-@router.get("", response_model=List[Conversation])
-async def list_conversations(skip: int = 0, limit: int = 20):
-    """List all conversations for current user"""
-    # TODO: Implement conversation listing
-    return []
-
-@router.get("/{conversation_id}", response_model=dict)
-async def get_conversation(conversation_id: str):
-    """Get specific conversation with messages"""
-    # TODO: Implement conversation retrieval with messages
-    return {
-        "id": conversation_id,
-        "title": "Sample conversation",
-        "messages": [],
-    }
+    class Config:
+        from_attributes = True
+
+class ConversationDetail(Conversation):
+    messages: List[Message]
+    older_cursor: Optional[str] = None
+    newer_cursor: Optional[str] = None
+
+class ConversationPage(BaseModel):
+    items: List[Conversation]
+    next_cursor: Optional[str] = None
+
+class SearchResult(BaseModel):
+    message_id: UUID
+    conversation_id: UUID
+    conversation_title: Optional[str] = None
+    role: str
+    snippet: str  # HTML-escaped, matched words wrapped in <mark>
+    created_at: datetime
+    score: float
+
+    class Config:
+        from_attributes = True
+
+class SearchResults(BaseModel):
+    items: List[SearchResult]
+
+@router.get("", response_model=ConversationPage)
+async def list_conversations(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    archived: bool = False,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """List conversations for current user (pinned first, newest first), paginated by cursor"""
+    try:
+        rows, next_cursor = await list_user_conversations(db, current_user.id, cursor, limit, archived)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    
+    return ConversationPage(
+        items=[Conversation.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+@router.get("/search", response_model=SearchResults)
+async def search_conversations(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=50),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Search the user's messages by keywords and meaning (hybrid full-text + vector)"""
+    user_settings = await load_user_settings(db, current_user.id)
+    if user_settings is not None and not user_settings.search_history_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Search history is disabled in your settings",
+        )
+    
+    hits = await hybrid_search(
+        db,
+        current_user.id,
+        q,
+        limit,
+        candidates=settings.SEARCH_CANDIDATES,
+        max_text_matches=settings.SEARCH_MAX_TEXT_MATCHES,
+    )
+    return SearchResults(items=[SearchResult.model_validate(hit) for hit in hits])
+
+@router.post("/export")
+async def export_all_conversations(
+    format: str = "ndjson",
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Export all of the user's conversations as a streamed zip archive"""
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format, expected one of: {', '.join(FORMATS)}",
+        )
+    
+    return StreamingResponse(
+        export.export_all_conversations(current_user.id, format),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="conversations.zip"'},
+    )
+
+@router.get("/{conversation_id}", response_model=ConversationDetail)
+async def get_conversation(
+    conversation_id: UUID,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get a conversation with a window of its messages (latest, or before/after a cursor)"""
+    conversation = await get_user_conversation(db, conversation_id, current_user.id)
+    if conversation is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found",
+        )
+    
+    try:
+        rows, older_cursor, newer_cursor = await get_message_window(db, conversation_id, limit, before, after)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    
+    return ConversationDetail(
+        **Conversation.model_validate(conversation).model_dump(),
+        messages=[Message.model_validate(row) for row in rows],
+        older_cursor=older_cursor,
+        newer_cursor=newer_cursor,
+    )
 
 @router.delete("/{conversation_id}")
 async def delete_conversation(conversation_id: str):
@@ -43,7 +171,38 @@ async def delete_conversation(conversation_id: str):
     return {"message": "Conversation deleted"}
 
 @router.post("/{conversation_id}/export")
-async def export_conversation(conversation_id: str, format: str = "json"):
-    """Export conversation as JSON or PDF"""
-    # TODO: Implement conversation export
-    return {"message": "Export functionality"}
+async def export_conversation(
+    conversation_id: UUID,
+    format: str = "json",
+    gzip: bool = False,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Export conversation as JSON, NDJSON or Markdown (streamed, optionally gzipped)"""
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format, expected one of: {', '.join(FORMATS)}",
+        )
+    
+    conversation = await get_user_conversation(db, conversation_id, current_user.id)
+    if conversation is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found",
+        )
+    await db.close()  # The export streams from its own session
+    
+    extension, media_type = FORMATS[format]
+    filename = f"conversation-{conversation_id}.{extension}"
+    body = export.export_conversation(conversation, format)
+    if gzip:
+        body = export.gzip_stream(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,107 @@
+"""Hybrid search over a user's conversation history
+
+Full-text matches and vector (semantic) matches are retrieved separately,
+each as a ranked list of message ids, and merged with reciprocal-rank
+fusion: a message scores ``sum(1 / (k + rank))`` over the lists it appears
+in, so agreement between the two retrievers outweighs a high rank in just
+one, and their incomparable raw scores never need calibrating. Only the
+final page of hits is loaded and turned into highlighted snippets.
+"""
+
+import html
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.search import fulltext_search, load_hits, query_terms
+from memory import get_memory, nearest
+
+RRF_K = 60
+SNIPPET_CHARS = 200
+
+@dataclass
+class SearchHit:
+    message_id: UUID
+    conversation_id: UUID
+    conversation_title: Optional[str]
+    role: str
+    snippet: str
+    created_at: datetime
+    score: float
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = RRF_K) -> List[Tuple[Hashable, float]]:
+    """Merge ranked lists into one, best first, scoring each item by sum(1 / (k + rank))"""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+def make_snippet(text: str, terms: Sequence[str], length: int = SNIPPET_CHARS) -> str:
+    """
+    HTML-escaped excerpt of `text` around the first query term, with every
+    word starting with a term wrapped in <mark>. Messages matched only
+    semantically start the excerpt at the beginning.
+    """
+    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, terms)) + r")\w*", re.IGNORECASE) if terms else None
+    first = pattern.search(text) if pattern else None
+
+    start = 0
+    if first is not None and first.start() > length // 3:
+        # Keep a little context before the match, starting on a word boundary
+        start = first.start() - length // 3
+        space = text.find(" ", start, first.start())
+        if space != -1:
+            start = space + 1
+    end = min(len(text), start + length)
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+
+    excerpt = text[start:end]
+    if pattern is None:
+        marked = html.escape(excerpt)
+    else:
+        parts, position = [], 0
+        for match in pattern.finditer(excerpt):
+            parts.append(html.escape(excerpt[position:match.start()]))
+            parts.append(f"<mark>{html.escape(match.group())}</mark>")
+            position = match.end()
+        parts.append(html.escape(excerpt[position:]))
+        marked = "".join(parts)
+    return ("…" if start else "") + " ".join(marked.split()) + ("…" if end < len(text) else "")
+
+async def hybrid_search(
+    db: AsyncSession,
+    user_id: UUID,
+    query: str,
+    limit: int = 20,
+    candidates: int = 50,
+    max_text_matches: int = 5000,
+) -> List[SearchHit]:
+    """The user's messages best matching `query`, by text and meaning"""
+    rankings = [await fulltext_search(db, user_id, query, candidates, max_text_matches)]
+    memory = get_memory()
+    if memory is not None:
+        rankings.append([UUID(match.id) for match in await nearest(memory, user_id, query, candidates)])
+
+    fused = reciprocal_rank_fusion(rankings)[:limit]
+    rows = {row.id: row for row in await load_hits(db, user_id, [message_id for message_id, _ in fused])}
+    terms = query_terms(query)
+    return [
+        SearchHit(
+            message_id=row.id,
+            conversation_id=row.conversation_id,
+            conversation_title=row.conversation_title,
+            role=row.role,
+            snippet=make_snippet(row.content, terms),
+            created_at=row.created_at,
+            score=round(score, 6),
+        )
+        for message_id, score in fused
+        if (row := rows.get(message_id)) is not None  # Vectors can outlive deleted messages
+    ]
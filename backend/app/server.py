@@ -0,0 +1,105 @@
+"""Production server: several uvicorn workers with graceful draining
+
+    python -m app.server [--workers N] [--host H] [--port P]
+
+Runs WEB_CONCURRENCY worker processes (default: one per CPU available to
+the container) sharing one listening socket, on uvloop and httptools when
+they are installed. On SIGTERM every worker stops accepting connections and
+lets in-flight requests finish for up to SHUTDOWN_GRACE_SECONDS before
+cancelling them; chat streams are told to wind down just before that
+deadline (see app.lifecycle). Give the orchestrator's stop timeout a few
+seconds more than the grace period.
+
+/metrics on the shared port answers from whichever worker accepts the
+connection; set METRICS_PORT to have each worker export its own metrics
+on a separate port (see metrics.exporter).
+
+`python -m app.main` remains the single-process development server.
+"""
+
+import argparse
+import importlib.util
+import math
+import os
+import sys
+from typing import List, Optional
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from app.config import settings
+
+STARTUP_FAILURE = 3  # uvicorn's exit code when the application fails to start
+
+LOOP = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+HTTP = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+def _cgroup_cpu_limit() -> Optional[int]:
+    """CPUs allowed by a cgroup v2 quota (e.g. `docker run --cpus`), or None when unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        return None
+    if quota == "max":
+        return None
+    return max(1, math.ceil(int(quota) / int(period)))
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity masks and container quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS/Windows
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    return min(cpus, limit) if limit else cpus
+
+def worker_count() -> int:
+    """WEB_CONCURRENCY, or one worker per available CPU (the app is async, so one per core saturates it)"""
+    return settings.WEB_CONCURRENCY if settings.WEB_CONCURRENCY > 0 else available_cpus()
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that starts draining chat streams as soon as a shutdown signal arrives"""
+
+    def handle_exit(self, sig, frame):
+        from app.lifecycle import stream_drain
+
+        stream_drain.begin(self.config.timeout_graceful_shutdown or 0)
+        super().handle_exit(sig, frame)
+
+def build_config(host: str, port: int, workers: int, access_log: bool = False) -> uvicorn.Config:
+    return uvicorn.Config(
+        "app.main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=LOOP,
+        http=HTTP,
+        lifespan="on",
+        timeout_graceful_shutdown=settings.SHUTDOWN_GRACE_SECONDS,
+        proxy_headers=True,
+        access_log=access_log,  # Per-route counts and latencies are in /metrics
+    )
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run the API with production settings")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=None, help="Defaults to WEB_CONCURRENCY or the CPU count")
+    parser.add_argument("--access-log", action="store_true")
+    args = parser.parse_args(argv)
+
+    config = build_config(args.host, args.port, args.workers or worker_count(), args.access_log)
+    # Spawned workers read their count from the environment (metrics.exporter picks a port from it)
+    os.environ["WEB_CONCURRENCY"] = str(config.workers)
+    server = DrainingServer(config)
+    if config.workers > 1:
+        # Workers are spawned fresh (no state forked from this process) and each runs the lifespan
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+        if not server.started:
+            sys.exit(STARTUP_FAILURE)
+
+if __name__ == "__main__":
+    main()
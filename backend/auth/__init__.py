@@ -9,7 +9,13 @@ from auth.security import (
     verify_access_token,
     verify_refresh_token,
 )
+from auth.cache import cache_stats, invalidate_user
 from auth.dependencies import get_current_user, get_optional_user
+from auth.password_pool import (
+    PasswordPoolSaturated,
+    hash_password_async,
+    verify_password_async,
+)
 from auth.schemas import (
     UserCreate,
     UserResponse,
@@ -30,6 +36,11 @@ __all__ = [
     "decode_token",
     "verify_access_token",
     "verify_refresh_token",
+    "hash_password_async",
+    "verify_password_async",
+    "PasswordPoolSaturated",
+    "invalidate_user",
+    "cache_stats",
     "get_current_user",
     "get_optional_user",
     "UserCreate",
@@ -0,0 +1,184 @@
+"""API key issuance and authentication
+
+Extensions and scripts authenticate with ``Authorization: Bearer <key>``
+instead of a JWT. Keys look like ``pgpt_<prefix>_<secret>``: the prefix is
+public and indexed (`APIKey.prefix`), so a presented key is found with one
+unique-index lookup, and `APIKey.key_hash` is HMAC-SHA256 of the whole key
+under API_KEY_SECRET, so verification is a constant-time compare of a fast
+keyed hash rather than a slow password hash (the secret part has 256 bits of
+entropy, so it needs no stretching).
+
+Verified keys are cached in-process by prefix for API_KEY_CACHE_TTL_SECONDS.
+Revoking a key evicts it everywhere at once: the revoking worker publishes
+the prefix on a Redis channel that every worker's `revocation_listener`
+subscribes to. Usage is recorded in memory and written to
+`APIKey.last_used_at` in one batched UPDATE per interval by
+`last_used_recorder`, so authenticated requests never write.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import secrets
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, or_, select, update
+
+from app.config import settings
+from auth.schemas import APIKeyIdentity
+from cache import InvalidationListener, SingleFlight, TTLCache, get_cache
+from database import APIKey, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+API_KEY_PREFIX = "pgpt_"
+REVOCATION_CHANNEL = "api_keys:revoked"
+
+# Seconds an unknown prefix is remembered as invalid
+UNKNOWN_KEY_TTL = 5.0
+
+# (key_hash, APIKeyIdentity) for known keys, False for unknown prefixes, keyed by prefix
+api_key_cache = TTLCache(
+    maxsize=settings.API_KEY_CACHE_SIZE,
+    ttl=settings.API_KEY_CACHE_TTL_SECONDS,
+)
+
+_api_key_loads = SingleFlight()
+
+def hash_api_key(key: str) -> str:
+    """The stored `APIKey.key_hash` of a raw key"""
+    secret = (settings.API_KEY_SECRET or settings.JWT_SECRET).encode()
+    return hmac.new(secret, key.encode(), hashlib.sha256).hexdigest()
+
+def generate_api_key() -> Tuple[str, str, str]:
+    """A new random key, returned as (raw key, prefix, key hash); only the hash is stored"""
+    prefix = secrets.token_hex(6)
+    key = f"{API_KEY_PREFIX}{prefix}_{secrets.token_urlsafe(32)}"
+    return key, prefix, hash_api_key(key)
+
+def key_prefix(key: str) -> Optional[str]:
+    """The public prefix of a well-formed key"""
+    if not key.startswith(API_KEY_PREFIX):
+        return None
+    prefix, _, secret = key[len(API_KEY_PREFIX):].partition("_")
+    return prefix if prefix and secret else None
+
+def presented_api_key(headers: Iterable[Tuple[bytes, bytes]]) -> Optional[str]:
+    """The API key in raw ASGI headers, if the request authenticates with one"""
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, credentials = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and credentials.startswith(API_KEY_PREFIX):
+                return credentials.strip()
+            return None
+    return None
+
+async def authenticate_api_key(key: str) -> Optional[APIKeyIdentity]:
+    """The identity of an active, unexpired key, or None"""
+    prefix = key_prefix(key)
+    if prefix is None:
+        return None
+    entry = api_key_cache.get(prefix)
+    if entry is None:
+        entry = await _api_key_loads.do(prefix, lambda: _load_api_key(prefix))
+    if entry is False:
+        return None
+
+    key_hash, identity = entry
+    if not hmac.compare_digest(key_hash, hash_api_key(key)):
+        return None
+    if identity.expires_at is not None and identity.expires_at <= datetime.utcnow():
+        return None
+    last_used_recorder.record(identity.id)
+    return identity
+
+async def _load_api_key(prefix: str):
+    async with SessionLocal() as db:
+        row = await db.scalar(select(APIKey).where(APIKey.prefix == prefix, APIKey.is_active.is_(True)))
+    if row is None:
+        api_key_cache.set(prefix, False, ttl=UNKNOWN_KEY_TTL)
+        return False
+    entry = (row.key_hash, APIKeyIdentity.model_validate(row))
+    api_key_cache.set(prefix, entry)
+    return entry
+
+async def revoke_api_key(prefix: str):
+    """Evict a revoked key from every worker's cache (call after committing the revocation)"""
+    api_key_cache.delete(prefix)
+    await get_cache().publish(REVOCATION_CHANNEL, prefix.encode())
+
+class LastUsedRecorder:
+    """
+    Debounces `APIKey.last_used_at`: requests only note the time in memory,
+    and a background task writes every key used since the previous flush
+    in one executemany UPDATE each `interval` seconds.
+    """
+
+    def __init__(self, interval: float = 60.0, session_factory=SessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        self._pending: Dict[UUID, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.written = 0
+
+    def record(self, key_id: UUID):
+        self._pending[key_id] = datetime.utcnow()
+        self.recorded += 1
+
+    async def flush(self):
+        """Write pending usage now"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        table = APIKey.__table__
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(table)
+                    .where(
+                        table.c.id == bindparam("key_id"),
+                        # Never move the timestamp backwards when workers flush out of order
+                        or_(table.c.last_used_at.is_(None), table.c.last_used_at < bindparam("used_at")),
+                    )
+                    .values(last_used_at=bindparam("used_at")),
+                    [{"key_id": key_id, "used_at": used_at} for key_id, used_at in pending.items()],
+                )
+                await db.commit()
+        except Exception:
+            # Keep the usage for the next flush unless newer usage was recorded meanwhile
+            for key_id, used_at in pending.items():
+                self._pending.setdefault(key_id, used_at)
+            raise
+        self.written += len(pending)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Writing API key last_used_at failed")
+
+    async def stop(self):
+        """Stop the background task and write what is pending"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+# Evicts keys revoked by any worker from this worker's cache
+revocation_listener = InvalidationListener(
+    REVOCATION_CHANNEL,
+    evict=lambda prefix: api_key_cache.delete(prefix.decode()),
+    reset=api_key_cache.clear,
+)
+last_used_recorder = LastUsedRecorder(settings.API_KEY_LAST_USED_INTERVAL_SECONDS)
@@ -0,0 +1,165 @@
+"""Caches for verified access tokens, authenticated users and user settings
+
+Every authenticated request used to re-verify the JWT signature and SELECT the
+user row. Verified claims are cached in-process by token digest until the
+token's own `exp`. Users (as a slim `CurrentUser` projection) go through two
+tiers: a short-TTL in-process LRU, then the shared cache (Redis) so all
+workers reuse one lookup; settings use the shared cache only. Cold keys are
+loaded with single-flight so a burst of requests for the same user costs one
+database query per process.
+
+Shared entries are keyed by the user's generation, a token that
+`invalidate_user` replaces: a load that read the database before the change
+committed writes its stale value under the old generation, where nobody
+looks any more. Call `invalidate_user` after a user's row or settings
+change: it starts a new generation, evicts this worker's local tier and
+publishes the user id, and every worker's `user_invalidation_listener`
+drops it from that worker's local tier, so a deactivated user or changed
+password is not served stale by other workers.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, Optional, Union
+from uuid import UUID, uuid4
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from auth.schemas import CurrentUser, UserSettingsResponse
+from auth.security import TokenData, decode_token
+from cache import InvalidationListener, SingleFlight, TTLCache, get_cache
+from database import User, UserSettings
+
+# Shared cache keys (user id, generation)
+USER_KEY = "user:{}:{}"
+USER_SETTINGS_KEY = "user_settings:{}:{}"
+USER_GENERATION_KEY = "user_gen:{}"
+USER_INVALIDATION_CHANNEL = "users:invalidated"
+
+# Generation of a user never invalidated (or whose generation key expired)
+INITIAL_GENERATION = "0"
+
+# Claims of verified access tokens, keyed by SHA-256 of the raw token
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.JWT_EXPIRATION_HOURS * 3600,
+)
+
+# CurrentUser projections, keyed by user id
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+_user_loads = SingleFlight()
+_settings_loads = SingleFlight()
+
+# Local evictions so far: a load that overlapped one does not fill the local tier
+_evictions = 0
+
+def _evict_local(user_id: Optional[UUID] = None):
+    global _evictions
+    _evictions += 1
+    if user_id is None:
+        user_cache.clear()
+    else:
+        user_cache.delete(user_id)
+
+# Evicts users invalidated by any worker from this worker's local tier
+user_invalidation_listener = InvalidationListener(
+    USER_INVALIDATION_CHANNEL,
+    evict=lambda user_id: _evict_local(UUID(user_id.decode())),
+    reset=_evict_local,
+)
+
+async def _generation(user_id: UUID) -> str:
+    raw = await get_cache().get(USER_GENERATION_KEY.format(user_id))
+    return raw.decode() if raw is not None else INITIAL_GENERATION
+
+def decode_access_token_cached(token: str) -> Optional[TokenData]:
+    """Decode an access token, reusing the verified claims for repeat tokens"""
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        return token_data
+
+    token_data = decode_token(token)
+    if token_data is None or token_data.type != "access":
+        return None
+
+    # decode_token builds `exp` as a naive local datetime, so compare against local now
+    token_cache.set(key, token_data, ttl=(token_data.exp - datetime.now()).total_seconds())
+    return token_data
+
+async def load_user(db: AsyncSession, user_id: UUID) -> Optional[CurrentUser]:
+    """Return the user projection from the local tier, shared tier or database"""
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    return await _user_loads.do(user_id, lambda: _load_user(db, user_id))
+
+async def _load_user(db: AsyncSession, user_id: UUID) -> Optional[CurrentUser]:
+    evictions = _evictions
+    cache = get_cache()
+    key = USER_KEY.format(user_id, await _generation(user_id))
+    raw = await cache.get(key)
+    if raw is not None:
+        user = CurrentUser.model_validate_json(raw)
+    else:
+        row = await db.get(User, user_id)
+        if row is None:
+            return None
+        user = CurrentUser.model_validate(row)
+        await cache.set(key, user.model_dump_json().encode(), settings.SHARED_CACHE_TTL_SECONDS)
+
+    if evictions == _evictions:
+        user_cache.set(user_id, user)
+    return user
+
+async def load_user_settings(db: AsyncSession, user_id: UUID) -> Optional[UserSettingsResponse]:
+    """Return a user's settings from the shared cache or database"""
+    return await _settings_loads.do(user_id, lambda: _load_user_settings(db, user_id))
+
+async def _load_user_settings(db: AsyncSession, user_id: UUID) -> Optional[UserSettingsResponse]:
+    key = USER_SETTINGS_KEY.format(user_id, await _generation(user_id))
+    raw = await get_cache().get(key)
+    if raw is not None:
+        return UserSettingsResponse.model_validate_json(raw)
+
+    row = await db.scalar(select(UserSettings).where(UserSettings.user_id == user_id))
+    if row is None:
+        return None
+    user_settings = UserSettingsResponse.model_validate(row)
+    await get_cache().set(key, user_settings.model_dump_json().encode(), settings.SHARED_CACHE_TTL_SECONDS)
+    return user_settings
+
+async def store_user_settings(user_settings: UserSettingsResponse):
+    """Write settings through to the shared cache (after the commit and `invalidate_user`)"""
+    await get_cache().set(
+        USER_SETTINGS_KEY.format(user_settings.user_id, await _generation(user_settings.user_id)),
+        user_settings.model_dump_json().encode(),
+        settings.SHARED_CACHE_TTL_SECONDS,
+    )
+
+async def invalidate_user(user_id: Union[UUID, str]):
+    """
+    Start a new cache generation for a user and drop them from every
+    worker's local tier (after deactivation or settings changes)
+    """
+    user_id = user_id if isinstance(user_id, UUID) else UUID(user_id)
+    _evict_local(user_id)
+    cache = get_cache()
+    # Outlives every entry of the previous generation, so expiring cannot bring one back
+    await cache.set(
+        USER_GENERATION_KEY.format(user_id), uuid4().hex.encode(), 2 * settings.SHARED_CACHE_TTL_SECONDS
+    )
+    await cache.publish(USER_INVALIDATION_CHANNEL, str(user_id).encode())
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """Hit/miss counters for the token and user caches"""
+    return {
+        "tokens": token_cache.stats(),
+        "users": user_cache.stats(),
+    }
@@ -1,69 +1,110 @@
 """Authentication dependencies for FastAPI"""
 
-from typing import Optional
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthCredentials
+import hmac
+from typing import AsyncIterator, Optional
+from uuid import UUID
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth.security import verify_access_token
-from database import User, SessionLocal, get_db
-from sqlalchemy.orm import Session
+from app.config import settings
+from auth.api_keys import API_KEY_PREFIX
+from auth.cache import decode_access_token_cached, load_user
+from auth.schemas import CurrentUser
+from database import get_db
+from database.replicas import read_session
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 async def get_current_user(
-    credentials: HTTPAuthCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> CurrentUser:
     """
-    Get the current authenticated user from JWT token.
+    Get the current authenticated user from JWT token or API key.
     Raises 401 if token is invalid or user not found.
     """
-    token = credentials.credentials
-    user_id = verify_access_token(token)
-    
+    user_id = _resolve_user_id(request, credentials.credentials)
+
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    
+
+    user = await load_user(db, user_id)
+
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is inactive",
         )
-    
+
+    # Writes committed through this request's session keep the user's reads on the primary for a while
+    db.info["user_id"] = user.id
     return user
 
+async def get_read_db(current_user: CurrentUser = Depends(get_current_user)) -> AsyncIterator[AsyncSession]:
+    """Session for read-only endpoints: reads go to a replica unless the user wrote recently"""
+    async with read_session(current_user.id) as db:
+        yield db
+
 async def get_optional_user(
-    credentials: Optional[HTTPAuthCredentials] = Depends(security),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_db)
+) -> Optional[CurrentUser]:
     """
     Get the current user if authenticated, otherwise return None.
     """
     if not credentials:
         return None
-    
-    token = credentials.credentials
-    user_id = verify_access_token(token)
-    
+
+    user_id = _resolve_user_id(request, credentials.credentials)
+
     if not user_id:
         return None
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    
+
+    user = await load_user(db, user_id)
+
     if user and user.is_active:
         return user
-    
+
     return None
+
+def _resolve_user_id(request: Request, token: str) -> Optional[UUID]:
+    """The user behind an access token (verified, cached) or an API key"""
+    if token.startswith(API_KEY_PREFIX):
+        # Verified (and rate limited) by RateLimitMiddleware
+        identity = getattr(request.state, "api_key", None)
+        return identity.user_id if identity is not None else None
+
+    token_data = decode_access_token_cached(token)
+    if token_data is None:
+        return None
+    try:
+        return UUID(token_data.sub)
+    except ValueError:
+        return None
+
+async def require_admin(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+) -> None:
+    """Allow only requests bearing ADMIN_TOKEN (admin endpoints do not exist without one)"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if credentials is None or not hmac.compare_digest(credentials.credentials, settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required",
+        )
@@ -0,0 +1,113 @@
+"""Bounded worker pool for bcrypt password hashing
+
+bcrypt deliberately costs ~100-300 ms of CPU per call. Running it inline in an
+``async def`` handler stalls every other request on the worker, so hashing and
+verification are dispatched to a dedicated thread pool (bcrypt releases the
+GIL, so threads hash in parallel). Admission is capped at ``workers + queue``
+outstanding jobs; beyond that callers get ``PasswordPoolSaturated`` and the API
+answers 429 instead of queueing unboundedly.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+from auth.security import hash_password, verify_password
+from metrics import PASSWORD_HASH_SECONDS, PASSWORD_POOL_WAIT_SECONDS
+
+class PasswordPoolSaturated(Exception):
+    """Raised when the hashing pool has no free worker or queue slot"""
+
+class PasswordHashPool:
+    """Thread pool with a queue-depth limit and wait/hash time metrics"""
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None  # Created on first use, again after shutdown()
+        self._pending = 0
+
+        # Metrics (only mutated on the event loop thread, so no locking is needed)
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+
+    @property
+    def pending(self) -> int:
+        """Jobs currently running or waiting for a worker"""
+        return self._pending
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run `fn(*args)` on the pool, raising PasswordPoolSaturated when full"""
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordPoolSaturated()
+
+        self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _timed, fn, args
+            )
+        finally:
+            self._pending -= 1
+
+        wait, elapsed = started - submitted, finished - started
+        self.completed += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        self.hash_seconds_total += elapsed
+        self.hash_seconds_max = max(self.hash_seconds_max, elapsed)
+        PASSWORD_POOL_WAIT_SECONDS.observe(wait)
+        PASSWORD_HASH_SECONDS.labels(fn.__name__).observe(elapsed)
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """Snapshot of pool occupancy and timing metrics"""
+        completed = self.completed or 1
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds_avg": self.wait_seconds_total / completed,
+            "wait_seconds_max": self.wait_seconds_max,
+            "hash_seconds_avg": self.hash_seconds_total / completed,
+            "hash_seconds_max": self.hash_seconds_max,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    def shutdown(self):
+        """Stop the worker threads (pending jobs are allowed to finish); the next job starts new ones"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+def _timed(fn: Callable[..., Any], args) -> tuple:
+    """Run fn in a worker thread, returning its result with start/finish timestamps"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, started, time.perf_counter()
+
+password_pool = PasswordHashPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the bounded worker pool"""
+    return await password_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the bounded worker pool"""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
@@ -1,6 +1,6 @@
 """Authentication schemas for request/response validation"""
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from uuid import UUID
 from datetime import datetime
 from typing import Optional
@@ -93,3 +93,38 @@ class UserSettingsUpdate(BaseModel):
     custom_instructions: Optional[str] = None
     search_history_enabled: Optional[bool] = None
     data_retention_days: Optional[int] = None
+
+class APIKeyIdentity(BaseModel):
+    """An authenticated API key: its owner and request limits"""
+    id: UUID
+    user_id: UUID
+    rate_limit_requests: int = 100
+    rate_limit_window: int = 60
+    expires_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class APIKeyCreate(BaseModel):
+    """API key creation request schema"""
+    name: str = Field(..., min_length=1, max_length=255)
+    expires_in_days: Optional[int] = Field(None, ge=1, le=3650)
+
+class APIKeyResponse(BaseModel):
+    """API key schema (never includes the key itself)"""
+    id: UUID
+    name: str
+    prefix: Optional[str] = None
+    rate_limit_requests: int
+    rate_limit_window: int
+    is_active: bool
+    last_used_at: Optional[datetime] = None
+    created_at: datetime
+    expires_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class APIKeyCreated(APIKeyResponse):
+    """A newly issued API key; `key` is shown only once"""
+    key: str
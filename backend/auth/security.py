@@ -1,15 +1,27 @@
 """Security utilities: password hashing, JWT token generation/validation"""
 
+import time
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel
 
 from app.config import settings
+from metrics import JWT_DECODE_SECONDS
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib and jose (with its crypto backends) load on first use, keeping them out of startup
+_pwd_context = None
+
+def _password_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+def load_backends():
+    """Import the hashing and JWT backends now (worker pre-warm) instead of on first use"""
+    _password_context()
+    import jose.jwt  # noqa: F401
 
 class TokenData(BaseModel):
     """JWT token payload"""
@@ -19,11 +31,11 @@ class TokenData(BaseModel):
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
-    return pwd_context.hash(password)
+    return _password_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _password_context().verify(plain_password, hashed_password)
 
 def create_access_token(user_id: str, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
@@ -38,6 +50,7 @@ def create_access_token(user_id: str, expires_delta: Optional[timedelta] = None)
         "type": "access",
     }
     
+    from jose import jwt
     encoded_jwt = jwt.encode(
         to_encode,
         settings.JWT_SECRET,
@@ -55,6 +68,7 @@ def create_refresh_token(user_id: str) -> str:
         "type": "refresh",
     }
     
+    from jose import jwt
     encoded_jwt = jwt.encode(
         to_encode,
         settings.JWT_SECRET,
@@ -64,6 +78,8 @@ def create_refresh_token(user_id: str) -> str:
 
 def decode_token(token: str) -> Optional[TokenData]:
     """Decode and validate a JWT token"""
+    from jose import JWTError, jwt
+    started = time.perf_counter()
     try:
         payload = jwt.decode(
             token,
@@ -87,6 +103,8 @@ def decode_token(token: str) -> Optional[TokenData]:
         )
     except JWTError:
         return None
+    finally:
+        JWT_DECODE_SECONDS.observe(time.perf_counter() - started)
 
 def verify_access_token(token: str) -> Optional[str]:
     """Verify access token and return user ID"""
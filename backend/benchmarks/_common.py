@@ -0,0 +1,150 @@
+"""Shared helpers for benchmark scripts"""
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# Allow `python benchmarks/<script>.py` from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    """Summarize request latencies (seconds) into throughput and percentiles (ms)"""
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+async def run_load(
+    request: Callable[[], Awaitable[httpx.Response]],
+    concurrency: int,
+    total: int,
+) -> Dict[str, float]:
+    """Issue `total` requests from `concurrency` concurrent clients and summarize latencies"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await request()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+def make_client(base_url: Optional[str], timeout: float = 60.0) -> httpx.AsyncClient:
+    """HTTP client for a running server, or an in-process ASGI client when no URL is given"""
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits)
+
+    from app.main import app
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://benchmark",
+        timeout=timeout,
+    )
+
+@contextlib.asynccontextmanager
+async def serve_app(port: int = 8765):
+    """
+    Run the app on a local uvicorn server for the duration of the block and
+    yield its base URL (needed for streaming measurements, since the in-process
+    ASGI transport buffers whole response bodies).
+    """
+    import uvicorn
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
+
+async def create_tables():
+    """Create all tables on the configured database (in-process runs only)"""
+    from database import Base, engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def seed_thread(user_id, count: int, content: str = "lorem ipsum " * 20, batch: int = 10000):
+    """Insert one conversation with `count` alternating messages and return its id"""
+    from datetime import datetime, timedelta
+    from uuid import uuid4
+    from sqlalchemy import insert
+    from database import Conversation, Message, SessionLocal
+
+    conversation_id = uuid4()
+    base = datetime(2026, 1, 1)
+    async with SessionLocal() as db:
+        await db.execute(insert(Conversation).values(
+            id=conversation_id, user_id=user_id, title=f"{count} messages", message_count=count,
+        ))
+        for start in range(0, count, batch):
+            await db.execute(insert(Message), [
+                {
+                    "id": uuid4(),
+                    "conversation_id": conversation_id,
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": f"benchmark message {i} {content}",
+                    "token_count": 60,
+                    "model_response": i % 2 == 1,
+                    "created_at": base + timedelta(milliseconds=i),
+                }
+                for i in range(start, min(start + batch, count))
+            ])
+            await db.commit()
+    return conversation_id
+
+async def register_user(client: httpx.AsyncClient, prefix: str):
+    """Register a throwaway user, returning (user_id, auth headers)"""
+    from uuid import UUID, uuid4
+
+    suffix = uuid4().hex[:8]
+    response = await client.post("/api/auth/register", json={
+        "email": f"{prefix}-{suffix}@example.com",
+        "username": f"{prefix}-{suffix}",
+        "password": "BenchmarkPassword123!",
+    })
+    response.raise_for_status()
+    body = response.json()
+    return UUID(body["user"]["id"]), {"Authorization": f"Bearer {body['access_token']}"}
+
+def emit(results: Dict, output: Optional[str] = None):
+    """Print results as JSON and optionally write them to a file"""
+    text = json.dumps(results, indent=2)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
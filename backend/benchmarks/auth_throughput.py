@@ -0,0 +1,57 @@
+"""Login and /me throughput at increasing client concurrency
+
+Run against a live server (`--base-url http://localhost:8000`) or in-process
+(default, using DATABASE_URL). Run once on the revision before a change and
+once after, with `--output`, and compare the JSON files.
+
+    python benchmarks/auth_throughput.py --base-url http://localhost:8000 \\
+        --concurrency 50 100 250 500 --output after.json
+"""
+
+import argparse
+import asyncio
+from uuid import uuid4
+
+from _common import create_tables, emit, make_client, run_load
+
+PASSWORD = "BenchmarkPassword123!"
+
+async def main(args):
+    if not args.base_url:
+        await create_tables()
+
+    async with make_client(args.base_url) as client:
+        suffix = uuid4().hex[:8]
+        email = f"bench-{suffix}@example.com"
+        response = await client.post("/api/auth/register", json={
+            "email": email,
+            "username": f"bench-{suffix}",
+            "password": PASSWORD,
+        })
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        results = {"login": {}, "me": {}}
+        for concurrency in args.concurrency:
+            total = max(args.requests, concurrency)
+            results["login"][concurrency] = await run_load(
+                lambda: client.post("/api/auth/login", json={"email": email, "password": PASSWORD}),
+                concurrency,
+                total,
+            )
+            results["me"][concurrency] = await run_load(
+                lambda: client.get("/api/auth/me", headers=headers),
+                concurrency,
+                total,
+            )
+
+    emit(results, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=None, help="Server URL (default: in-process ASGI app)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per endpoint and level")
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""Time-to-first-byte and tokens/sec of the SSE chat stream
+
+Uses the fake LLM provider, so results reflect the streaming pipeline rather
+than a model. Starts a local uvicorn server unless --base-url is given (in
+which case configure the server's FAKE_LLM_* settings instead).
+
+    python benchmarks/chat_stream.py --tokens-per-second 200 --concurrency 1 20 100
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+import httpx
+
+from _common import create_tables, emit, percentile, serve_app
+
+async def stream_once(client: httpx.AsyncClient, headers: dict) -> dict:
+    """Stream one reply, returning TTFB, first-token time and token rate"""
+    started = time.perf_counter()
+    first_byte = first_token = None
+    tokens = 0
+    async with client.stream("GET", "/api/chat/stream", params={"message": "benchmark"}, headers=headers) as response:
+        async for line in response.aiter_lines():
+            now = time.perf_counter()
+            if first_byte is None:
+                first_byte = now
+            if line == "event: token":
+                tokens += 1
+                if first_token is None:
+                    first_token = now
+    elapsed = time.perf_counter() - started
+    return {
+        "ttfb": first_byte - started,
+        "ttft": (first_token or time.perf_counter()) - started,
+        "tokens_per_second": tokens / elapsed if elapsed else 0.0,
+    }
+
+async def run(base_url: str, args) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        suffix = uuid4().hex[:8]
+        response = await client.post("/api/auth/register", json={
+            "email": f"stream-{suffix}@example.com",
+            "username": f"stream-{suffix}",
+            "password": "BenchmarkPassword123!",
+        })
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        results = {}
+        for concurrency in args.concurrency:
+            samples = await asyncio.gather(*(stream_once(client, headers) for _ in range(concurrency)))
+            results[concurrency] = {
+                metric: {
+                    "p50": round(percentile([s[metric] for s in samples], 50), 4),
+                    "p99": round(percentile([s[metric] for s in samples], 99), 4),
+                }
+                for metric in ("ttfb", "ttft", "tokens_per_second")
+            }
+        return results
+
+async def main(args):
+    if args.base_url:
+        results = await run(args.base_url, args)
+    else:
+        from llm import FakeProvider, set_provider
+
+        await create_tables()
+        set_provider(FakeProvider(
+            tokens_per_second=args.tokens_per_second,
+            first_token_latency=args.first_token_latency,
+            response_tokens=args.response_tokens,
+        ))
+        async with serve_app() as base_url:
+            results = await run(base_url, args)
+    emit(results, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=None, help="Server URL (default: start a local server)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 20, 100])
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.05)
+    parser.add_argument("--response-tokens", type=int, default=200)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,91 @@
+"""Prompt assembly time on a very long conversation
+
+Seeds one conversation with `--messages` rows (default 50k) and times
+llm.context.assemble_context for an 8k-context and a 200k-context model,
+with and without a summary cursor, against the naive approach of loading
+the whole thread and re-estimating every message's size.
+
+    DATABASE_URL=postgresql://... python benchmarks/context_assembly.py --messages 50000
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from _common import create_tables, emit, percentile, seed_thread
+
+async def timed(fn, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+    }
+
+async def main(args):
+    from sqlalchemy import insert, select
+    from database import Conversation, Message, SessionLocal, User
+    from llm.context import assemble_context
+    from llm.tokenizer import estimate_tokens
+
+    await create_tables()
+    user_id = uuid4()
+    async with SessionLocal() as db:
+        await db.execute(insert(User).values(
+            id=user_id, email=f"context-{user_id}@example.com", username=f"context-{user_id}", password_hash="x",
+        ))
+        await db.commit()
+    conversation_id = await seed_thread(user_id, args.messages)
+
+    async with SessionLocal() as db:
+        conversation = await db.get(Conversation, conversation_id)
+        near_end = (await db.execute(
+            select(Message.created_at, Message.id)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .offset(50)
+            .limit(1)
+        )).one()
+
+    results = {"messages": args.messages, "assemble": {}}
+    for model in args.models:
+        async def assemble():
+            async with SessionLocal() as db:
+                return await assemble_context(db, conversation, "benchmark", max_tokens=1000)
+
+        conversation.model_used = model
+        conversation.summary, conversation.summary_through_at, conversation.summary_through_id = None, None, None
+        context = await assemble()
+        results["assemble"][model] = {
+            "history_messages": context.history_messages,
+            "prompt_tokens": context.prompt_tokens,
+            "no_summary": await timed(assemble, args.repeat),
+        }
+
+        conversation.summary = "Earlier: " + "summary text " * 100
+        conversation.summary_through_at, conversation.summary_through_id = near_end
+        results["assemble"][model]["with_summary"] = await timed(assemble, args.repeat)
+
+    async def naive():
+        async with SessionLocal() as db:
+            rows = (await db.execute(
+                select(Message.role, Message.content)
+                .where(Message.conversation_id == conversation_id)
+                .order_by(Message.created_at, Message.id)
+            )).all()
+            return sum(estimate_tokens(row.content) for row in rows)
+
+    results["naive_full_thread"] = await timed(naive, max(1, args.repeat // 10))
+    emit(results, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--models", nargs="+", default=["gpt-4", "claude-3-5-sonnet-latest"])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+"""Open-conversation latency on short vs very long threads
+
+Seeds one conversation per `--sizes` entry (default 10 and 100k messages),
+then times GET /api/conversations/{id} (a bounded message window) against
+loading the full `Conversation.messages` relationship, which is what the
+endpoint would cost without windowing.
+
+    DATABASE_URL=postgresql://... python benchmarks/conversation_open.py --sizes 10 100000
+"""
+
+import argparse
+import asyncio
+import time
+
+from _common import create_tables, emit, make_client, percentile, register_user, run_load, seed_thread
+
+async def time_full_load(conversation_id, repeat: int) -> dict:
+    """Latency of loading the whole thread through the ORM relationship"""
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from database import Conversation, SessionLocal
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        async with SessionLocal() as db:
+            await db.scalar(
+                select(Conversation)
+                .where(Conversation.id == conversation_id)
+                .options(selectinload(Conversation.messages))
+            )
+        latencies.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+    }
+
+async def main(args):
+    await create_tables()
+    results = {}
+    async with make_client(None) as client:
+        user_id, headers = await register_user(client, "open")
+        for size in args.sizes:
+            conversation_id = await seed_thread(user_id, size)
+            url = f"/api/conversations/{conversation_id}"
+            window = await run_load(
+                lambda: client.get(url, params={"limit": args.limit}, headers=headers),
+                args.concurrency,
+                args.requests,
+            )
+            results[size] = {"window": window}
+            if size <= args.full_load_max:
+                results[size]["full_load"] = await time_full_load(conversation_id, args.full_load_repeat)
+    emit(results, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100_000])
+    parser.add_argument("--limit", type=int, default=50, help="Messages per window")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--full-load-repeat", type=int, default=5)
+    parser.add_argument("--full-load-max", type=int, default=1_000_000,
+                        help="Skip the full-thread comparison above this size")
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
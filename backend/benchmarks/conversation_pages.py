@@ -0,0 +1,95 @@
+"""Conversation list page latency at shallow vs deep pages
+
+Seeds one user with `--conversations` rows (default 1M; use PostgreSQL via
+DATABASE_URL for representative numbers), then times the keyset query at
+page depth 10 and 10,000 alongside the equivalent OFFSET query.
+
+    DATABASE_URL=postgresql://... python benchmarks/conversation_pages.py
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from _common import create_tables, emit, percentile
+
+async def seed(user_id, count: int, batch: int = 10000):
+    from sqlalchemy import insert
+    from database import Conversation, SessionLocal, User
+
+    async with SessionLocal() as db:
+        await db.execute(insert(User).values(
+            id=user_id, email=f"pages-{user_id}@example.com", username=f"pages-{user_id}", password_hash="x",
+        ))
+        base = datetime(2020, 1, 1)
+        for start in range(0, count, batch):
+            await db.execute(insert(Conversation), [
+                {
+                    "id": uuid4(),
+                    "user_id": user_id,
+                    "title": f"conversation {i}",
+                    "is_pinned": i % 1000 == 0,
+                    "is_archived": False,
+                    "message_count": 0,
+                    "token_count": 0,
+                    "created_at": base + timedelta(seconds=i),
+                    "updated_at": base + timedelta(seconds=i),
+                }
+                for i in range(start, min(start + batch, count))
+            ])
+            await db.commit()
+
+async def time_queries(user_id, depth: int, limit: int, repeat: int) -> dict:
+    from sqlalchemy import select
+    from database import Conversation, SessionLocal
+    from database.conversations import LIST_COLUMNS, list_user_conversations
+    from database.pagination import encode_cursor
+
+    ordering = (Conversation.is_pinned.desc(), Conversation.updated_at.desc(), Conversation.id.desc())
+    base = select(*LIST_COLUMNS).where(Conversation.user_id == user_id, Conversation.is_archived == False)  # noqa: E712
+
+    async with SessionLocal() as db:
+        cursor = None
+        if depth > 1:
+            last = (await db.execute(base.order_by(*ordering).offset((depth - 1) * limit - 1).limit(1))).one()
+            cursor = encode_cursor(last.is_pinned, last.updated_at, last.id)
+
+        keyset, offset = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await list_user_conversations(db, user_id, cursor, limit)
+            keyset.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            (await db.execute(base.order_by(*ordering).offset((depth - 1) * limit).limit(limit))).all()
+            offset.append(time.perf_counter() - started)
+
+    return {
+        "keyset_p50_ms": round(percentile(keyset, 50) * 1000, 3),
+        "keyset_p95_ms": round(percentile(keyset, 95) * 1000, 3),
+        "offset_p50_ms": round(percentile(offset, 50) * 1000, 3),
+        "offset_p95_ms": round(percentile(offset, 95) * 1000, 3),
+    }
+
+async def main(args):
+    await create_tables()
+    user_id = uuid4()
+    started = time.perf_counter()
+    await seed(user_id, args.conversations)
+    seeded = time.perf_counter() - started
+
+    results = {"conversations": args.conversations, "seed_seconds": round(seeded, 1), "pages": {}}
+    for depth in args.depths:
+        results["pages"][depth] = await time_queries(user_id, depth, args.limit, args.repeat)
+    emit(results, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=1_000_000)
+    parser.add_argument("--depths", type=int, nargs="+", default=[10, 10_000])
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
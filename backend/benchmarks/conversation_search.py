@@ -0,0 +1,113 @@
+"""Hybrid search latency over a large per-user message history
+
+Seeds one user with `--messages` messages (split into conversations of
+`--per-conversation`) drawn from a Zipf-distributed vocabulary, so query
+terms range from rare to very common, embeds them into the configured
+vector store, then times GET /api/conversations/search with one- and
+two-word queries.
+
+On PostgreSQL the schema must come from Alembic (the search_vector column
+and its GIN index are migration-only):
+
+    alembic upgrade head
+    DATABASE_URL=postgresql://... python benchmarks/conversation_search.py --messages 1000000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from _common import create_tables, emit, make_client, register_user, run_load
+
+def vocabulary(size: int):
+    return [f"term{i}" for i in range(size)]
+
+def sentences(rng: random.Random, words, weights, count: int, length: int = 20):
+    for _ in range(count):
+        yield " ".join(rng.choices(words, weights, k=length))
+
+async def seed(user_id, args, memory) -> float:
+    """Insert the messages and index their vectors, returning the elapsed seconds"""
+    from datetime import datetime, timedelta
+    from uuid import uuid4
+    from sqlalchemy import insert
+    from database import Conversation, Message, SessionLocal
+
+    rng = random.Random(0)
+    words = vocabulary(args.vocabulary)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    base = datetime(2026, 1, 1)
+    started = time.perf_counter()
+    async with SessionLocal() as db:
+        for offset in range(0, args.messages, args.per_conversation):
+            conversation_id = uuid4()
+            count = min(args.per_conversation, args.messages - offset)
+            await db.execute(insert(Conversation).values(
+                id=conversation_id, user_id=user_id, title=f"conversation {offset}", message_count=count,
+            ))
+            for start in range(0, count, args.batch):
+                n = min(args.batch, count - start)
+                ids = [uuid4() for _ in range(n)]
+                contents = list(sentences(rng, words, weights, n))
+                await db.execute(insert(Message), [
+                    {
+                        "id": message_id,
+                        "conversation_id": conversation_id,
+                        "role": "user",
+                        "content": content,
+                        "token_count": 20,
+                        "created_at": base + timedelta(milliseconds=offset + start + i),
+                    }
+                    for i, (message_id, content) in enumerate(zip(ids, contents))
+                ])
+                await db.commit()
+                if memory is not None:
+                    vectors = await memory.embedder.embed(contents)
+                    await memory.store.upsert(user_id, [str(i) for i in ids], vectors, [str(conversation_id)] * n)
+    if memory is not None:
+        await memory.store.flush()
+    return time.perf_counter() - started
+
+async def main(args):
+    from app.config import settings
+    from memory import get_memory
+
+    settings.MEMORY_ENABLED = args.vectors
+    await create_tables()
+    memory = get_memory()
+
+    rng = random.Random(1)
+    words = vocabulary(args.vocabulary)
+    results = {"messages": args.messages, "vectors": args.vectors, "queries": {}}
+    async with make_client(None) as client:
+        user_id, headers = await register_user(client, "search")
+        results["seed_seconds"] = round(await seed(user_id, args, memory), 1)
+
+        query_sets = {
+            "common_term": lambda: words[rng.randrange(0, 10)],
+            "rare_term": lambda: words[rng.randrange(len(words) // 2, len(words))],
+            "two_terms": lambda: f"{words[rng.randrange(0, 100)]} {words[rng.randrange(100, 1000)]}",
+        }
+        for name, make_query in query_sets.items():
+            results["queries"][name] = await run_load(
+                lambda: client.get(
+                    "/api/conversations/search", params={"q": make_query(), "limit": 20}, headers=headers
+                ),
+                args.concurrency,
+                args.requests,
+            )
+    emit(results, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--per-conversation", type=int, default=1000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--no-vectors", dest="vectors", action="store_false",
+                        help="Full-text only (skip embedding the seeded messages)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
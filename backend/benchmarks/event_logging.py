@@ -0,0 +1,58 @@
+"""Request latency with analytics event logging off and on
+
+Sends chat messages (each records conversation activity) against the fake
+provider with no model latency, so the database work of the request path
+dominates. Runs once without an event buffer and once with one flushing in
+the background, and reports latency plus the buffer's counters.
+
+    python benchmarks/event_logging.py --requests 2000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+
+from _common import create_tables, emit, make_client, register_user, run_load
+
+async def run(args, enabled: bool) -> dict:
+    from analytics import WRITERS, EventBuffer, set_event_buffer
+    from app.config import settings
+    from llm import FakeProvider, set_provider
+
+    set_provider(FakeProvider(tokens_per_second=0, first_token_latency=0, response_tokens=20))
+    settings.ANALYTICS_ENABLED = enabled
+    buffer = EventBuffer(WRITERS, batch_size=args.batch_size, max_delay=args.flush_interval_ms / 1000)
+    set_event_buffer(buffer if enabled else None)
+    if enabled:
+        buffer.start()
+
+    try:
+        async with make_client(None) as client:
+            _, headers = await register_user(client, f"events{int(enabled)}")
+            result = await run_load(
+                lambda: client.post("/api/chat/message", json={"message": "hello"}, headers=headers),
+                args.concurrency,
+                args.requests,
+            )
+        if enabled:
+            await buffer.stop()
+            result["events"] = buffer.stats()
+    finally:
+        set_provider(None)
+        set_event_buffer(None)
+    return result
+
+async def main(args):
+    await create_tables()
+    emit({
+        "logging_off": await run(args, enabled=False),
+        "logging_on": await run(args, enabled=True),
+    }, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-interval-ms", type=int, default=250)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,91 @@
+"""Peak memory and throughput of a streamed conversation export
+
+Seeds one conversation with `--messages` rows (default 500k), then streams
+its export from a local uvicorn server in each format while sampling the
+process RSS. With batched streaming the peak should stay close to the
+baseline regardless of conversation length.
+
+    python benchmarks/export_memory.py --messages 500000 --formats ndjson json markdown
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from _common import create_tables, emit, register_user, seed_thread, serve_app
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_mib() -> float:
+    """Resident set size of this process in MiB (Linux)"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / (1024 * 1024)
+
+async def export_once(client: httpx.AsyncClient, url: str, params: dict, headers: dict) -> dict:
+    """Stream one export to nowhere, sampling RSS while it runs"""
+    samples = []
+    done = asyncio.Event()
+
+    async def sample():
+        while not done.is_set():
+            samples.append(rss_mib())
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample())
+    baseline = rss_mib()
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    async with client.stream("POST", url, params=params, headers=headers) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_raw():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+    elapsed = time.perf_counter() - started
+    done.set()
+    await sampler
+
+    return {
+        "bytes": size,
+        "seconds": round(elapsed, 2),
+        "ttfb_ms": round((first_byte or 0) * 1000, 1),
+        "mib_per_second": round(size / (1024 * 1024) / elapsed, 1) if elapsed else 0.0,
+        "rss_baseline_mib": round(baseline, 1),
+        "rss_peak_mib": round(max(samples + [baseline]), 1),
+        "rss_after_mib": round(rss_mib(), 1),
+    }
+
+async def run(base_url: str, args) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        user_id, headers = await register_user(client, "export")
+
+        started = time.perf_counter()
+        conversation_id = await seed_thread(user_id, args.messages)
+        results = {"messages": args.messages, "seed_seconds": round(time.perf_counter() - started, 1), "exports": {}}
+
+        url = f"/api/conversations/{conversation_id}/export"
+        for fmt in args.formats:
+            results["exports"][fmt] = await export_once(client, url, {"format": fmt}, headers)
+        if args.gzip:
+            results["exports"]["ndjson.gz"] = await export_once(
+                client, url, {"format": "ndjson", "gzip": "true"}, headers
+            )
+        return results
+
+async def main(args):
+    await create_tables()
+    async with serve_app() as base_url:
+        results = await run(base_url, args)
+    emit(results, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500_000)
+    parser.add_argument("--formats", nargs="+", default=["ndjson", "json", "markdown"])
+    parser.add_argument("--gzip", action="store_true", help="Also measure a gzipped NDJSON export")
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
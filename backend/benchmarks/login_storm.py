@@ -0,0 +1,90 @@
+"""Probe latency of /health and /api/auth/me during a login storm
+
+Measures p50/p95/p99 of the probe endpoints at rest and while `--logins`
+concurrent logins are in flight. With hashing on the worker pool the probe
+percentiles should stay flat; storm requests beyond the pool's queue depth
+are answered with 429 and counted separately.
+
+    python benchmarks/login_storm.py --base-url http://localhost:8000 --logins 200
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from _common import create_tables, emit, make_client, summarize
+
+PASSWORD = "BenchmarkPassword123!"
+
+async def probe(client, path, headers, stop: asyncio.Event, interval: float):
+    """Request `path` every `interval` seconds until stopped, collecting latencies"""
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        latencies.append(time.perf_counter() - t0)
+        errors += response.status_code >= 400
+        await asyncio.sleep(interval)
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+async def probe_all(client, headers, duration: float, interval: float, during=None):
+    """Probe /health and /me for `duration` seconds, optionally while `during` runs"""
+    stop = asyncio.Event()
+    probes = [
+        asyncio.create_task(probe(client, "/health", {}, stop, interval)),
+        asyncio.create_task(probe(client, "/api/auth/me", headers, stop, interval)),
+    ]
+    extra = await during if during is not None else await asyncio.sleep(duration)
+    stop.set()
+    health, me = await asyncio.gather(*probes)
+    return {"health": health, "me": me}, extra
+
+async def login_storm(client, email: str, logins: int):
+    """Fire `logins` concurrent logins and tally the status codes"""
+    responses = await asyncio.gather(*(
+        client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+        for _ in range(logins)
+    ))
+    codes = {}
+    for response in responses:
+        codes[response.status_code] = codes.get(response.status_code, 0) + 1
+    return codes
+
+async def main(args):
+    if not args.base_url:
+        await create_tables()
+
+    async with make_client(args.base_url) as client:
+        suffix = uuid4().hex[:8]
+        email = f"storm-{suffix}@example.com"
+        response = await client.post("/api/auth/register", json={
+            "email": email,
+            "username": f"storm-{suffix}",
+            "password": PASSWORD,
+        })
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        idle, _ = await probe_all(client, headers, args.idle_seconds, args.interval)
+        storm_started = time.perf_counter()
+        storm, codes = await probe_all(
+            client, headers, 0, args.interval, during=login_storm(client, email, args.logins)
+        )
+
+    emit({
+        "idle": idle,
+        "storm": storm,
+        "storm_seconds": round(time.perf_counter() - storm_started, 2),
+        "login_status_codes": codes,
+    }, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=None, help="Server URL (default: in-process ASGI app)")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between probe requests")
+    parser.add_argument("--idle-seconds", type=float, default=2.0)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
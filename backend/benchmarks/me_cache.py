@@ -0,0 +1,46 @@
+"""Requests/sec on /api/auth/me with and without the auth caches
+
+Runs in-process against DATABASE_URL, first with the token and user caches
+disabled (every request verifies the JWT and SELECTs the user) and then
+enabled.
+
+    DATABASE_URL=sqlite+aiosqlite:///./bench.db python benchmarks/me_cache.py
+"""
+
+import argparse
+import asyncio
+from uuid import uuid4
+
+from _common import create_tables, emit, make_client, run_load
+
+async def main(args):
+    from auth.cache import cache_stats, token_cache, user_cache
+
+    await create_tables()
+    async with make_client(None) as client:
+        suffix = uuid4().hex[:8]
+        response = await client.post("/api/auth/register", json={
+            "email": f"me-{suffix}@example.com",
+            "username": f"me-{suffix}",
+            "password": "BenchmarkPassword123!",
+        })
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        sizes = (token_cache.maxsize, user_cache.maxsize)
+        token_cache.maxsize = user_cache.maxsize = 0
+        token_cache.clear()
+        user_cache.clear()
+        uncached = await run_load(lambda: client.get("/api/auth/me", headers=headers), args.concurrency, args.requests)
+
+        token_cache.maxsize, user_cache.maxsize = sizes
+        cached = await run_load(lambda: client.get("/api/auth/me", headers=headers), args.concurrency, args.requests)
+
+    emit({"uncached": uncached, "cached": cached, "cache_stats": cache_stats()}, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
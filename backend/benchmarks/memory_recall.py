@@ -0,0 +1,107 @@
+"""Recall and latency of long-term memory search at 100k and 1M vectors per user
+
+Fills one user's partition with clustered synthetic embeddings, then issues
+queries near stored vectors and reports top-k latency and recall@k against
+exact ground truth. The local store scans exactly (recall 1.0 by design);
+pass `--stores local chroma` to measure Chroma's approximate HNSW index on
+the same data (requires chromadb).
+
+    python benchmarks/memory_recall.py --sizes 100000 1000000 --dimensions 256
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from uuid import uuid4
+
+import numpy as np
+
+from _common import emit, percentile
+
+def rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+def batches(size: int, dimensions: int, batch: int, seed: int = 0):
+    """Clustered unit vectors, generated in batches to bound memory"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(size // 1000, 1), dimensions)).astype(np.float32)
+    for start in range(0, size, batch):
+        n = min(batch, size - start)
+        vectors = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.standard_normal((n, dimensions), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        yield start, vectors.astype(np.float32)
+
+async def fill(store, user_id, size: int, dimensions: int, batch: int) -> float:
+    started = time.perf_counter()
+    for start, vectors in batches(size, dimensions, batch):
+        ids = [str(i) for i in range(start, start + len(vectors))]
+        await store.upsert(user_id, ids, vectors, [str(i % 100) for i in range(start, start + len(vectors))])
+    return time.perf_counter() - started
+
+async def measure(store, user_id, queries: np.ndarray, truth, k: int) -> dict:
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        matches = await store.query(user_id, query, k)
+        latencies.append(time.perf_counter() - started)
+        hits += len({m.id for m in matches} & expected)
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        f"recall_at_{k}": round(hits / (k * len(queries)), 4),
+    }
+
+async def main(args):
+    from memory.stores import ChromaVectorStore, LocalVectorStore
+
+    results = {"dimensions": args.dimensions, "k": args.k, "sizes": {}}
+    for size in args.sizes:
+        user_id = uuid4()
+        local = LocalVectorStore(args.dimensions)
+        baseline = rss_mib()
+        insert_seconds = await fill(local, user_id, size, args.dimensions, args.batch)
+
+        # Queries: perturbed copies of random stored vectors; exact top-k as ground truth
+        shard = await local._shard(user_id)
+        rng = np.random.default_rng(1)
+        queries = shard.vectors[rng.integers(0, size, args.queries)] + 0.1 * rng.standard_normal(
+            (args.queries, args.dimensions), dtype=np.float32
+        )
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        truth = []
+        for query in queries:
+            scores = shard.vectors[:size] @ query
+            truth.append({str(i) for i in np.argpartition(-scores, args.k - 1)[:args.k]})
+
+        entry = {
+            "local": {
+                "insert_vectors_per_second": round(size / insert_seconds),
+                "memory_mib": round(rss_mib() - baseline, 1),
+                **await measure(local, user_id, queries, truth, args.k),
+            }
+        }
+        if "chroma" in args.stores:
+            with tempfile.TemporaryDirectory() as directory:
+                chroma = ChromaVectorStore(directory, f"benchmark-{size}")
+                insert_seconds = await fill(chroma, user_id, size, args.dimensions, min(args.batch, 5000))
+                entry["chroma"] = {
+                    "insert_vectors_per_second": round(size / insert_seconds),
+                    **await measure(chroma, user_id, queries, truth, args.k),
+                }
+        results["sizes"][size] = entry
+        del local, shard
+    emit(results, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=10000)
+    parser.add_argument("--stores", nargs="+", default=["local"], choices=["local", "chroma"])
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
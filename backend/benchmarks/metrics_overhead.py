@@ -0,0 +1,74 @@
+"""CPU cost of the metrics instrumentation per request
+
+Drives a trivial ASGI endpoint directly (no HTTP, no server) with and
+without MetricsMiddleware, so the difference is the middleware's own work:
+the in-flight gauge, the latency histogram, the status counter and the
+per-request query count. Also times the single observations used on hot
+paths (JWT decode, bcrypt, DB statements). The overhead is reported as a
+share of the per-request time budget at the target rate (200 us at 5k req/s).
+
+    python benchmarks/metrics_overhead.py --requests 200000 --target-rps 5000
+"""
+
+import argparse
+import asyncio
+import time
+
+from _common import emit
+
+class _Route:
+    path = "/api/items/{item_id}"
+
+async def endpoint(scope, receive, send):
+    scope["route"] = _Route  # As the FastAPI router does
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+async def drive(app, requests: int) -> float:
+    """Seconds per request"""
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "GET", "path": "/api/items/1", "headers": []}, receive, send)
+    return (time.perf_counter() - started) / requests
+
+def per_call(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls
+
+async def main(args):
+    from metrics import DB_QUERIES, JWT_DECODE_SECONDS, PASSWORD_HASH_SECONDS
+    from metrics.middleware import MetricsMiddleware
+
+    await drive(MetricsMiddleware(endpoint), 1000)  # Warm up
+    bare = min([await drive(endpoint, args.requests) for _ in range(args.rounds)])
+    instrumented = min([await drive(MetricsMiddleware(endpoint), args.requests) for _ in range(args.rounds)])
+    overhead = instrumented - bare
+    budget = 1 / args.target_rps
+
+    bcrypt = PASSWORD_HASH_SECONDS.labels("verify_password")
+    emit({
+        "middleware_overhead_us": round(overhead * 1e6, 2),
+        "share_of_budget_pct": round(overhead / budget * 100, 3),
+        "observation_us": {
+            "histogram": round(per_call(lambda: JWT_DECODE_SECONDS.observe(0.0001), args.requests) * 1e6, 3),
+            "labelled_histogram": round(per_call(lambda: bcrypt.observe(0.2), args.requests) * 1e6, 3),
+            "counter": round(per_call(DB_QUERIES.inc, args.requests) * 1e6, 3),
+        },
+        "target_rps": args.target_rps,
+    }, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=3, help="Best of this many runs per variant")
+    parser.add_argument("--target-rps", type=int, default=5000)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
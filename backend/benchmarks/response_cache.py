@@ -0,0 +1,82 @@
+"""send_message latency and provider cost with and without the response cache
+
+Replays a skewed stream of standalone questions, each asked in a few
+wordings (case, whitespace and punctuation variants), against the fake
+provider with a realistic first-token latency. Runs once with the semantic
+response cache disabled and once enabled, and reports latency, the cache
+hit rate and the tokens the cache saved.
+
+    python benchmarks/response_cache.py --questions 200 --requests 1000
+"""
+
+import argparse
+import asyncio
+import random
+
+from _common import create_tables, emit, make_client, register_user, run_load
+
+VARIANTS = (
+    lambda q: q,
+    lambda q: q.lower(),
+    lambda q: q.rstrip("?"),
+    lambda q: q.replace(" ", "  "),
+)
+
+def make_questions(count: int):
+    topics = [f"topic{i}" for i in range(count)]
+    return [f"How do I get started with {topic} in a small project?" for topic in topics]
+
+async def run(args, enabled: bool) -> dict:
+    from cache import get_cache
+    from llm import FakeProvider, set_provider
+    from llm.response_cache import ResponseCache, set_response_cache
+    from memory import HashEmbedder
+
+    provider = FakeProvider(
+        tokens_per_second=args.tokens_per_second,
+        first_token_latency=args.first_token_latency,
+        response_tokens=args.response_tokens,
+    )
+    set_provider(provider)
+    response_cache = ResponseCache(HashEmbedder(256), get_cache(), min_similarity=args.min_similarity)
+    set_response_cache(response_cache if enabled else None)
+
+    rng = random.Random(0)
+    questions = make_questions(args.questions)
+    weights = [1 / (rank + 1) for rank in range(len(questions))]
+
+    def ask(client, headers):
+        question = rng.choice(VARIANTS)(rng.choices(questions, weights)[0])
+        return client.post("/api/chat/message", json={"message": question}, headers=headers)
+
+    try:
+        async with make_client(None) as client:
+            _, headers = await register_user(client, "respcache")
+            await client.put("/api/auth/settings", json={"temperature": 0.0}, headers=headers)
+            result = await run_load(lambda: ask(client, headers), args.concurrency, args.requests)
+    finally:
+        set_provider(None)
+        set_response_cache(None)
+    result["provider_calls"] = provider.completed
+    if enabled:
+        result["cache"] = response_cache.stats()
+    return result
+
+async def main(args):
+    await create_tables()
+    emit({
+        "disabled": await run(args, enabled=False),
+        "enabled": await run(args, enabled=True),
+    }, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200, help="Distinct questions in the pool")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--min-similarity", type=float, default=0.95)
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="0 = whole reply at once")
+    parser.add_argument("--response-tokens", type=int, default=200)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,70 @@
+"""Cold start time: importing app.main and running the lifespan startup
+
+Each sample runs in a fresh interpreter (so nothing is already imported or
+cached in-process) and reports the time to import `app.main` and the time
+for the lifespan to start (schema check, background tasks) and stop. The
+best of --runs is reported, since cold start noise is all on the slow side.
+
+With --budget-ms the script exits non-zero when import plus startup exceeds
+the budget, so CI can fail a change that makes boots slower:
+
+    python benchmarks/startup.py --budget-ms 2500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from _common import emit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def lifespan():
+    async with app.main.lifespan(app.main.app):
+        ready = time.perf_counter()
+    return ready
+
+ready = asyncio.run(lifespan())
+print(json.dumps({"import_ms": (imported - started) * 1000, "startup_ms": (ready - imported) * 1000}))
+"""
+
+def sample(env) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", SAMPLE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main(args):
+    env = dict(os.environ, SCHEMA_CHECK=args.schema_check)
+    samples = [sample(env) for _ in range(args.runs)]
+    best = min(samples, key=lambda s: s["import_ms"] + s["startup_ms"])
+    results = {
+        "schema_check": args.schema_check,
+        "runs": args.runs,
+        "import_ms": round(best["import_ms"], 1),
+        "startup_ms": round(best["startup_ms"], 1),
+        "total_ms": round(best["import_ms"] + best["startup_ms"], 1),
+        "median_total_ms": round(sorted(s["import_ms"] + s["startup_ms"] for s in samples)[len(samples) // 2], 1),
+    }
+    if args.budget_ms is not None:
+        results["budget_ms"] = args.budget_ms
+        results["within_budget"] = results["total_ms"] <= args.budget_ms
+    emit(results, args.output)
+    if not results.get("within_budget", True):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--schema-check", default="revision", choices=["revision", "create", "off"])
+    parser.add_argument("--budget-ms", type=float, default=None, help="Exit 1 if import plus startup exceeds this")
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    main(parser.parse_args())
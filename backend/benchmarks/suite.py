@@ -0,0 +1,249 @@
+"""API benchmark suite: throughput and latency percentiles per endpoint
+
+Seeds --users users, each with --conversations conversations of --messages
+messages, then drives the in-process ASGI app (or a live server with
+--base-url, which must already hold the seeded data's database) with
+--concurrency concurrent clients, one scenario at a time:
+
+    register, login          bcrypt-bound, so they run --auth-requests requests
+    me, settings             authenticated reads (token and user caches)
+    conversations            first page of the conversation list
+    message_window           latest 50 messages of a conversation
+    export                   JSON export of a conversation
+    chat                     POST /api/chat/message, fake LLM with no latency
+
+Each scenario picks a random seeded user (and conversation) per request.
+The JSON output records the commit and parameters next to the results, so
+runs on different commits can be compared:
+
+    python benchmarks/suite.py --output before.json
+    git checkout my-branch
+    python benchmarks/suite.py --output after.json --baseline before.json --threshold 0.15
+
+With --baseline, a scenario regresses when its throughput drops or its p95
+rises by more than --threshold (a fraction), or it has new errors, and the
+script exits 1. `--compare BEFORE AFTER` compares two saved runs without
+running anything.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from _common import create_tables, emit, make_client, run_load
+
+PASSWORD = "BenchmarkPassword123!"
+
+AUTH_SCENARIOS = ("register", "login")
+SCENARIOS = AUTH_SCENARIOS + ("me", "settings", "conversations", "message_window", "export", "chat")
+
+# p95 changes smaller than this are noise, whatever the ratio
+MIN_P95_DELTA_MS = 1.0
+
+async def seed(users: int, conversations: int, messages: int) -> List[Tuple[str, str, List]]:
+    """Insert users with settings, conversations and messages; returns (email, token, conversation ids)"""
+    from datetime import datetime, timedelta
+    from uuid import uuid4
+    from sqlalchemy import insert
+    from auth.security import create_access_token, hash_password
+    from database import Conversation, Message, SessionLocal, User, UserSettings
+
+    password_hash = hash_password(PASSWORD)  # One bcrypt for every seeded user
+    base = datetime(2026, 1, 1)
+    run = uuid4().hex[:8]
+    seeded = []
+    async with SessionLocal() as db:
+        for u in range(users):
+            user_id, email = uuid4(), f"suite-{run}-{u}@example.com"
+            await db.execute(insert(User).values(
+                id=user_id, email=email, username=f"suite-{run}-{u}", password_hash=password_hash,
+            ))
+            await db.execute(insert(UserSettings).values(id=uuid4(), user_id=user_id))
+            conversation_ids = [uuid4() for _ in range(conversations)]
+            await db.execute(insert(Conversation), [
+                {
+                    "id": conversation_id,
+                    "user_id": user_id,
+                    "title": f"Conversation {c}",
+                    "message_count": messages,
+                    "token_count": messages * 60,
+                    "created_at": base + timedelta(hours=c),
+                    "updated_at": base + timedelta(hours=c, minutes=messages),
+                }
+                for c, conversation_id in enumerate(conversation_ids)
+            ])
+            await db.execute(insert(Message), [
+                {
+                    "id": uuid4(),
+                    "conversation_id": conversation_id,
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": f"suite message {i} " + "lorem ipsum dolor sit amet " * 8,
+                    "token_count": 60,
+                    "model_response": i % 2 == 1,
+                    "created_at": base + timedelta(hours=c, minutes=i),
+                }
+                for c, conversation_id in enumerate(conversation_ids)
+                for i in range(messages)
+            ])
+            await db.commit()
+            seeded.append((email, create_access_token(str(user_id)), conversation_ids))
+    return seeded
+
+def scenarios(client, seeded) -> Dict[str, Callable]:
+    """One request factory per scenario"""
+    registrations = itertools.count()
+    run = f"{time.time_ns():x}"
+
+    def user():
+        email, token, conversation_ids = random.choice(seeded)
+        return email, {"Authorization": f"Bearer {token}"}, random.choice(conversation_ids)
+
+    def register():
+        n = next(registrations)
+        return client.post("/api/auth/register", json={
+            "email": f"suite-new-{run}-{n}@example.com", "username": f"suite-new-{run}-{n}", "password": PASSWORD,
+        })
+
+    def login():
+        email, _, _ = user()
+        return client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+
+    def get(path: str, **params):
+        def request():
+            _, headers, conversation_id = user()
+            return client.get(path.format(conversation_id=conversation_id), params=params, headers=headers)
+        return request
+
+    def export():
+        _, headers, conversation_id = user()
+        return client.post(f"/api/conversations/{conversation_id}/export", headers=headers)
+
+    def chat():
+        _, headers, _ = user()
+        return client.post("/api/chat/message", json={"message": "How does this benchmark work?"}, headers=headers)
+
+    return {
+        "register": register,
+        "login": login,
+        "me": get("/api/auth/me"),
+        "settings": get("/api/auth/settings"),
+        "conversations": get("/api/conversations", limit=20),
+        "message_window": get("/api/conversations/{conversation_id}", limit=50),
+        "export": export,
+        "chat": chat,
+    }
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> Dict:
+    """Per-scenario changes between two runs and the scenarios that regressed"""
+    changes, regressions = {}, []
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        rps_change = (now["rps"] - before["rps"]) / before["rps"] if before["rps"] else 0.0
+        p95_change = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        changes[name] = {"rps_change": round(rps_change, 3), "p95_change": round(p95_change, 3)}
+        reasons = []
+        if rps_change < -threshold:
+            reasons.append(f"throughput {before['rps']} -> {now['rps']} req/s")
+        if p95_change > threshold and now["p95_ms"] - before["p95_ms"] > MIN_P95_DELTA_MS:
+            reasons.append(f"p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        if now["errors"] > before["errors"]:
+            reasons.append(f"errors {before['errors']} -> {now['errors']}")
+        if reasons:
+            regressions.append({"scenario": name, "reasons": reasons})
+    return {
+        "baseline_commit": baseline["meta"].get("commit"),
+        "commit": current["meta"].get("commit"),
+        "threshold": threshold,
+        "changes": changes,
+        "regressions": regressions,
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def run(args) -> Dict:
+    from app.config import settings
+    from llm import FakeProvider, set_provider
+
+    if not args.base_url:
+        await create_tables()
+        set_provider(FakeProvider(tokens_per_second=0, first_token_latency=0))
+    random.seed(args.seed)
+    started = time.perf_counter()
+    seeded = await seed(args.users, args.conversations, args.messages)
+    seed_seconds = time.perf_counter() - started
+
+    results = {}
+    async with make_client(args.base_url) as client:
+        requests = scenarios(client, seeded)
+        for name in args.scenarios:
+            total = args.auth_requests if name in AUTH_SCENARIOS else args.requests
+            await run_load(requests[name], args.concurrency, min(total, args.concurrency * 2))  # Warm up
+            results[name] = await run_load(requests[name], args.concurrency, total)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "database": settings.DATABASE_URL.split(":", 1)[0],
+            "target": args.base_url or "in-process",
+            "users": args.users,
+            "conversations_per_user": args.conversations,
+            "messages_per_conversation": args.messages,
+            "seed_seconds": round(seed_seconds, 2),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "auth_requests": args.auth_requests,
+        },
+        "results": results,
+    }
+
+def load_run(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+def main(args):
+    if args.compare:
+        baseline, current = (load_run(path) for path in args.compare)
+    else:
+        current = asyncio.run(run(args))
+        emit(current, args.output)
+        if not args.baseline:
+            return
+        baseline = load_run(args.baseline)
+    comparison = compare(baseline, current, args.threshold)
+    emit(comparison)
+    if comparison["regressions"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=None, help="Live server to drive (default: in-process app)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--conversations", type=int, default=20, help="Per user")
+    parser.add_argument("--messages", type=int, default=40, help="Per conversation")
+    parser.add_argument("--requests", type=int, default=1000, help="Per scenario")
+    parser.add_argument("--auth-requests", type=int, default=100, help="Per register/login scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for user and conversation choice")
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    parser.add_argument("--baseline", default=None, help="Compare with this earlier run; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative change (0.15 = 15%%)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two saved runs")
+    main(parser.parse_args())
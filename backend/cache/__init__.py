@@ -0,0 +1,48 @@
+"""Cache package initialization"""
+
+from typing import Optional
+
+from app.config import settings
+from cache.backends import CacheBackend, InMemoryCache, NullCache, RedisCache
+from cache.invalidation import InvalidationListener
+from cache.local import TTLCache
+from cache.singleflight import SingleFlight
+
+_backend: Optional[CacheBackend] = None
+
+def get_cache() -> CacheBackend:
+    """Return the process-wide shared cache, creating it from settings on first use"""
+    global _backend
+    if _backend is None:
+        if settings.CACHE_BACKEND == "redis":
+            _backend = RedisCache(settings.REDIS_URL, max_connections=settings.REDIS_MAX_CONNECTIONS)
+        elif settings.CACHE_BACKEND == "memory":
+            _backend = InMemoryCache()
+        else:
+            _backend = NullCache()
+    return _backend
+
+def set_cache(backend: Optional[CacheBackend]):
+    """Replace the shared cache (e.g. with an InMemoryCache in tests)"""
+    global _backend
+    _backend = backend
+
+async def close_cache():
+    """Close the shared cache's connections, if one was created"""
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+__all__ = [
+    "CacheBackend",
+    "InMemoryCache",
+    "InvalidationListener",
+    "NullCache",
+    "RedisCache",
+    "SingleFlight",
+    "TTLCache",
+    "get_cache",
+    "set_cache",
+    "close_cache",
+]
@@ -0,0 +1,166 @@
+"""Shared cache backends (Redis in production, in-memory fake for tests)"""
+
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend(ABC):
+    """Byte-oriented key/value cache shared between workers"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return the stored value, or None on a miss"""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: int):
+        """Store a value for `ttl` seconds"""
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        """Remove keys if present"""
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Values for several keys (None for misses), in order"""
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items: Dict[str, bytes], ttl: int):
+        """Store several values for `ttl` seconds"""
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
+    async def publish(self, channel: str, message: bytes):
+        """Broadcast a message to other processes (no-op without a shared server)"""
+
+    async def close(self):
+        """Release connections"""
+
+class InMemoryCache(CacheBackend):
+    """Process-local stand-in for Redis, used in tests and single-process setups"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, float]] = {}
+        self.gets = 0
+        self.sets = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self.gets += 1
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self.sets += 1
+        self._data[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+class RedisCache(CacheBackend):
+    """
+    Async Redis client over a shared connection pool. Redis errors are logged
+    and treated as misses so the database remains the source of truth; after a
+    failure Redis is skipped for `retry_after` seconds to avoid paying a
+    connect timeout on every request while it is down.
+    """
+
+    def __init__(self, url: str, max_connections: int = 50, retry_after: float = 5.0):
+        import redis.asyncio as redis
+
+        self._errors = (redis.RedisError, OSError)
+        self.pool = redis.ConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5,
+        )
+        self.client = redis.Redis(connection_pool=self.pool)
+        self.retry_after = retry_after
+        self._down_until = 0.0
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, operation: str, exc: Exception):
+        logger.warning("Redis %s failed, bypassing cache for %.0fs: %s", operation, self.retry_after, exc)
+        self._down_until = time.monotonic() + self.retry_after
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if not self._available():
+            return None
+        try:
+            return await self.client.get(key)
+        except self._errors as exc:
+            self._failed("get", exc)
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        if not self._available():
+            return
+        try:
+            await self.client.set(key, value, ex=ttl)
+        except self._errors as exc:
+            self._failed("set", exc)
+
+    async def delete(self, *keys: str):
+        if not keys or not self._available():
+            return
+        try:
+            await self.client.delete(*keys)
+        except self._errors as exc:
+            self._failed("delete", exc)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        if not keys or not self._available():
+            return [None] * len(keys)
+        try:
+            return await self.client.mget(list(keys))
+        except self._errors as exc:
+            self._failed("mget", exc)
+            return [None] * len(keys)
+
+    async def set_many(self, items: Dict[str, bytes], ttl: int):
+        if not items or not self._available():
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(key, value, ex=ttl)
+                await pipe.execute()
+        except self._errors as exc:
+            self._failed("pipelined set", exc)
+
+    async def publish(self, channel: str, message: bytes):
+        if not self._available():
+            return
+        try:
+            await self.client.publish(channel, message)
+        except self._errors as exc:
+            self._failed("publish", exc)
+
+    async def close(self):
+        await self.client.aclose()
+        await self.pool.disconnect()
+
+class NullCache(CacheBackend):
+    """Cache that stores nothing (CACHE_BACKEND=none)"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        pass
+
+    async def delete(self, *keys: str):
+        pass
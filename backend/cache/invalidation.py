@@ -0,0 +1,64 @@
+"""Cross-worker eviction of in-process cache entries over Redis pub/sub"""
+
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from cache.backends import RedisCache
+
+logger = logging.getLogger(__name__)
+
+class InvalidationListener:
+    """
+    Applies evictions published on `channel` by any worker to this worker's
+    in-process cache: `evict` gets each message's payload. Messages published
+    while the subscription was down were missed, so `reset` (clear the local
+    cache) runs every time it (re)subscribes.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        evict: Callable[[bytes], None],
+        reset: Callable[[], None],
+        reconnect_delay: float = 1.0,
+    ):
+        self.channel = channel
+        self.evict = evict
+        self.reset = reset
+        self.reconnect_delay = reconnect_delay
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+
+    def start(self):
+        """Subscribe in the background (only with a Redis shared cache)"""
+        from cache import get_cache
+
+        cache = get_cache()
+        if self._task is None and isinstance(cache, RedisCache):
+            self._task = asyncio.create_task(self._run(cache))
+
+    async def _run(self, cache: RedisCache):
+        while True:
+            pubsub = cache.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self.reset()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self.evict(message["data"])
+                        self.received += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Subscription to %s failed, retrying: %s", self.channel, exc)
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                await pubsub.aclose()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
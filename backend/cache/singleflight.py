@@ -0,0 +1,46 @@
+"""Single-flight request coalescing"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """
+    Coalesce concurrent loads of the same key: the first caller runs the
+    loader and every caller that arrives while it is in flight awaits the same
+    result, so a cold key under load costs one backend query per process.
+    If the leading caller is cancelled (client disconnect, timeout) its
+    waiters are not: they retry, and one of them runs the loader.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        while (future := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only the leader's cancellation is retried; our own propagates
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved when nobody else is waiting on it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -1,6 +1,6 @@
 """Database package initialization"""
 
-from database.connection import Base, SessionLocal, engine, get_db
+from database.connection import Base, SessionLocal, engine, get_db, pool_status
 from database.models import (
     User,
     UserSettings,
@@ -16,6 +16,7 @@ __all__ = [
     "SessionLocal",
     "engine",
     "get_db",
+    "pool_status",
     "User",
     "UserSettings",
     "Conversation",
@@ -0,0 +1,94 @@
+"""Backfill token counts for messages written before counts were cached
+
+Walks `messages` in primary-key keyset batches, counts the rows whose
+`token_count` is still 0/NULL with the tokenizer for their conversation's
+model (in a worker thread, batched), writes the counts and adds the
+difference to `Conversation.token_count`. Every batch is its own short
+transaction, so no lock is held for longer than one batch.
+
+    python -m database.backfill_tokens --batch-size 1000 --pause 0.05
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.connection import SessionLocal
+from database.models import Conversation, Message
+from llm.tokenizer import count_tokens_batch
+
+logger = logging.getLogger(__name__)
+
+def _count(rows) -> Dict[UUID, int]:
+    """Token counts by message id, one tokenizer batch per model"""
+    by_model: Dict[str, List] = defaultdict(list)
+    for row in rows:
+        by_model[row.model_used or ""].append(row)
+    counts = {}
+    for model, model_rows in by_model.items():
+        for row, count in zip(model_rows, count_tokens_batch([row.content for row in model_rows], model)):
+            counts[row.id] = count
+    return counts
+
+async def _backfill_batch(db: AsyncSession, after: Optional[UUID], batch_size: int) -> Tuple[Optional[UUID], int]:
+    """Count one batch; returns (last id scanned or None when done, rows updated)"""
+    stmt = (
+        select(Message.id, Message.conversation_id, Message.content, Conversation.model_used)
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .where(or_(Message.token_count.is_(None), Message.token_count == 0))
+    )
+    if after is not None:
+        stmt = stmt.where(Message.id > after)
+    batch = (await db.execute(stmt.order_by(Message.id).limit(batch_size))).all()
+    if not batch:
+        return None, 0
+
+    counts = await asyncio.to_thread(_count, batch)
+    updates = [{"id": message_id, "token_count": count} for message_id, count in counts.items() if count]
+    if updates:
+        await db.execute(update(Message), updates)
+
+        added: Dict[UUID, int] = defaultdict(int)
+        for row in batch:
+            added[row.conversation_id] += counts[row.id]
+        for conversation_id, tokens in added.items():
+            if tokens:
+                await db.execute(
+                    update(Conversation)
+                    .where(Conversation.id == conversation_id)
+                    .values(token_count=Conversation.token_count + tokens)
+                    .execution_options(synchronize_session=False)
+                )
+    await db.commit()
+    return batch[-1].id, len(updates)
+
+async def backfill_token_counts(
+    session_factory: async_sessionmaker = SessionLocal,
+    batch_size: int = 1000,
+    pause: float = 0.0,
+) -> int:
+    """Fill in every missing message token count. Returns the number of messages updated."""
+    updated, after = 0, None
+    while True:
+        async with session_factory() as db:
+            after, done = await _backfill_batch(db, after, batch_size)
+        updated += done
+        if after is None:
+            break
+        await asyncio.sleep(pause)  # Throttle to leave headroom for live traffic
+    logger.info("Backfilled token counts on %d messages", updated)
+    return updated
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill Message.token_count for historical messages")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    args = parser.parse_args()
+    print(f"Backfilled {asyncio.run(backfill_token_counts(batch_size=args.batch_size, pause=args.pause))} messages")
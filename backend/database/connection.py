@@ -1,26 +1,166 @@
 """Database connection and session management"""
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import contextlib
+from typing import Any, Dict
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import NullPool, QueuePool
+
 from app.config import settings
+from metrics import DB_CHECKOUT_SECONDS, DB_POOL_CHECKED_OUT
+from metrics.sql import instrument_engine, timed_pool_class
 
-# Create engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    echo=settings.DEBUG,  # Log SQL queries in debug mode
-)
+# Metric label and pool_status() name of the primary engine (replicas use their own names)
+PRIMARY = "primary"
+
+# Async drivers used by the application for each sync dialect
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """Return the async-driver variant of a database URL (e.g. postgresql -> postgresql+asyncpg)"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None or parsed.get_driver_name() == driver:
+        return url
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+def sync_database_url(url: str) -> str:
+    """Return the sync-driver variant of a database URL (used by Alembic only)"""
+    parsed = make_url(url)
+    if parsed.get_driver_name() != ASYNC_DRIVERS.get(parsed.get_backend_name()):
+        return url
+    return parsed.set(drivername=parsed.get_backend_name()).render_as_string(hide_password=False)
+
+def engine_options(url: URL, engine_name: str = PRIMARY, **overrides) -> Dict[str, Any]:
+    """create_async_engine arguments for `url` from the DB_* settings (`overrides` win)"""
+    pool_class = url.get_dialect().get_pool_class(url)
+    options: Dict[str, Any] = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "echo": settings.DB_ECHO,
+    }
+    if settings.DB_POOL_SIZE <= 0:
+        pool_class = NullPool
+    elif issubclass(pool_class, QueuePool):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        )
+    options["poolclass"] = timed_pool_class(pool_class, engine_name)
+    if settings.DB_PGBOUNCER and url.get_backend_name() == "postgresql":
+        # A transaction-pooling proxy hands each transaction a different server
+        # connection, where our named prepared statements do not exist
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    options.update(overrides)
+    return options
+
+# Create async engine (the sync engine is only built by Alembic in alembic/env.py)
+_url = make_url(async_database_url(settings.DATABASE_URL))
+engine = create_async_engine(_url, **engine_options(_url))
+instrument_engine(engine, PRIMARY)
+
+class RoutingSession(Session):
+    """
+    Sends reads to the replica engine in `info["replica"]` when one is set
+    (see database.replicas); flushes, DML, and every statement after the
+    session first wrote, go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if (
+            replica is None
+            or self._flushing
+            or self.info.get("wrote")
+            or clause is None
+            or not clause.is_select
+        ):
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        return replica.sync_engine
+
+def _note_write(session: Session):
+    # "wrote" pins the session to the primary; "uncommitted_write" is cleared by the commit that publishes it
+    session.info["wrote"] = session.info["uncommitted_write"] = True
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _note_dml(orm_execute_state):
+    if not orm_execute_state.is_select:
+        _note_write(orm_execute_state.session)
+
+@event.listens_for(RoutingSession, "after_flush")
+def _note_flush(session, flush_context):
+    _note_write(session)
 
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,  # Keep loaded attributes usable after commit without a refresh query
+)
 
 # Base for all models
 Base = declarative_base()
 
-def get_db():
+async def get_db():
     """Dependency for FastAPI to get database session"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+async def warm_pool(connections: int) -> int:
+    """Open up to `connections` pooled connections now, so early requests don't pay for connecting"""
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return 0
+    count = min(connections, pool.size())
+    async with contextlib.AsyncExitStack() as stack:
+        for _ in range(count):
+            await stack.enter_async_context(engine.connect())
+    return count
+
+def engine_pool_status(bind: AsyncEngine, engine_name: str) -> Dict[str, Any]:
+    """Live connection pool state of one engine, with the checkout wait distribution"""
+    pool = bind.sync_engine.pool
+    status: Dict[str, Any] = {
+        "engine": engine_name,
+        "pool": type(pool).__name__,
+        "checked_out": DB_POOL_CHECKED_OUT.labels(engine_name).value,
+        "pre_ping": settings.DB_POOL_PRE_PING,
+        "pgbouncer": settings.DB_PGBOUNCER,
+    }
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            idle=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            timeout_seconds=pool.timeout(),
+            recycle_seconds=settings.DB_POOL_RECYCLE_SECONDS,
+        )
+    status["checkout_wait"] = DB_CHECKOUT_SECONDS.snapshot(engine_name)
+    return status
+
+def pool_status() -> Dict[str, Any]:
+    """Pool state of this worker's primary engine, with each read replica's in `replicas`"""
+    from database.replicas import get_replicas
+
+    status = engine_pool_status(engine, PRIMARY)
+    replicas = get_replicas()
+    status["replicas"] = [
+        engine_pool_status(replica.engine, replica.name)
+        for replica in (replicas.replicas if replicas is not None else ())
+    ]
+    return status
@@ -0,0 +1,163 @@
+"""Conversation queries"""
+
+from typing import AsyncIterator, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Conversation, Message
+from database.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+# Columns needed by the conversation list (no summary/system prompt text)
+LIST_COLUMNS = (
+    Conversation.id,
+    Conversation.title,
+    Conversation.is_pinned,
+    Conversation.is_archived,
+    Conversation.message_count,
+    Conversation.created_at,
+    Conversation.updated_at,
+)
+
+async def list_user_conversations(
+    db: AsyncSession,
+    user_id: UUID,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    archived: bool = False,
+) -> Tuple[List[Row], Optional[str]]:
+    """
+    One page of a user's conversations, pinned first, then most recently
+    updated. Uses keyset pagination on (is_pinned, updated_at, id) so every
+    page is an index range scan on ix_conversations_user_listing regardless
+    of depth. Returns the rows and the cursor for the next page (None at the
+    end).
+    """
+    stmt = select(*LIST_COLUMNS).where(
+        Conversation.user_id == user_id,
+        Conversation.is_archived == archived,
+    )
+
+    after = decode_cursor(cursor, 3)
+    if after is not None:
+        stmt = stmt.where(
+            tuple_(Conversation.is_pinned, Conversation.updated_at, Conversation.id) < tuple_(*after)
+        )
+
+    stmt = stmt.order_by(
+        Conversation.is_pinned.desc(),
+        Conversation.updated_at.desc(),
+        Conversation.id.desc(),
+    ).limit(limit + 1)
+
+    rows = list((await db.execute(stmt)).all())
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.is_pinned, last.updated_at, last.id)
+    return rows, next_cursor
+
+async def get_user_conversation(db: AsyncSession, conversation_id: UUID, user_id: UUID) -> Optional[Row]:
+    """A conversation's list columns, only if it belongs to the user"""
+    result = await db.execute(
+        select(*LIST_COLUMNS).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == user_id,
+        )
+    )
+    return result.one_or_none()
+
+# Columns returned when opening a conversation (no embedding_id/model_response)
+WINDOW_COLUMNS = (
+    Message.id,
+    Message.role,
+    Message.content,
+    Message.token_count,
+    Message.is_liked,
+    Message.created_at,
+)
+
+async def get_message_window(
+    db: AsyncSession,
+    conversation_id: UUID,
+    limit: int = 50,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> Tuple[List[Row], Optional[str], Optional[str]]:
+    """
+    A bounded window of a conversation's messages in chronological order:
+    the latest `limit` messages, or the `limit` messages immediately before
+    or after a message cursor. Each read is a range scan of at most
+    `limit + 1` rows on ix_messages_conversation_window, so opening a
+    100k-message thread costs the same as a 10-message one.
+
+    Returns the rows plus cursors for older and newer messages (None when
+    there are none in that direction).
+    """
+    if before and after:
+        raise InvalidCursor("before and after are mutually exclusive")
+
+    key = tuple_(Message.created_at, Message.id)
+    stmt = select(*WINDOW_COLUMNS).where(Message.conversation_id == conversation_id)
+
+    if after:
+        stmt = stmt.where(key > tuple_(*decode_cursor(after, 2)))
+        stmt = stmt.order_by(Message.created_at, Message.id).limit(limit + 1)
+        rows = list((await db.execute(stmt)).all())
+        has_older, has_newer = True, len(rows) > limit
+        rows = rows[:limit]
+    else:
+        if before:
+            stmt = stmt.where(key < tuple_(*decode_cursor(before, 2)))
+        stmt = stmt.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+        rows = list((await db.execute(stmt)).all())
+        has_older, has_newer = len(rows) > limit, before is not None
+        rows = rows[:limit][::-1]
+
+    if not rows:
+        return rows, None, None
+    older = encode_cursor(rows[0].created_at, rows[0].id) if has_older else None
+    newer = encode_cursor(rows[-1].created_at, rows[-1].id) if has_newer else None
+    return rows, older, newer
+
+# Columns written by exports
+EXPORT_COLUMNS = (
+    Message.id,
+    Message.role,
+    Message.content,
+    Message.token_count,
+    Message.created_at,
+)
+
+async def stream_conversation_messages(
+    db: AsyncSession,
+    conversation_id: UUID,
+    batch_size: int = 1000,
+) -> AsyncIterator[Row]:
+    """
+    Yield a conversation's messages in order without materializing the
+    thread: rows are fetched through a server-side cursor `batch_size` at a
+    time instead of loading `Conversation.messages`.
+    """
+    result = await db.stream(
+        select(*EXPORT_COLUMNS)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.created_at, Message.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for row in result:
+        yield row
+
+async def stream_user_conversations(db: AsyncSession, user_id: UUID) -> AsyncIterator[Row]:
+    """Yield all of a user's conversations (list columns) oldest first"""
+    result = await db.stream(
+        select(*LIST_COLUMNS)
+        .where(Conversation.user_id == user_id)
+        .order_by(Conversation.created_at, Conversation.id)
+        .execution_options(yield_per=500)
+    )
+    async for row in result:
+        yield row
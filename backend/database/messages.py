@@ -0,0 +1,72 @@
+"""Message persistence helpers"""
+
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Conversation, Message
+
+# (role, content, token_count) for add_messages
+NewMessage = Tuple[str, str, int]
+
+async def add_messages(
+    db: AsyncSession,
+    conversation_id: UUID,
+    messages: Iterable[NewMessage],
+    message_ids: Optional[List[UUID]] = None,
+) -> List[Message]:
+    """
+    Insert messages and bump the conversation's denormalized counters in the
+    same transaction (the caller commits). The counters are incremented in
+    SQL (`message_count = message_count + n`) so concurrent writers never
+    lose updates and listing never has to aggregate over `messages`.
+    """
+    now = datetime.utcnow()
+    rows = []
+    for i, (role, content, token_count) in enumerate(messages):
+        message = Message(
+            conversation_id=conversation_id,
+            role=role,
+            content=content,
+            token_count=token_count,
+            model_response=role == "assistant",
+            # Distinct timestamps keep (created_at, id) ordering stable within a batch
+            created_at=now + timedelta(microseconds=i),
+        )
+        if message_ids is not None:
+            message.id = message_ids[i]
+        db.add(message)
+        rows.append(message)
+
+    # Flush so a conversation created in this transaction exists before the UPDATE
+    await db.flush()
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(
+            message_count=Conversation.message_count + len(rows),
+            token_count=Conversation.token_count + sum(m.token_count for m in rows),
+            updated_at=now,
+        )
+    )
+    return rows
+
+async def add_message(
+    db: AsyncSession,
+    conversation_id: UUID,
+    role: str,
+    content: str,
+    token_count: int = 0,
+    message_id: Optional[UUID] = None,
+) -> Message:
+    """Insert one message and update the conversation counters (the caller commits)"""
+    rows = await add_messages(
+        db,
+        conversation_id,
+        [(role, content, token_count)],
+        message_ids=[message_id] if message_id is not None else None,
+    )
+    return rows[0]
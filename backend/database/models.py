@@ -2,18 +2,21 @@
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, Float, ForeignKey, Text, JSON
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, Float, ForeignKey, Index, Text, JSON, Uuid
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects import postgresql
 import uuid
 
 from database.connection import Base
 
+# Native UUID/JSONB on PostgreSQL, portable fallbacks elsewhere (SQLite in tests)
+JSONB = JSON().with_variant(postgresql.JSONB(), "postgresql")
+
 class User(Base):
     """User account model"""
     __tablename__ = "users"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     email = Column(String(255), unique=True, nullable=False, index=True)
     username = Column(String(100), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
@@ -36,8 +39,8 @@ class UserSettings(Base):
     """User preferences and configuration"""
     __tablename__ = "user_settings"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, unique=True, index=True)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False, unique=True, index=True)
     
     # LLM Preferences
     preferred_model = Column(String(100), default="gpt-4", nullable=False)
@@ -68,10 +71,13 @@ class Conversation(Base):
     """Conversation/Chat thread"""
     __tablename__ = "conversations"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False, index=True)
     title = Column(String(255), nullable=True)  # Auto-generated from first message if null
     summary = Column(Text, nullable=True)
+    # Last message folded into `summary`, as a (created_at, id) position
+    summary_through_at = Column(DateTime, nullable=True)
+    summary_through_id = Column(Uuid, nullable=True)
     
     # Context
     system_prompt = Column(Text, nullable=True)
@@ -93,6 +99,14 @@ class Conversation(Base):
     user = relationship("User", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Serves keyset pagination of a user's conversation list
+        Index(
+            "ix_conversations_user_listing",
+            user_id, is_archived, is_pinned.desc(), updated_at.desc(), id.desc(),
+        ),
+    )
+
     def __repr__(self):
         return f"<Conversation {self.id} - {self.title}>"
 
@@ -100,8 +114,8 @@ class Message(Base):
     """Individual message in a conversation"""
     __tablename__ = "messages"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), nullable=False, index=True)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    conversation_id = Column(Uuid, ForeignKey("conversations.id"), nullable=False, index=True)
     
     # Content
     role = Column(String(20), nullable=False)  # "user", "assistant", "system"
@@ -124,6 +138,14 @@ class Message(Base):
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
 
+    # PostgreSQL also has a generated `search_vector` tsvector column with a
+    # GIN index (migration 005), queried through database.search
+
+    __table_args__ = (
+        # Serves windowed reads of a thread (latest N, before/after a message)
+        Index("ix_messages_conversation_window", conversation_id, created_at, id),
+    )
+
     def __repr__(self):
         return f"<Message {self.id} - {self.role}>"
 
@@ -131,11 +153,12 @@ class APIKey(Base):
     """User API keys for extension/external access"""
     __tablename__ = "api_keys"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False, index=True)
     
     name = Column(String(255), nullable=False)
-    key_hash = Column(String(255), nullable=False, unique=True)
+    prefix = Column(String(16), nullable=True, unique=True, index=True)  # Public part of the key, used for lookup
+    key_hash = Column(String(255), nullable=False, unique=True)  # HMAC-SHA256 of the full key
     
     # Permissions (stored as JSON)
     permissions = Column(JSONB, default=dict, nullable=False)  # e.g., {"read": True, "write": True}
@@ -146,7 +169,7 @@ class APIKey(Base):
     
     # Status
     is_active = Column(Boolean, default=True, index=True)
-    last_used_at = Column(DateTime, nullable=True)
+    last_used_at = Column(DateTime, nullable=True)  # Written in batches, so up to a minute stale
     
     created_at = Column(DateTime, default=datetime.utcnow)
     expires_at = Column(DateTime, nullable=True)  # None = never expires
@@ -161,8 +184,8 @@ class ConversationMetadata(Base):
     """Extended metadata and tags for conversations"""
     __tablename__ = "conversation_metadata"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), nullable=False, unique=True, index=True)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    conversation_id = Column(Uuid, ForeignKey("conversations.id"), nullable=False, unique=True, index=True)
     
     # Tags for organization
     tags = Column(JSON, default=list, nullable=False)  # e.g., ["important", "project-x"]
@@ -184,8 +207,8 @@ class SessionLog(Base):
     """Session tracking for analytics"""
     __tablename__ = "session_logs"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False, index=True)
     
     session_token = Column(String(255), unique=True, nullable=False)
     ip_address = Column(String(45), nullable=True)  # IPv4 or IPv6
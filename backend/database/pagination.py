@@ -0,0 +1,43 @@
+"""Opaque keyset-pagination cursors"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+from uuid import UUID
+
+class InvalidCursor(ValueError):
+    """Raised when a client-supplied cursor cannot be decoded"""
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort-key values of the last row on a page as an opaque token"""
+    def convert(value):
+        if isinstance(value, datetime):
+            return {"dt": value.isoformat()}
+        if isinstance(value, UUID):
+            return {"uuid": str(value)}
+        return value
+
+    raw = json.dumps([convert(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """Decode a cursor produced by encode_cursor with `size` sort-key values"""
+    if not cursor:
+        return None
+
+    def convert(value):
+        if isinstance(value, dict) and "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if isinstance(value, dict) and "uuid" in value:
+            return UUID(value["uuid"])
+        return value
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = [convert(v) for v in json.loads(raw)]
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("Malformed cursor") from exc
+    if len(values) != size:
+        raise InvalidCursor("Malformed cursor")
+    return values
@@ -0,0 +1,136 @@
+"""Repair drift in denormalized conversation counters
+
+`Conversation.message_count` / `token_count` are maintained incrementally by
+`database.messages.add_messages`. Anything that bypasses it (manual SQL,
+deletes, backfills) can make them drift; this job walks conversations in
+keyset batches, compares the counters with the real aggregates and repairs
+the ones that differ.
+
+Run it as one scheduled job (e.g. cron), not from every API worker:
+
+    python -m database.reconcile --batch-size 500
+
+The in-process loop (COUNTER_RECONCILE_INTERVAL_SECONDS, off by default)
+takes a Postgres advisory lock before each run, so with several workers or
+replicas of the API only one of them scans at a time.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from database.connection import SessionLocal, engine
+from database.models import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key shared by every process that runs the periodic job
+RECONCILE_LOCK_ID = 0x636F756E74657273  # "counters"
+
+def _aggregates(conversation_ids):
+    return (
+        select(
+            Message.conversation_id,
+            func.count(Message.id).label("message_count"),
+            func.coalesce(func.sum(Message.token_count), 0).label("token_count"),
+        )
+        .where(Message.conversation_id.in_(conversation_ids))
+        .group_by(Message.conversation_id)
+    )
+
+async def _reconcile_batch(db: AsyncSession, after: Optional[UUID], batch_size: int):
+    """Check one batch; returns (last id in batch or None when done, rows repaired)"""
+    stmt = select(Conversation.id, Conversation.message_count, Conversation.token_count)
+    if after is not None:
+        stmt = stmt.where(Conversation.id > after)
+    batch = (await db.execute(stmt.order_by(Conversation.id).limit(batch_size))).all()
+    if not batch:
+        return None, 0
+
+    ids = [row.id for row in batch]
+    actual = {row.conversation_id: row for row in (await db.execute(_aggregates(ids))).all()}
+    drifted = [
+        row.id for row in batch
+        if (row.message_count or 0, row.token_count or 0) != (
+            actual[row.id].message_count if row.id in actual else 0,
+            actual[row.id].token_count if row.id in actual else 0,
+        )
+    ]
+
+    if drifted:
+        # Lock the drifted rows first, then recount: writers increment counters
+        # under the same row lock, so nothing committed after the recount is lost.
+        await db.execute(select(Conversation.id).where(Conversation.id.in_(drifted)).with_for_update())
+        recounted = {row.conversation_id: row for row in (await db.execute(_aggregates(drifted))).all()}
+        for conversation_id in drifted:
+            row = recounted.get(conversation_id)
+            await db.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation_id)
+                .values(
+                    message_count=row.message_count if row else 0,
+                    token_count=row.token_count if row else 0,
+                )
+                .execution_options(synchronize_session=False)
+            )
+    await db.commit()
+    return ids[-1], len(drifted)
+
+async def reconcile_conversation_counters(
+    session_factory: async_sessionmaker = SessionLocal,
+    batch_size: int = 500,
+) -> int:
+    """Repair every drifted conversation, one short transaction per batch. Returns the number repaired."""
+    repaired, after = 0, None
+    while True:
+        async with session_factory() as db:
+            after, fixed = await _reconcile_batch(db, after, batch_size)
+        repaired += fixed
+        if after is None:
+            break
+        await asyncio.sleep(0)  # Yield between batches when running inside the API process
+    if repaired:
+        logger.warning("Repaired counters on %d conversations", repaired)
+    return repaired
+
+@asynccontextmanager
+async def leader_lock(bind: AsyncEngine, lock_id: int) -> AsyncIterator[bool]:
+    """
+    Yields whether this process won the job: on Postgres, whether it holds
+    the session advisory lock `lock_id` (released on exit, or if the
+    connection drops); other databases have no competing processes.
+    """
+    if bind.dialect.name != "postgresql":
+        yield True
+        return
+    async with bind.connect() as conn:
+        acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id})
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id})
+
+async def run_periodically(interval: float, batch_size: int = 500):
+    """Background loop used by the API process (see COUNTER_RECONCILE_INTERVAL_SECONDS)"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with leader_lock(engine, RECONCILE_LOCK_ID) as leader:
+                if leader:
+                    await reconcile_conversation_counters(batch_size=batch_size)
+        except Exception:
+            logger.exception("Counter reconciliation failed")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Repair conversation message/token counters")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    print(f"Repaired {asyncio.run(reconcile_conversation_counters(batch_size=args.batch_size))} conversations")
@@ -0,0 +1,233 @@
+"""Read-replica routing
+
+Read-only endpoints take their session from `read_session()`, which binds
+reads to a replica picked round-robin among the healthy ones whose
+replication lag is within REPLICA_MAX_LAG_SECONDS, and falls back to the
+primary when none qualifies. Writes always go to the primary, even from a
+replica-bound session (`RoutingSession.get_bind`), and once a session has
+written, its later reads follow to the primary too.
+
+Read-your-writes: committing a write through a session tagged with a user
+(`session.info["user_id"]`, set by get_current_user) marks that user as a
+recent writer for READ_YOUR_WRITES_SECONDS, both in this worker and in the
+shared cache so the other workers see it; a recent writer's reads go to the
+primary.
+
+A background task probes every replica each REPLICA_HEALTH_INTERVAL_SECONDS
+(`SELECT 1`, plus the replay lag on Postgres); a replica that fails a probe
+or a query is skipped until a later probe succeeds.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.config import settings
+from cache import TTLCache, get_cache
+from database.connection import RoutingSession, SessionLocal, async_database_url, engine_options
+from metrics.sql import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+RECENT_WRITE_KEY = "rw:{}"
+
+# Seconds behind the primary; 0 when caught up (an idle primary's replay timestamp ages without real lag)
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+_replicas: Optional["ReplicaSet"] = None
+
+@event.listens_for(RoutingSession, "after_commit")
+def _note_commit(session):
+    if session.info.pop("uncommitted_write", False) and session.info.get("user_id") is not None:
+        recent_writes.mark(session.info["user_id"])
+
+class RecentWrites:
+    """Users who wrote within the read-your-writes window (local and shared)"""
+
+    def __init__(self, window: float, maxsize: int = 100000):
+        self.window = window
+        self._local = TTLCache(maxsize=maxsize, ttl=max(window, 0.001))
+        self._publishing: Set[asyncio.Task] = set()
+
+    def mark(self, user_id: UUID):
+        if self.window <= 0:
+            return
+        self._local.set(user_id, True)
+        # after_commit runs synchronously inside the commit; publish in the background
+        try:
+            task = asyncio.get_running_loop().create_task(
+                get_cache().set(RECENT_WRITE_KEY.format(user_id), b"1", max(1, round(self.window)))
+            )
+        except RuntimeError:
+            return
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    async def wrote_recently(self, user_id: UUID) -> bool:
+        if self.window <= 0:
+            return False
+        if self._local.get(user_id):
+            return True
+        return await get_cache().get(RECENT_WRITE_KEY.format(user_id)) is not None
+
+    def clear(self):
+        self._local.clear()
+
+recent_writes = RecentWrites(settings.READ_YOUR_WRITES_SECONDS)
+
+@dataclass
+class Replica:
+    name: str
+    engine: AsyncEngine
+    healthy: bool = True
+    lag_seconds: float = 0.0
+    checked_at: float = 0.0
+    reads: int = 0
+    error: Optional[str] = None
+
+class ReplicaSet:
+    """Round-robin over healthy replicas that are within the lag limit"""
+
+    def __init__(self, engines: Dict[str, AsyncEngine], max_lag: float = 5.0, check_interval: float = 5.0):
+        self.replicas = [Replica(name, engine) for name, engine in engines.items()]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self.fallbacks = 0
+        for replica in self.replicas:
+            instrument_engine(replica.engine, replica.name)
+            event.listen(replica.engine.sync_engine, "handle_error", self._on_error(replica))
+
+    def _on_error(self, replica: Replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                replica.healthy = False
+                replica.error = str(context.original_exception)
+        return handle_error
+
+    def choose(self) -> Optional[Replica]:
+        """The next usable replica, or None (reads then go to the primary)"""
+        # Rotate over the eligible replicas only, so skipping one does not double its neighbour's share
+        eligible = [replica for replica in self.replicas if replica.healthy and replica.lag_seconds <= self.max_lag]
+        if not eligible:
+            self.fallbacks += 1
+            return None
+        replica = eligible[next(self._next) % len(eligible)]
+        replica.reads += 1
+        return replica
+
+    async def check(self):
+        """Probe every replica's health and lag"""
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _check(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as conn:
+                if replica.engine.dialect.name == "postgresql":
+                    lag = await conn.scalar(POSTGRES_LAG_QUERY)
+                else:
+                    await conn.execute(text("SELECT 1"))
+                    lag = 0
+            replica.lag_seconds = float(lag or 0)
+            replica.healthy = True
+            replica.error = None
+        except Exception as exc:
+            if replica.healthy:
+                logger.warning("Read replica %s failed its health check: %s", replica.name, exc)
+            replica.healthy = False
+            replica.error = str(exc)
+        replica.checked_at = time.time()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def dispose(self):
+        await self.stop()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "fallbacks": self.fallbacks,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "lag_seconds": replica.lag_seconds,
+                    "reads": replica.reads,
+                    "error": replica.error,
+                }
+                for replica in self.replicas
+            ],
+        }
+
+def get_replicas() -> Optional[ReplicaSet]:
+    """The process-wide replica set, or None without DATABASE_REPLICA_URLS"""
+    global _replicas
+    if _replicas is None and settings.DATABASE_REPLICA_URLS:
+        engines = {}
+        for index, url in enumerate(settings.DATABASE_REPLICA_URLS):
+            parsed = make_url(async_database_url(url))
+            name = f"replica{index}:{parsed.host or parsed.database}"
+            engines[name] = create_async_engine(parsed, **engine_options(parsed, name))
+        _replicas = ReplicaSet(
+            engines,
+            max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+            check_interval=settings.REPLICA_HEALTH_INTERVAL_SECONDS,
+        )
+    return _replicas
+
+def set_replicas(replicas: Optional[ReplicaSet]):
+    """Replace the process-wide replica set (tests and benchmarks)"""
+    global _replicas
+    _replicas = replicas
+
+def start_replicas():
+    """Start replica health checks (called from the app lifespan)"""
+    replicas = get_replicas()
+    if replicas is not None:
+        replicas.start()
+
+async def close_replicas():
+    global _replicas
+    if _replicas is not None:
+        await _replicas.dispose()
+        _replicas = None
+
+@asynccontextmanager
+async def read_session(user_id: Optional[UUID] = None) -> AsyncIterator[AsyncSession]:
+    """A session whose reads go to a replica, unless none is usable or `user_id` wrote recently"""
+    replicas = get_replicas()
+    replica = None
+    if replicas is not None and not (user_id is not None and await recent_writes.wrote_recently(user_id)):
+        replica = replicas.choose()
+    info = {"user_id": user_id}
+    if replica is not None:
+        info["replica"] = replica.engine
+    async with SessionLocal(info=info) as db:
+        yield db
@@ -0,0 +1,52 @@
+"""Startup schema check
+
+Alembic owns the schema. Instead of running `create_all` (catalog queries
+for every table, per worker, racing migrations), startup reads the one row
+of `alembic_version` and compares it with SCHEMA_REVISION, the head
+revision this code was written against. Bump SCHEMA_REVISION with every
+new migration (tests/test_schema.py checks it matches the migrations).
+"""
+
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database.connection import Base
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_REVISION = "006_api_key_prefix"
+
+async def database_revision(engine: AsyncEngine) -> Optional[str]:
+    """The revision the database was migrated to, or None if it was never stamped"""
+    async with engine.connect() as conn:
+        try:
+            return await conn.scalar(text("SELECT version_num FROM alembic_version"))
+        except DBAPIError:
+            return None
+
+async def prepare_schema(engine: AsyncEngine, mode: str) -> Optional[str]:
+    """
+    Apply the SCHEMA_CHECK startup mode: "revision" warns when the database
+    is not at SCHEMA_REVISION, "create" runs create_all (throwaway
+    development databases), "off" does nothing. Returns the revision found.
+    """
+    if mode == "off":
+        return None
+    if mode == "create":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        return None
+    if mode != "revision":
+        raise ValueError(f"Unknown SCHEMA_CHECK mode {mode!r}, expected revision, create or off")
+
+    revision = await database_revision(engine)
+    if revision != SCHEMA_REVISION:
+        logger.warning(
+            "Database schema is at %s but this build expects %s; run `alembic upgrade head`",
+            revision or "no revision", SCHEMA_REVISION,
+        )
+    return revision
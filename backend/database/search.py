@@ -0,0 +1,89 @@
+"""Full-text search over a user's messages"""
+
+import re
+from typing import List, Sequence
+from uuid import UUID
+
+from sqlalchemy import and_, desc, func, literal_column, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Conversation, Message
+
+# Text search configuration of the generated messages.search_vector column
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+
+# Generated by migration 005 on PostgreSQL only, so it is not mapped on Message
+search_vector = literal_column("messages.search_vector", type_=postgresql.TSVECTOR)
+
+# Columns returned for each search hit
+HIT_COLUMNS = (
+    Message.id,
+    Message.conversation_id,
+    Message.role,
+    Message.content,
+    Message.created_at,
+    Conversation.title.label("conversation_title"),
+)
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+def query_terms(query: str) -> List[str]:
+    """Lowercased words of a search query, without duplicates"""
+    return list(dict.fromkeys(word.lower() for word in _TERM.findall(query)))
+
+async def fulltext_search(
+    db: AsyncSession,
+    user_id: UUID,
+    query: str,
+    limit: int = 50,
+    max_matches: int = 5000,
+) -> List[UUID]:
+    """
+    Ids of the user's messages matching `query`, best first.
+
+    On PostgreSQL the query (web search syntax: quoted phrases, `or`, `-`)
+    is matched against the GIN-indexed search_vector, restricted to the
+    user's conversations by joining on messages.conversation_id. At most
+    `max_matches` matching rows are ranked, which bounds the cost of very
+    common terms in large histories. Other databases (SQLite in tests) fall
+    back to a case-insensitive substring match of every term, newest first.
+    """
+    if db.bind.dialect.name == "postgresql":
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        matches = (
+            select(Message.id, search_vector.label("document"))
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Conversation.user_id == user_id, search_vector.op("@@")(tsquery))
+            .limit(max_matches)
+            .subquery()
+        )
+        rank = func.ts_rank_cd(matches.c.document, tsquery).label("rank")
+        stmt = select(matches.c.id, rank).order_by(desc("rank")).limit(limit)
+    else:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        stmt = (
+            select(Message.id)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(
+                Conversation.user_id == user_id,
+                and_(*[Message.content.icontains(term, autoescape=True) for term in terms]),
+            )
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(limit)
+        )
+    return list((await db.scalars(stmt)).all())
+
+async def load_hits(db: AsyncSession, user_id: UUID, message_ids: Sequence[UUID]) -> List[Row]:
+    """Hit columns for the given messages, only those in the user's conversations"""
+    if not message_ids:
+        return []
+    result = await db.execute(
+        select(*HIT_COLUMNS)
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .where(Message.id.in_(message_ids), Conversation.user_id == user_id)
+    )
+    return list(result.all())
@@ -0,0 +1,77 @@
+"""LLM provider package initialization"""
+
+from typing import Optional
+
+from app.config import settings
+from llm.base import Completion, LLMProvider, PromptMessages, ProviderError
+from llm.fake import FakeProvider
+from llm.http_providers import AnthropicProvider, OpenAIProvider
+from llm.registry import ProviderRegistry
+
+_provider: Optional[LLMProvider] = None
+
+def build_registry() -> ProviderRegistry:
+    """Create the provider registry from settings"""
+    registry = ProviderRegistry(
+        default_provider=settings.LLM_DEFAULT_PROVIDER,
+        fallback_models=settings.LLM_FALLBACK_MODELS,
+        timeout=settings.LLM_REQUEST_TIMEOUT,
+        hedge_after=settings.LLM_HEDGE_AFTER_SECONDS,
+    )
+    providers = [
+        FakeProvider(
+            tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+            first_token_latency=settings.FAKE_LLM_FIRST_TOKEN_LATENCY,
+            response_tokens=settings.FAKE_LLM_RESPONSE_TOKENS,
+        )
+    ]
+    if settings.OPENAI_API_KEY:
+        providers.append(OpenAIProvider(
+            settings.OPENAI_API_KEY, settings.OPENAI_BASE_URL, timeout=settings.LLM_REQUEST_TIMEOUT
+        ))
+    if settings.ANTHROPIC_API_KEY:
+        providers.append(AnthropicProvider(
+            settings.ANTHROPIC_API_KEY, settings.ANTHROPIC_BASE_URL, timeout=settings.LLM_REQUEST_TIMEOUT
+        ))
+    for provider in providers:
+        registry.register(
+            provider,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY.get(provider.name, 64),
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE.get(provider.name, 0),
+        )
+    return registry
+
+def get_provider() -> LLMProvider:
+    """Dependency returning the process-wide provider registry"""
+    global _provider
+    if _provider is None:
+        _provider = build_registry()
+    return _provider
+
+def set_provider(provider: Optional[LLMProvider]):
+    """Replace the process-wide provider (tests and benchmarks)"""
+    global _provider
+    _provider = provider
+
+async def close_provider():
+    """Close pooled provider clients, if the registry was created"""
+    global _provider
+    close = getattr(_provider, "aclose", None)
+    if close is not None:
+        await close()
+    _provider = None
+
+__all__ = [
+    "AnthropicProvider",
+    "Completion",
+    "FakeProvider",
+    "LLMProvider",
+    "OpenAIProvider",
+    "PromptMessages",
+    "ProviderError",
+    "ProviderRegistry",
+    "build_registry",
+    "get_provider",
+    "set_provider",
+    "close_provider",
+]
@@ -0,0 +1,64 @@
+"""LLM provider interface"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List
+
+# Chat messages use the provider-neutral {"role": ..., "content": ...} shape
+PromptMessages = List[Dict[str, str]]
+
+class ProviderError(Exception):
+    """A provider call failed; `retryable` errors (timeouts, 429, 5xx) may fail over"""
+
+    def __init__(self, message: str, provider: str = "", status_code: int = 0, retryable: bool = False):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retryable = retryable
+
+@dataclass
+class Completion:
+    """A finished (non-streamed) model response"""
+    content: str
+    model: str
+    provider: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+class LLMProvider(ABC):
+    """Base class for chat model providers"""
+
+    name: str = "base"
+
+    @abstractmethod
+    def stream(
+        self,
+        messages: PromptMessages,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> AsyncIterator[str]:
+        """
+        Yield response tokens as they arrive. Implementations must stop
+        generating upstream when the iterator is closed or cancelled.
+        """
+
+    async def complete(
+        self,
+        messages: PromptMessages,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        hedge: bool = False,
+    ) -> Completion:
+        """
+        Return the full response (default: assemble the token stream).
+        `hedge` marks latency-sensitive calls; only the registry acts on it.
+        """
+        parts = [token async for token in self.stream(messages, model, temperature, max_tokens)]
+        return Completion(
+            content="".join(parts),
+            model=model,
+            provider=self.name,
+            completion_tokens=len(parts),
+        )
@@ -0,0 +1,311 @@
+"""Token-budgeted prompt assembly with an incrementally refreshed summary
+
+The prompt for a turn is: one system message (conversation system prompt,
+the user's custom instructions and the rolling summary), then as many of the
+most recent un-summarized messages as fit, then the new message. Message
+sizes come from the cached `Message.token_count`, so history is never
+re-tokenized; the walk reads the thread newest-first in small keyset pages
+and stops as soon as the budget is spent, so its cost depends on the model's
+context window rather than the thread length.
+
+When the un-summarized history grows past CONTEXT_SUMMARY_THRESHOLD_TOKENS
+(or no longer fits), `summary_refresher` folds the oldest un-summarized
+messages into `Conversation.summary` in the background and advances the
+conversation's summary cursor.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from database import Conversation, Message, SessionLocal
+from llm.base import LLMProvider, PromptMessages
+from llm.tokenizer import count_tokens, estimate_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Context window sizes by model name prefix (first match wins)
+MODEL_CONTEXT_WINDOWS = (
+    ("gpt-4o", 128000),
+    ("gpt-4.1", 1047576),
+    ("gpt-4-turbo", 128000),
+    ("gpt-4-32k", 32768),
+    ("gpt-4", 8192),
+    ("gpt-3.5-turbo", 16385),
+    ("o1", 200000),
+    ("o3", 200000),
+    ("o4", 200000),
+    ("claude-", 200000),
+)
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Per-message framing overhead (role markers etc.), as in estimate_prompt_tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Summary prompt framing ("Existing summary:", role prefixes) and token count drift
+SUMMARY_PROMPT_MARGIN_TOKENS = 64
+
+# Rows fetched per step of the newest-first history walk
+HISTORY_PAGE_SIZE = 100
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an AI "
+    "assistant. Merge the new messages into the existing summary. Keep facts, "
+    "decisions, open questions and the user's stated preferences; drop small talk. "
+    "Reply with the updated summary only."
+)
+
+@dataclass
+class AssembledContext:
+    """A prompt ready to send, with what was (and was not) included"""
+    prompt: PromptMessages
+    prompt_tokens: int
+    history_messages: int
+    truncated: bool  # Older un-summarized messages did not fit
+    unsummarized_tokens: int  # Lower bound when truncated
+    needs_summary: bool
+    memories: Sequence[str] = ()  # Recalled into the system message
+
+def context_window(model: str) -> int:
+    """Context window size of a model in tokens"""
+    if model in settings.CONTEXT_WINDOW_TOKENS:
+        return settings.CONTEXT_WINDOW_TOKENS[model]
+    for prefix, size in MODEL_CONTEXT_WINDOWS:
+        if model.startswith(prefix):
+            return size
+    return DEFAULT_CONTEXT_WINDOW
+
+def _message_tokens(row, model: str = "") -> int:
+    """Cached size of a stored message (estimated for rows not yet backfilled)"""
+    return (row.token_count or estimate_tokens(row.content, model)) + MESSAGE_OVERHEAD_TOKENS
+
+def _system_message(
+    conversation: Conversation,
+    custom_instructions: Optional[str],
+    memories: Sequence[str] = (),
+) -> Optional[str]:
+    parts = []
+    if conversation.system_prompt:
+        parts.append(conversation.system_prompt)
+    if custom_instructions:
+        parts.append(f"User instructions:\n{custom_instructions}")
+    if memories:
+        notes = "\n".join(f"- {memory}" for memory in memories)
+        parts.append(f"Possibly relevant messages from the user's other conversations:\n{notes}")
+    if conversation.summary:
+        parts.append(f"Summary of the earlier conversation:\n{conversation.summary}")
+    return "\n\n".join(parts) or None
+
+def _summary_cursor(conversation: Conversation) -> Optional[Tuple]:
+    if conversation.summary_through_id is None:
+        return None
+    return (conversation.summary_through_at, conversation.summary_through_id)
+
+async def assemble_context(
+    db: AsyncSession,
+    conversation: Conversation,
+    message: str,
+    custom_instructions: Optional[str] = None,
+    max_tokens: int = 2000,
+    memories: Sequence[str] = (),
+) -> AssembledContext:
+    """
+    Build the prompt for `message` within the model's context window,
+    reserving `max_tokens` for the reply. `memories` (recalled messages from
+    other conversations) go into the system message. Call before the new
+    message is persisted.
+    """
+    model = conversation.model_used or ""
+    system = _system_message(conversation, custom_instructions, memories)
+    fixed = count_tokens(message, model) + MESSAGE_OVERHEAD_TOKENS
+    if system:
+        fixed += count_tokens(system, model) + MESSAGE_OVERHEAD_TOKENS
+    budget = context_window(model) - max_tokens - fixed
+
+    history: List = []
+    used = unsummarized = 0
+    truncated = False
+    if conversation.message_count:  # None/0 for a conversation created in this request
+        key = tuple_(Message.created_at, Message.id)
+        stmt = select(Message.id, Message.role, Message.content, Message.token_count, Message.created_at).where(
+            Message.conversation_id == conversation.id
+        )
+        after = _summary_cursor(conversation)
+        if after is not None:
+            stmt = stmt.where(key > tuple_(*after))
+        stmt = stmt.order_by(Message.created_at.desc(), Message.id.desc()).limit(HISTORY_PAGE_SIZE)
+
+        page = stmt
+        while True:
+            rows = (await db.execute(page)).all()
+            for row in rows:
+                tokens = _message_tokens(row, model)
+                unsummarized += tokens
+                if used + tokens > budget:
+                    truncated = True
+                    break
+                history.append(row)
+                used += tokens
+            if truncated or len(rows) < HISTORY_PAGE_SIZE:
+                break
+            page = stmt.where(key < tuple_(rows[-1].created_at, rows[-1].id))
+
+    prompt: PromptMessages = []
+    if system:
+        prompt.append({"role": "system", "content": system})
+    prompt += [{"role": row.role, "content": row.content} for row in reversed(history)]
+    prompt.append({"role": "user", "content": message})
+
+    return AssembledContext(
+        prompt=prompt,
+        prompt_tokens=fixed + used,
+        history_messages=len(history),
+        truncated=truncated,
+        unsummarized_tokens=unsummarized,
+        needs_summary=truncated or unsummarized > settings.CONTEXT_SUMMARY_THRESHOLD_TOKENS,
+        memories=tuple(memories),
+    )
+
+async def refresh_summary(
+    conversation_id: UUID,
+    provider: LLMProvider,
+    session_factory=SessionLocal,
+) -> bool:
+    """
+    Fold the oldest un-summarized messages (up to CONTEXT_SUMMARY_BATCH_TOKENS
+    and what fits the model's window next to the summary prompt and reply,
+    never the CONTEXT_KEEP_RECENT_MESSAGES newest) into the conversation
+    summary; a single message too large for the batch is truncated. The
+    update is conditional on the summary cursor not having moved, so
+    concurrent refreshes cannot overwrite each other. Returns True if the
+    summary advanced.
+    """
+    async with session_factory() as db:
+        conversation = await db.get(Conversation, conversation_id)
+        if conversation is None:
+            return False
+        previous = _summary_cursor(conversation)
+        model = conversation.model_used or "gpt-4"
+        key = tuple_(Message.created_at, Message.id)
+        columns = (Message.id, Message.role, Message.content, Message.token_count, Message.created_at)
+
+        # Oldest of the messages that must stay verbatim
+        keep_from = (await db.execute(
+            select(Message.created_at, Message.id)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .offset(max(settings.CONTEXT_KEEP_RECENT_MESSAGES - 1, 0))
+            .limit(1)
+        )).one_or_none()
+        if keep_from is None:
+            return False
+
+        stmt = select(*columns).where(Message.conversation_id == conversation_id, key < tuple_(*keep_from))
+        if previous is not None:
+            stmt = stmt.where(key > tuple_(*previous))
+        stmt = stmt.order_by(Message.created_at, Message.id).limit(HISTORY_PAGE_SIZE)
+
+        # The instructions, the current summary and the reply share the window with the batch
+        current = conversation.summary
+        budget = min(
+            settings.CONTEXT_SUMMARY_BATCH_TOKENS,
+            context_window(model)
+            - settings.CONTEXT_SUMMARY_MAX_TOKENS
+            - count_tokens(SUMMARY_INSTRUCTIONS + (current or ""), model)
+            - SUMMARY_PROMPT_MARGIN_TOKENS,
+        )
+        if budget <= MESSAGE_OVERHEAD_TOKENS:
+            logger.warning("Summary of conversation %s leaves no room for new messages", conversation_id)
+            return False
+
+        batch, tokens, full = [], 0, False
+        page = stmt
+        while not full:
+            rows = (await db.execute(page)).all()
+            for row in rows:
+                size = _message_tokens(row, model)
+                if tokens + size > budget:
+                    if not batch:  # A single message larger than the budget is cut to fit
+                        batch.append((row, truncate_tokens(row.content, model, budget - MESSAGE_OVERHEAD_TOKENS)))
+                    full = True
+                    break
+                batch.append((row, row.content))
+                tokens += size
+            if len(rows) < HISTORY_PAGE_SIZE:
+                break
+            page = stmt.where(key > tuple_(rows[-1].created_at, rows[-1].id))
+        if not batch:
+            return False
+        await db.commit()  # Do not hold a connection while the model runs
+
+        transcript = "\n\n".join(f"{row.role.capitalize()}: {content}" for row, content in batch)
+        completion = await provider.complete(
+            [
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {"role": "user", "content": f"Existing summary:\n{current or '(none)'}\n\nNew messages:\n{transcript}"},
+            ],
+            model,
+            temperature=0.2,
+            max_tokens=settings.CONTEXT_SUMMARY_MAX_TOKENS,
+        )
+
+        last, _ = batch[-1]
+        stmt = update(Conversation).where(Conversation.id == conversation_id)
+        if previous is None:
+            stmt = stmt.where(Conversation.summary_through_id.is_(None))
+        else:
+            stmt = stmt.where(Conversation.summary_through_id == previous[1])
+        result = await db.execute(stmt.values(
+            summary=completion.content.strip(),
+            summary_through_at=last.created_at,
+            summary_through_id=last.id,
+        ))
+        await db.commit()
+        return result.rowcount == 1
+
+class SummaryRefresher:
+    """Runs at most one background summary refresh per conversation"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._tasks: Dict[UUID, asyncio.Task] = {}
+        self.refreshed = 0
+        self.failed = 0
+
+    def schedule(self, conversation_id: UUID, provider: LLMProvider) -> bool:
+        """Start a refresh unless one is already running for the conversation"""
+        if conversation_id in self._tasks:
+            return False
+        task = asyncio.create_task(self._run(conversation_id, provider))
+        self._tasks[conversation_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(conversation_id, None))
+        return True
+
+    async def _run(self, conversation_id: UUID, provider: LLMProvider):
+        try:
+            if await refresh_summary(conversation_id, provider, self.session_factory):
+                self.refreshed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failed += 1
+            logger.exception("Summary refresh failed for conversation %s", conversation_id)
+
+    async def wait(self):
+        """Wait for running refreshes (tests and benchmarks)"""
+        await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    async def shutdown(self):
+        """Cancel running refreshes"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+summary_refresher = SummaryRefresher()
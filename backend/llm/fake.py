@@ -0,0 +1,68 @@
+"""Local fake provider for tests and offline benchmarks"""
+
+import asyncio
+from typing import AsyncIterator, Optional
+
+from llm.base import LLMProvider, PromptMessages
+
+class FakeProvider(LLMProvider):
+    """
+    Streams a deterministic reply at a configurable rate: the first token
+    after `first_token_latency` seconds, then `tokens_per_second`. The reply
+    echoes the last user message, padded to `response_tokens` tokens.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        tokens_per_second: float = 50.0,
+        first_token_latency: float = 0.2,
+        response_tokens: int = 50,
+        reply: Optional[str] = None,
+    ):
+        self.tokens_per_second = tokens_per_second
+        self.first_token_latency = first_token_latency
+        self.response_tokens = response_tokens
+        self.reply = reply
+
+        # Counters used by tests to check cancellation and cost
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.tokens_generated = 0
+        self.last_messages: Optional[PromptMessages] = None
+
+    def _reply_tokens(self, messages: PromptMessages) -> list:
+        if self.reply is not None:
+            words = self.reply.split()
+        else:
+            last_user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+            words = f"You said: {last_user}".split()
+            words += ["lorem"] * max(0, self.response_tokens - len(words))
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    async def stream(
+        self,
+        messages: PromptMessages,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> AsyncIterator[str]:
+        self.started += 1
+        self.last_messages = messages
+        interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        finished = False
+        try:
+            await asyncio.sleep(self.first_token_latency)
+            for i, token in enumerate(self._reply_tokens(messages)[:max_tokens]):
+                if i and interval:
+                    await asyncio.sleep(interval)
+                self.tokens_generated += 1
+                yield token
+            finished = True
+        finally:
+            if finished:
+                self.completed += 1
+            else:
+                self.cancelled += 1
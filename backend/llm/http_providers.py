@@ -0,0 +1,249 @@
+"""HTTP chat providers (OpenAI, Anthropic) over long-lived pooled clients"""
+
+import json
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from llm.base import Completion, LLMProvider, PromptMessages, ProviderError
+
+# Parse failures of a response body or stream event (bad JSON, missing fields)
+MALFORMED_ERRORS = (ValueError, KeyError, IndexError, TypeError, AttributeError)
+
+# Error types (in error bodies and stream events) worth retrying on another model
+RETRYABLE_ERROR_TYPES = {"server_error", "api_error", "overloaded_error", "rate_limit_error", "rate_limit_exceeded"}
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class HTTPProvider(LLMProvider):
+    """
+    Base for providers reached over HTTP. Each provider owns one AsyncClient
+    for the life of the process so TLS sessions and (HTTP/2) connections are
+    reused across requests instead of being re-established per call.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        timeout: float = 60.0,
+        max_connections: int = 100,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=self.auth_headers(api_key),
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            http2=transport is None and _http2_available(),
+            transport=transport,
+        )
+
+    def auth_headers(self, api_key: str) -> dict:
+        return {}
+
+    def _error(self, exc: Exception) -> ProviderError:
+        """Translate transport and HTTP errors into ProviderError"""
+        if isinstance(exc, httpx.HTTPStatusError):
+            code = exc.response.status_code
+            return ProviderError(
+                f"{self.name} returned HTTP {code}",
+                provider=self.name,
+                status_code=code,
+                retryable=code == 429 or code >= 500,
+            )
+        return ProviderError(f"{self.name} request failed: {exc!r}", provider=self.name, retryable=True)
+
+    def _malformed(self, exc: Exception) -> ProviderError:
+        """A response body or stream event that does not parse as the API documents"""
+        return ProviderError(f"{self.name} sent a malformed response: {exc!r}", provider=self.name, retryable=True)
+
+    def _truncated(self) -> ProviderError:
+        message = f"{self.name} stream ended before the reply was complete"
+        return ProviderError(message, provider=self.name, retryable=True)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class OpenAIProvider(HTTPProvider):
+    """OpenAI chat completions API"""
+
+    name = "openai"
+
+    def auth_headers(self, api_key: str) -> dict:
+        return {"Authorization": f"Bearer {api_key}"}
+
+    def _body(self, messages, model, temperature, max_tokens, stream: bool) -> dict:
+        return {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+
+    async def complete(
+        self,
+        messages: PromptMessages,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        hedge: bool = False,
+    ) -> Completion:
+        try:
+            response = await self.client.post(
+                "/v1/chat/completions", json=self._body(messages, model, temperature, max_tokens, False)
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise self._error(exc) from exc
+
+        try:
+            data = response.json()
+            usage = data.get("usage") or {}
+            return Completion(
+                content=data["choices"][0]["message"]["content"] or "",
+                model=data.get("model", model),
+                provider=self.name,
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+            )
+        except MALFORMED_ERRORS as exc:
+            raise self._malformed(exc) from exc
+
+    def _delta(self, payload: str) -> Optional[str]:
+        """Text of one streamed chunk (None for chunks without content, e.g. the usage chunk)"""
+        try:
+            data = json.loads(payload)
+            if "error" in data:
+                error = data["error"] or {}
+                raise ProviderError(
+                    f"{self.name} stream failed: {error.get('message', error)}",
+                    provider=self.name,
+                    retryable=error.get("type") in RETRYABLE_ERROR_TYPES,
+                )
+            choices = data["choices"]
+            return choices[0].get("delta", {}).get("content") if choices else None
+        except MALFORMED_ERRORS as exc:
+            raise self._malformed(exc) from exc
+
+    async def stream(
+        self,
+        messages: PromptMessages,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> AsyncIterator[str]:
+        body = self._body(messages, model, temperature, max_tokens, True)
+        try:
+            async with self.client.stream("POST", "/v1/chat/completions", json=body) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    payload = line[len("data: "):]
+                    if payload == "[DONE]":
+                        return
+                    delta = self._delta(payload)
+                    if delta:
+                        yield delta
+        except httpx.HTTPError as exc:
+            raise self._error(exc) from exc
+        raise self._truncated()
+
+class AnthropicProvider(HTTPProvider):
+    """Anthropic messages API"""
+
+    name = "anthropic"
+    api_version = "2023-06-01"
+
+    def auth_headers(self, api_key: str) -> dict:
+        return {"x-api-key": api_key, "anthropic-version": self.api_version}
+
+    def _body(self, messages, model, temperature, max_tokens, stream: bool) -> dict:
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        body = {
+            "model": model,
+            "messages": [m for m in messages if m["role"] != "system"],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+        if system:
+            body["system"] = system
+        return body
+
+    async def complete(
+        self,
+        messages: PromptMessages,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        hedge: bool = False,
+    ) -> Completion:
+        try:
+            response = await self.client.post(
+                "/v1/messages", json=self._body(messages, model, temperature, max_tokens, False)
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise self._error(exc) from exc
+
+        try:
+            data = response.json()
+            usage = data.get("usage") or {}
+            return Completion(
+                content="".join(block.get("text", "") for block in data.get("content", [])),
+                model=data.get("model", model),
+                provider=self.name,
+                prompt_tokens=usage.get("input_tokens", 0),
+                completion_tokens=usage.get("output_tokens", 0),
+            )
+        except MALFORMED_ERRORS as exc:
+            raise self._malformed(exc) from exc
+
+    def _event(self, payload: str) -> dict:
+        """One streamed event; `error` events (e.g. overloaded mid-reply) raise ProviderError"""
+        try:
+            event = json.loads(payload)
+            if event.get("type") == "error":
+                error = event.get("error") or {}
+                raise ProviderError(
+                    f"{self.name} stream failed: {error.get('type', 'error')}: {error.get('message', '')}",
+                    provider=self.name,
+                    retryable=error.get("type") in RETRYABLE_ERROR_TYPES,
+                )
+            return event
+        except MALFORMED_ERRORS as exc:
+            raise self._malformed(exc) from exc
+
+    async def stream(
+        self,
+        messages: PromptMessages,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> AsyncIterator[str]:
+        body = self._body(messages, model, temperature, max_tokens, True)
+        try:
+            async with self.client.stream("POST", "/v1/messages", json=body) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    event = self._event(line[len("data: "):])
+                    if event.get("type") == "content_block_delta":
+                        text = (event.get("delta") or {}).get("text")
+                        if text:
+                            yield text
+                    elif event.get("type") == "message_stop":
+                        return
+        except httpx.HTTPError as exc:
+            raise self._error(exc) from exc
+        raise self._truncated()
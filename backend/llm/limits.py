@@ -0,0 +1,75 @@
+"""Per-provider concurrency and token-per-minute limits"""
+
+import asyncio
+import time
+from typing import Optional
+
+from llm.base import ProviderError
+
+class TokenBudget:
+    """
+    Token bucket refilled at `tokens_per_minute`. Prompt tokens are reserved
+    before a call (waiting for refill if needed, up to `max_wait` seconds) and
+    completion tokens are charged afterwards, which may push the balance
+    negative and delay the next caller.
+    """
+
+    def __init__(self, tokens_per_minute: int, max_wait: float = 10.0, provider: str = ""):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.max_wait = max_wait
+        self.provider = provider
+        self._available = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._available
+
+    async def acquire(self, tokens: int):
+        """Reserve `tokens`, raising a retryable ProviderError if the wait would exceed max_wait"""
+        tokens = min(float(tokens), self.capacity)
+        self._refill()
+        wait = (tokens - self._available) / self.rate if self._available < tokens else 0.0
+        if wait > self.max_wait:
+            raise ProviderError(
+                f"{self.provider} token budget exhausted",
+                provider=self.provider,
+                status_code=429,
+                retryable=True,
+            )
+        # Reserve now so concurrent callers queue behind this one
+        self._available -= tokens
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def charge(self, tokens: int):
+        """Charge tokens consumed after the fact (e.g. completion tokens)"""
+        self._refill()
+        self._available -= tokens
+
+class ProviderLimits:
+    """Concurrency semaphore plus an optional token budget for one provider"""
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: int = 0, provider: str = ""):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.budget: Optional[TokenBudget] = (
+            TokenBudget(tokens_per_minute, provider=provider) if tokens_per_minute > 0 else None
+        )
+        self.in_flight = 0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.in_flight -= 1
+        self.semaphore.release()
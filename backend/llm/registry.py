@@ -0,0 +1,224 @@
+"""Provider registry: model routing, limits, failover and hedged requests"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional
+
+from llm.base import Completion, LLMProvider, PromptMessages, ProviderError
+from llm.limits import ProviderLimits
+from metrics import LLM_COMPLETION_SECONDS, LLM_TIME_TO_FIRST_TOKEN_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Model name prefixes served by each provider
+MODEL_PREFIXES = {
+    "openai": ("gpt-", "o1", "o3", "o4", "chatgpt-"),
+    "anthropic": ("claude-",),
+}
+
+@dataclass
+class RegisteredProvider:
+    provider: LLMProvider
+    limits: ProviderLimits
+
+def estimate_prompt_tokens(messages: PromptMessages) -> int:
+    """Cheap prompt size estimate (~4 characters per token) for budget reservations"""
+    return sum(len(m["content"]) for m in messages) // 4 + 4 * len(messages)
+
+class ProviderRegistry(LLMProvider):
+    """
+    Routes each call to the provider serving the requested model, within that
+    provider's concurrency and token-per-minute limits. Calls that time out or
+    fail with a retryable error (429/5xx/transport) fail over to the model's
+    configured fallback. `complete(..., hedge=True)` additionally starts the
+    fallback if the primary has not answered within `hedge_after` seconds and
+    returns whichever finishes first.
+    """
+
+    name = "registry"
+
+    def __init__(
+        self,
+        default_provider: str = "fake",
+        fallback_models: Optional[Dict[str, str]] = None,
+        timeout: float = 60.0,
+        hedge_after: float = 0.0,
+    ):
+        self._providers: Dict[str, RegisteredProvider] = {}
+        self.default_provider = default_provider
+        self.fallback_models = fallback_models or {}
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+
+        self.failovers = 0
+        self.hedges = 0
+
+    def register(self, provider: LLMProvider, max_concurrency: int = 64, tokens_per_minute: int = 0):
+        self._providers[provider.name] = RegisteredProvider(
+            provider=provider,
+            limits=ProviderLimits(max_concurrency, tokens_per_minute, provider=provider.name),
+        )
+
+    def get(self, name: str) -> Optional[LLMProvider]:
+        entry = self._providers.get(name)
+        return entry.provider if entry else None
+
+    def resolve(self, model: str) -> RegisteredProvider:
+        """Pick the provider for a model, falling back to the default when unconfigured"""
+        for name, prefixes in MODEL_PREFIXES.items():
+            if model.startswith(prefixes) and name in self._providers:
+                return self._providers[name]
+        if self.default_provider in self._providers:
+            return self._providers[self.default_provider]
+        raise ProviderError(f"No provider configured for model {model}", retryable=False)
+
+    def candidates(self, model: str) -> List[str]:
+        """The requested model followed by its fallback chain"""
+        chain = [model]
+        while chain[-1] in self.fallback_models and self.fallback_models[chain[-1]] not in chain:
+            chain.append(self.fallback_models[chain[-1]])
+        return chain
+
+    async def _complete_one(self, model, messages, temperature, max_tokens) -> Completion:
+        entry = self.resolve(model)
+        started = time.perf_counter()
+        async with entry.limits:
+            if entry.limits.budget is not None:
+                await entry.limits.budget.acquire(estimate_prompt_tokens(messages))
+            try:
+                completion = await asyncio.wait_for(
+                    entry.provider.complete(messages, model, temperature, max_tokens),
+                    timeout=self.timeout,
+                )
+            except asyncio.TimeoutError as exc:
+                raise ProviderError(
+                    f"{entry.provider.name} timed out after {self.timeout}s",
+                    provider=entry.provider.name,
+                    retryable=True,
+                ) from exc
+            if entry.limits.budget is not None:
+                entry.limits.budget.charge(completion.completion_tokens)
+            LLM_COMPLETION_SECONDS.labels(entry.provider.name, model).observe(time.perf_counter() - started)
+            return completion
+
+    async def complete(
+        self,
+        messages: PromptMessages,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        hedge: bool = False,
+    ) -> Completion:
+        chain = self.candidates(model)
+        if hedge and self.hedge_after > 0 and len(chain) > 1:
+            return await self._hedged(chain, messages, temperature, max_tokens)
+
+        last_error: Optional[ProviderError] = None
+        for candidate in chain:
+            try:
+                return await self._complete_one(candidate, messages, temperature, max_tokens)
+            except ProviderError as exc:
+                if not exc.retryable:
+                    raise
+                last_error = exc
+                self.failovers += 1
+                logger.warning("Model %s failed (%s), failing over", candidate, exc)
+        raise last_error
+
+    async def _hedged(self, chain, messages, temperature, max_tokens) -> Completion:
+        """Race the primary against the fallback once the primary is slow (or failed)"""
+        primary = asyncio.ensure_future(self._complete_one(chain[0], messages, temperature, max_tokens))
+        tasks = {primary}
+        errors: List[BaseException] = []
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if primary in done:
+                if not getattr(primary.exception(), "retryable", False):
+                    return primary.result()
+                errors.append(primary.exception())
+
+            self.hedges += 1
+            tasks.add(asyncio.ensure_future(self._complete_one(chain[1], messages, temperature, max_tokens)))
+            pending = tasks - done
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())
+        finally:
+            # Cancel the loser, or both when the caller is cancelled, so they release their slots and connections
+            unfinished = [task for task in tasks if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        raise errors[-1]
+
+    async def stream(
+        self,
+        messages: PromptMessages,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> AsyncIterator[str]:
+        """Stream from the first healthy candidate; failover is only possible before the first token"""
+        last_error: Optional[ProviderError] = None
+        started = time.perf_counter()
+        for candidate in self.candidates(model):
+            entry = self.resolve(candidate)
+            async with entry.limits:
+                if entry.limits.budget is not None:
+                    await entry.limits.budget.acquire(estimate_prompt_tokens(messages))
+                tokens = entry.provider.stream(messages, candidate, temperature, max_tokens)
+                emitted = 0
+                try:
+                    first = await asyncio.wait_for(tokens.__anext__(), timeout=self.timeout)
+                    emitted += 1
+                    # Measured from the call, so queueing for a slot and failed candidates count
+                    LLM_TIME_TO_FIRST_TOKEN_SECONDS.labels(entry.provider.name, candidate).observe(
+                        time.perf_counter() - started
+                    )
+                    yield first
+                    async for token in tokens:
+                        emitted += 1
+                        yield token
+                    return
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    last_error = ProviderError(
+                        f"{entry.provider.name} timed out before the first token",
+                        provider=entry.provider.name,
+                        retryable=True,
+                    )
+                except ProviderError as exc:
+                    if not exc.retryable or emitted:
+                        raise
+                    last_error = exc
+                finally:
+                    await tokens.aclose()
+                    if entry.limits.budget is not None:
+                        entry.limits.budget.charge(emitted)
+            self.failovers += 1
+            logger.warning("Model %s failed before streaming (%s), failing over", candidate, last_error)
+        raise last_error
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """In-flight calls and remaining budget per provider"""
+        return {
+            name: {
+                "in_flight": entry.limits.in_flight,
+                "max_concurrency": entry.limits.max_concurrency,
+                "budget_available": entry.limits.budget.available if entry.limits.budget else -1,
+            }
+            for name, entry in self._providers.items()
+        }
+
+    async def aclose(self):
+        """Close pooled HTTP clients"""
+        for entry in self._providers.values():
+            close = getattr(entry.provider, "aclose", None)
+            if close is not None:
+                await close()
@@ -0,0 +1,219 @@
+"""Semantic cache of model replies to repeated prompts
+
+Users often ask the same question again in a new conversation, worded a
+little differently. When enabled, a standalone prompt (no history or summary
+in the conversation) at a low temperature is embedded and compared with the
+user's earlier prompts that were sent to the same model, at the same
+temperature bucket, under the same system prompt and custom instructions.
+A match above RESPONSE_CACHE_MIN_SIMILARITY is answered from the cache
+without calling the provider.
+
+Recalled memories injected into the system prompt are part of the
+partition too, so a reply that drew on one set of memories is not reused
+when recall brings back another.
+
+Entries are scoped per user (a reply may draw on the user's own memories)
+and kept in the shared cache so every worker sees them. Each (user,
+partition) has one compact index, a JSON header (entry ids, expiries and
+reply sizes) followed by the float16 matrix of prompt embeddings, and each
+answer is a key of its own, fetched only on a hit:
+
+    respcache:{user_id}:{sha256(model, temperature bucket, instructions, memories, embedder)}
+    respcache:{user_id}:{partition}:{entry_id}
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID, uuid4
+
+import numpy as np
+
+from app.config import settings
+from cache import CacheBackend, get_cache
+from llm.base import ProviderError
+from memory import Embedder, build_embedder, get_memory
+
+logger = logging.getLogger(__name__)
+
+_response_cache: Optional["ResponseCache"] = None
+
+@dataclass
+class CachedReply:
+    answer: str
+    completion_tokens: int
+    similarity: float
+
+@dataclass
+class CacheLookup:
+    """The outcome of a lookup, kept so a miss can be stored once answered"""
+    key: str
+    vector: np.ndarray
+    hit: Optional[CachedReply] = None
+
+@dataclass
+class _Index:
+    """A partition's entries: ids, expiries, reply sizes and one float16 embedding row each"""
+    ids: List[str] = field(default_factory=list)
+    expires_at: List[float] = field(default_factory=list)
+    completion_tokens: List[int] = field(default_factory=list)
+    vectors: Optional[np.ndarray] = None
+
+    def encode(self) -> bytes:
+        header = json.dumps({
+            "ids": self.ids, "expires_at": self.expires_at, "completion_tokens": self.completion_tokens,
+        })
+        return header.encode() + b"\n" + self.vectors.astype(np.float16).tobytes()
+
+    @classmethod
+    def decode(cls, raw: bytes, dimensions: int) -> "_Index":
+        header, _, matrix = raw.partition(b"\n")
+        fields = json.loads(header)
+        vectors = np.frombuffer(matrix, dtype=np.float16).reshape(len(fields["ids"]), dimensions)
+        return cls(fields["ids"], fields["expires_at"], fields["completion_tokens"], vectors)
+
+    def keep(self, rows: Sequence[int]) -> "_Index":
+        return _Index(
+            [self.ids[row] for row in rows],
+            [self.expires_at[row] for row in rows],
+            [self.completion_tokens[row] for row in rows],
+            self.vectors[list(rows)],
+        )
+
+class ResponseCache:
+    """Per-user semantic cache of replies, stored through a CacheBackend"""
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        backend: CacheBackend,
+        min_similarity: float = 0.95,
+        max_temperature: float = 0.3,
+        ttl: int = 86400,
+        max_entries: int = 200,
+    ):
+        self.embedder = embedder
+        self.backend = backend
+        self.min_similarity = min_similarity
+        self.max_temperature = max_temperature
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stored = 0
+        self.saved_tokens = 0
+
+    def key(
+        self, user_id: UUID, model: str, temperature: float, instructions: str, memories: Sequence[str] = ()
+    ) -> str:
+        embedding = f"{self.embedder.model}:{self.embedder.dimensions}"
+        partition = json.dumps([model, round(temperature, 1), instructions, list(memories), embedding])
+        return f"respcache:{user_id}:{hashlib.sha256(partition.encode()).hexdigest()}"
+
+    async def _index(self, key: str) -> _Index:
+        """A partition's unexpired entries"""
+        raw = await self.backend.get(key)
+        if raw is None:
+            return _Index(vectors=np.empty((0, self.embedder.dimensions), dtype=np.float16))
+        index = _Index.decode(raw, self.embedder.dimensions)
+        now = time.time()
+        return index.keep([row for row, expires_at in enumerate(index.expires_at) if expires_at > now])
+
+    async def lookup(
+        self,
+        user_id: UUID,
+        model: str,
+        temperature: float,
+        instructions: str,
+        prompt: str,
+        prompt_tokens: int = 0,
+        memories: Sequence[str] = (),
+    ) -> Optional[CacheLookup]:
+        """
+        The cached reply to the closest earlier prompt, if any. Returns None
+        when the request is not cacheable (temperature too high, embedder
+        unavailable) and a lookup without `hit` on a miss.
+        """
+        if temperature > self.max_temperature:
+            self.skipped += 1
+            return None
+
+        try:
+            vector = (await self.embedder.embed([prompt]))[0]
+        except ProviderError:
+            logger.warning("Embedder unavailable, skipping the response cache")
+            self.skipped += 1
+            return None
+        lookup = CacheLookup(self.key(user_id, model, temperature, instructions, memories), vector)
+
+        index = await self._index(lookup.key)
+        if index.ids:
+            scores = index.vectors.astype(np.float32) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.min_similarity:
+                answer = await self.backend.get(f"{lookup.key}:{index.ids[best]}")
+                if answer is not None:  # Evicted on its own: a miss
+                    completion_tokens = index.completion_tokens[best]
+                    lookup.hit = CachedReply(answer.decode(), completion_tokens, float(scores[best]))
+                    self.hits += 1
+                    self.saved_tokens += prompt_tokens + completion_tokens
+                    return lookup
+
+        self.misses += 1
+        return lookup
+
+    async def store(self, lookup: CacheLookup, answer: str, completion_tokens: int):
+        """Remember the reply to a missed lookup (oldest entries are dropped past max_entries)"""
+        if lookup.hit is not None or not answer.strip():
+            return
+        entry_id = uuid4().hex
+        await self.backend.set(f"{lookup.key}:{entry_id}", answer.encode(), self.ttl)
+
+        index = await self._index(lookup.key)
+        index.ids.append(entry_id)
+        index.expires_at.append(time.time() + self.ttl)
+        index.completion_tokens.append(completion_tokens)
+        index.vectors = np.vstack([index.vectors, lookup.vector.astype(np.float16)[None, :]])
+        dropped = index.ids[:-self.max_entries]
+        if dropped:
+            index = index.keep(range(len(dropped), len(index.ids)))
+            await self.backend.delete(*(f"{lookup.key}:{entry}" for entry in dropped))
+        # Concurrent stores to the same partition may overwrite each other; losing an entry only costs a miss
+        await self.backend.set(lookup.key, index.encode(), self.ttl)
+        self.stored += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "stored": self.stored,
+            "saved_tokens": self.saved_tokens,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The process-wide response cache, or None unless RESPONSE_CACHE_ENABLED"""
+    global _response_cache
+    if _response_cache is None and settings.RESPONSE_CACHE_ENABLED:
+        memory = get_memory()
+        _response_cache = ResponseCache(
+            memory.embedder if memory is not None else build_embedder(),
+            get_cache(),
+            min_similarity=settings.RESPONSE_CACHE_MIN_SIMILARITY,
+            max_temperature=settings.RESPONSE_CACHE_MAX_TEMPERATURE,
+            ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+            max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+        )
+    return _response_cache
+
+def set_response_cache(response_cache: Optional[ResponseCache]):
+    """Replace the process-wide response cache (tests and benchmarks)"""
+    global _response_cache
+    _response_cache = response_cache
@@ -0,0 +1,165 @@
+"""Local stub of the OpenAI and Anthropic chat APIs (and OpenAI embeddings)
+
+Simulates latency, per-token delay, rate limiting and server errors so the
+provider layer can be exercised without network access. Use it in-process via
+`httpx.ASGITransport(app=create_stub_app(...))`, or run it as a server:
+
+    python -m llm.stub_server --port 9000 --latency 0.2 --error-rate 0.1
+
+and point OPENAI_BASE_URL / ANTHROPIC_BASE_URL at it.
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+@dataclass
+class StubBehavior:
+    latency: float = 0.0             # Seconds before the response (or first token)
+    token_delay: float = 0.0         # Seconds between streamed tokens
+    error_rate: float = 0.0          # Fraction of requests answered with `error_status`
+    error_status: int = 500
+    requests_per_second: float = 0   # Answer 429 above this rate (0 = unlimited)
+    stream_failure: str = ""         # After the first streamed token: "malformed", "error" or "truncated"
+    reply: str = "This is a stubbed model response."
+    seed: int = 0
+    received: int = 0
+    _window: List[float] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+
+    def failure(self) -> int:
+        """Return an HTTP status to fail this request with, or 0 to serve it"""
+        self.received += 1
+        now = time.monotonic()
+        if self.requests_per_second:
+            self._window = [t for t in self._window if t > now - 1]
+            if len(self._window) >= self.requests_per_second:
+                return 429
+            self._window.append(now)
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self.error_status
+        return 0
+
+def create_stub_app(behavior: StubBehavior = None) -> FastAPI:
+    behavior = behavior or StubBehavior()
+    app = FastAPI(title="LLM stub")
+    app.state.behavior = behavior
+
+    def tokens() -> List[str]:
+        words = behavior.reply.split()
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    async def stream_events(render, error: str, done: str):
+        """Token events then `done`, or the configured failure after the first token"""
+        await asyncio.sleep(behavior.latency)
+        for i, token in enumerate(tokens()):
+            if i and behavior.token_delay:
+                await asyncio.sleep(behavior.token_delay)
+            yield render(token)
+            if behavior.stream_failure:
+                failures = {"malformed": 'data: {"choices": [\n\n', "error": error, "truncated": ""}
+                yield failures[behavior.stream_failure]
+                return
+        yield done
+
+    def usage(body) -> tuple:
+        prompt = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        return prompt, len(tokens())
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat(request: Request):
+        body = await request.json()
+        status = behavior.failure()
+        if status:
+            await asyncio.sleep(behavior.latency)
+            return JSONResponse({"error": {"message": "stub failure"}}, status_code=status)
+
+        if body.get("stream"):
+            events = stream_events(
+                lambda t: f"data: {json.dumps({'choices': [{'delta': {'content': t}}]})}\n\n",
+                error=f"data: {json.dumps({'error': {'type': 'server_error', 'message': 'stub failure'}})}\n\n",
+                done="data: [DONE]\n\n",
+            )
+            return StreamingResponse(events, media_type="text/event-stream")
+
+        await asyncio.sleep(behavior.latency)
+        prompt_tokens, completion_tokens = usage(body)
+        return {
+            "model": body["model"],
+            "choices": [{"message": {"role": "assistant", "content": behavior.reply}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens},
+        }
+
+    @app.post("/v1/messages")
+    async def anthropic_messages(request: Request):
+        body = await request.json()
+        status = behavior.failure()
+        if status:
+            await asyncio.sleep(behavior.latency)
+            return JSONResponse({"error": {"message": "stub failure"}}, status_code=status)
+
+        if body.get("stream"):
+            error = {"type": "error", "error": {"type": "overloaded_error", "message": "stub failure"}}
+            events = stream_events(
+                lambda t: f"event: content_block_delta\ndata: "
+                          f"{json.dumps({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': t}})}\n\n",
+                error=f"event: error\ndata: {json.dumps(error)}\n\n",
+                done=f"event: message_stop\ndata: {json.dumps({'type': 'message_stop'})}\n\n",
+            )
+            return StreamingResponse(events, media_type="text/event-stream")
+
+        await asyncio.sleep(behavior.latency)
+        prompt_tokens, completion_tokens = usage(body)
+        return {
+            "model": body["model"],
+            "content": [{"type": "text", "text": behavior.reply}],
+            "usage": {"input_tokens": prompt_tokens, "output_tokens": completion_tokens},
+        }
+
+    @app.post("/v1/embeddings")
+    async def openai_embeddings(request: Request):
+        body = await request.json()
+        status = behavior.failure()
+        await asyncio.sleep(behavior.latency)
+        if status:
+            return JSONResponse({"error": {"message": "stub failure"}}, status_code=status)
+
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions", 1536)
+        data = []
+        for index, text in enumerate(inputs):
+            # Deterministic per text, so identical inputs embed identically
+            rng = random.Random(text)
+            data.append({"index": index, "embedding": [rng.uniform(-1, 1) for _ in range(dimensions)]})
+        return {"model": body["model"], "data": data, "usage": {"prompt_tokens": sum(len(t) // 4 for t in inputs)}}
+
+    return app
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the local LLM API stub")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--requests-per-second", type=float, default=0)
+    args = parser.parse_args()
+
+    uvicorn.run(create_stub_app(StubBehavior(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        requests_per_second=args.requests_per_second,
+    )), host="127.0.0.1", port=args.port)
@@ -0,0 +1,115 @@
+"""Token counting per model family
+
+OpenAI models are counted exactly with tiktoken when it is installed and
+its encoding files are available; encoders are loaded once per process and
+cached. Loading one reads (or downloads) its BPE file and blocks for a
+while, so workers load the TOKENIZER_PREWARM_MODELS encodings off the event
+loop at startup (`load_encodings`, from app.lifecycle.prewarm). Other
+families (and OpenAI when tiktoken is unavailable) use a
+characters-per-token estimate calibrated for that family.
+
+Counts are computed once, when a message is written (see the chat routes),
+and cached in `Message.token_count`; `python -m database.backfill_tokens`
+fills them in for older rows.
+"""
+
+import logging
+import math
+import os
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# tiktoken encodings by OpenAI model name prefix (first match wins)
+OPENAI_ENCODINGS = (
+    ("gpt-4o", "o200k_base"),
+    ("gpt-4.1", "o200k_base"),
+    ("o1", "o200k_base"),
+    ("o3", "o200k_base"),
+    ("o4", "o200k_base"),
+    ("chatgpt-", "o200k_base"),
+    ("gpt-4", "cl100k_base"),
+    ("gpt-3.5", "cl100k_base"),
+    ("text-embedding-", "cl100k_base"),
+)
+
+# Average characters per token for families counted by estimate
+CHARS_PER_TOKEN = (
+    ("claude-", 3.5),
+)
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+def encoding_name(model: str) -> Optional[str]:
+    """tiktoken encoding used by a model, or None if it has no local tokenizer"""
+    for prefix, name in OPENAI_ENCODINGS:
+        if model.startswith(prefix):
+            return name
+    return None
+
+@lru_cache(maxsize=None)
+def _encoding(name: str):
+    """Load a tiktoken encoding once per process (None when unavailable)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        # Encoding files are downloaded on first use; offline hosts fall back to estimates
+        logger.warning("tiktoken encoding %s unavailable, estimating token counts", name)
+        return None
+
+def get_encoding(model: str):
+    """The cached tiktoken encoder for a model, or None to estimate"""
+    name = encoding_name(model)
+    return _encoding(name) if name else None
+
+def load_encodings(models: Iterable[str]) -> List[str]:
+    """Load the encodings of `models` into the cache (blocking); returns those now available"""
+    names = sorted({name for name in map(encoding_name, models) if name})
+    return [name for name in names if _encoding(name) is not None]
+
+def estimate_tokens(text: str, model: str = "") -> int:
+    """Character-based token estimate for models without a local tokenizer"""
+    if not text:
+        return 0
+    chars_per_token = next(
+        (ratio for prefix, ratio in CHARS_PER_TOKEN if model.startswith(prefix)),
+        DEFAULT_CHARS_PER_TOKEN,
+    )
+    return math.ceil(len(text) / chars_per_token)
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens in `text` for `model`"""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text, model)
+    return len(encoding.encode_ordinary(text))
+
+def truncate_tokens(text: str, model: str, max_tokens: int) -> str:
+    """The longest prefix of `text` within `max_tokens` tokens for `model`"""
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(model)
+    if encoding is None:
+        chars_per_token = next(
+            (ratio for prefix, ratio in CHARS_PER_TOKEN if model.startswith(prefix)),
+            DEFAULT_CHARS_PER_TOKEN,
+        )
+        return text[:int(max_tokens * chars_per_token)]
+    tokens = encoding.encode_ordinary(text)
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+def count_tokens_batch(texts: Sequence[str], model: str, num_threads: int = 0) -> List[int]:
+    """
+    Token counts for many texts at once (backfills). tiktoken encodes the
+    batch on its own thread pool with the GIL released, so call this from a
+    worker thread rather than the event loop.
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return [estimate_tokens(text, model) for text in texts]
+    encoded = encoding.encode_ordinary_batch(list(texts), num_threads=num_threads or os.cpu_count() or 4)
+    return [len(tokens) for tokens in encoded]
@@ -0,0 +1,157 @@
+"""Long-term memory: semantic recall over a user's past messages"""
+
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from cache import get_cache
+from database import Message
+from llm.base import ProviderError
+from memory.cache import CachedEmbedder
+from memory.embedders import Embedder, HashEmbedder, OpenAIEmbedder
+from memory.pipeline import EmbeddingPipeline
+from memory.stores import ChromaVectorStore, LocalVectorStore, VectorMatch, VectorStore
+
+logger = logging.getLogger(__name__)
+
+_pipeline: Optional[EmbeddingPipeline] = None
+
+@dataclass
+class Recollection:
+    """A past message relevant to the current one"""
+    message_id: UUID
+    conversation_id: UUID
+    role: str
+    content: str
+    score: float
+
+def build_embedder() -> Embedder:
+    """Create the embedder from settings (remote embedders are wrapped in the embedding cache)"""
+    if settings.EMBEDDING_PROVIDER == "openai":
+        embedder = OpenAIEmbedder(
+            settings.OPENAI_API_KEY,
+            settings.OPENAI_BASE_URL,
+            model=settings.EMBEDDING_MODEL,
+            dimensions=settings.EMBEDDING_DIMENSIONS,
+        )
+    else:
+        embedder = HashEmbedder(settings.EMBEDDING_DIMENSIONS)
+    if not embedder.remote:
+        return embedder
+    return CachedEmbedder(
+        embedder,
+        shared=get_cache(),
+        maxsize=settings.EMBEDDING_CACHE_SIZE,
+        ttl=settings.EMBEDDING_CACHE_TTL_SECONDS,
+        dtype=settings.EMBEDDING_CACHE_DTYPE,
+    )
+
+def build_store(dimensions: int) -> VectorStore:
+    """Create the vector store from settings"""
+    if settings.VECTOR_STORE == "chroma":
+        return ChromaVectorStore(settings.CHROMA_PERSISTENCE_DIR, settings.CHROMA_COLLECTION_NAME)
+    return LocalVectorStore(dimensions, settings.VECTOR_STORE_DIR or None)
+
+def get_memory() -> Optional[EmbeddingPipeline]:
+    """The process-wide embedding pipeline, or None when memory is disabled"""
+    global _pipeline
+    if _pipeline is None and settings.MEMORY_ENABLED:
+        embedder = build_embedder()
+        _pipeline = EmbeddingPipeline(
+            embedder,
+            build_store(embedder.dimensions),
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            max_delay=settings.EMBEDDING_BATCH_DELAY_SECONDS,
+            max_queue=settings.EMBEDDING_QUEUE_SIZE,
+        )
+    return _pipeline
+
+def set_memory(pipeline: Optional[EmbeddingPipeline]):
+    """Replace the process-wide pipeline (tests and benchmarks)"""
+    global _pipeline
+    _pipeline = pipeline
+
+def start_memory():
+    """Start background embedding (called from the app lifespan)"""
+    pipeline = get_memory()
+    if pipeline is not None:
+        pipeline.start()
+
+async def close_memory():
+    """Drain queued messages and close the embedder and store"""
+    global _pipeline
+    if _pipeline is not None:
+        await _pipeline.stop()
+        await _pipeline.embedder.aclose()
+        _pipeline = None
+
+async def nearest(
+    pipeline: EmbeddingPipeline,
+    user_id: UUID,
+    text: str,
+    k: int = 5,
+    exclude_conversation_id: Optional[UUID] = None,
+) -> List[VectorMatch]:
+    """The user's `k` stored vectors closest to `text` (empty if the embedder is unavailable)"""
+    try:
+        vector = (await pipeline.embedder.embed([text]))[0]
+    except ProviderError:
+        logger.warning("Embedder unavailable, continuing without long-term memory")
+        return []
+    return await pipeline.store.query(
+        user_id,
+        vector,
+        k,
+        exclude_conversation_id=str(exclude_conversation_id) if exclude_conversation_id else None,
+    )
+
+async def recall(
+    pipeline: EmbeddingPipeline,
+    db: AsyncSession,
+    user_id: UUID,
+    text: str,
+    k: int = 5,
+    min_score: float = 0.0,
+    exclude_conversation_id: Optional[UUID] = None,
+) -> List[Recollection]:
+    """
+    The user's `k` past messages most similar to `text` (best first), loaded
+    from the database. Returns nothing, rather than failing the request,
+    when the embedder is unavailable.
+    """
+    matches = await nearest(pipeline, user_id, text, k, exclude_conversation_id)
+    scores = {UUID(match.id): match.score for match in matches if match.score >= min_score}
+    if not scores:
+        return []
+
+    rows = await db.execute(
+        select(Message.id, Message.conversation_id, Message.role, Message.content).where(Message.id.in_(scores))
+    )
+    found = [Recollection(row.id, row.conversation_id, row.role, row.content, scores[row.id]) for row in rows]
+    return sorted(found, key=lambda item: item.score, reverse=True)
+
+__all__ = [
+    "CachedEmbedder",
+    "ChromaVectorStore",
+    "Embedder",
+    "EmbeddingPipeline",
+    "HashEmbedder",
+    "LocalVectorStore",
+    "OpenAIEmbedder",
+    "Recollection",
+    "VectorMatch",
+    "VectorStore",
+    "build_embedder",
+    "build_store",
+    "close_memory",
+    "get_memory",
+    "nearest",
+    "recall",
+    "set_memory",
+    "start_memory",
+]
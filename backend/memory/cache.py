@@ -0,0 +1,115 @@
+"""Content-addressed embedding cache
+
+Identical text (after Unicode and whitespace normalization) embedded with
+the same model always yields the same vector, so `CachedEmbedder` keys
+vectors by ``model + sha256(normalized text)`` and only sends cache misses
+to the wrapped embedder. Lookups go through a bounded in-process LRU first,
+then the shared cache (Redis in production), where vectors are stored as raw
+float16 (or float32) bytes: 512 bytes for a 256-dimension float16 vector.
+"""
+
+import hashlib
+import re
+import unicodedata
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from cache import CacheBackend, TTLCache
+from memory.embedders import Embedder
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys (NFC, trimmed, single spaces)"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+class CachedEmbedder(Embedder):
+    """Wraps an embedder with a local LRU tier and an optional shared tier"""
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        shared: Optional[CacheBackend] = None,
+        maxsize: int = 50000,
+        ttl: int = 7 * 24 * 3600,
+        dtype: str = "float16",
+    ):
+        self.embedder = embedder
+        self.name = embedder.name
+        self.model = embedder.model
+        self.dimensions = embedder.dimensions
+        self.shared = shared
+        self.ttl = ttl
+        self.dtype = np.dtype(dtype)
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.embedded = 0
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode()).hexdigest()
+        return f"emb:{self.model}:{self.dimensions}:{self.dtype.name}:{digest}"
+
+    def _decode(self, value: bytes) -> Optional[np.ndarray]:
+        vector = np.frombuffer(value, dtype=self.dtype)
+        return vector if len(vector) == self.dimensions else None
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        keys = [self.key(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        for key in dict.fromkeys(keys):
+            vector = self.local.get(key)
+            if vector is not None:
+                found[key] = vector
+
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing and self.shared is not None:
+            for key, value in zip(missing, await self.shared.get_many(missing)):
+                vector = self._decode(value) if value is not None else None
+                if vector is None:
+                    self.shared_misses += 1
+                    continue
+                self.shared_hits += 1
+                found[key] = vector
+                self.local.set(key, vector)
+            missing = [key for key in missing if key not in found]
+
+        if missing:
+            # Embed each distinct missing text once, even if repeated in the batch
+            first_text = {}
+            for key, text in zip(keys, texts):
+                first_text.setdefault(key, text)
+            vectors = await self.embedder.embed([first_text[key] for key in missing])
+            self.embedded += len(missing)
+            stored = {}
+            for key, vector in zip(missing, vectors):
+                compact = vector.astype(self.dtype)
+                found[key] = compact
+                self.local.set(key, compact)
+                stored[key] = compact.tobytes()
+            if self.shared is not None:
+                await self.shared.set_many(stored, self.ttl)
+
+        return np.stack([found[key] for key in keys]).astype(np.float32)
+
+    async def aclose(self):
+        await self.embedder.aclose()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit rates per tier and the number of texts actually embedded"""
+        local = self.local.stats()
+        lookups = local["hits"] + local["misses"]
+        return {
+            "local_size": local["size"],
+            "local_maxsize": local["maxsize"],
+            "local_hits": local["hits"],
+            "local_evictions": local["evictions"],
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "embedded": self.embedded,
+            "hit_rate": (local["hits"] + self.shared_hits) / lookups if lookups else 0.0,
+        }
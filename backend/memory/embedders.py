@@ -0,0 +1,120 @@
+"""Text embedders
+
+Every embedder returns an (n, dimensions) float32 array of L2-normalized
+vectors, so cosine similarity is a plain dot product downstream.
+"""
+
+import hashlib
+import re
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+import httpx
+import numpy as np
+
+from llm.base import ProviderError
+from llm.http_providers import _http2_available
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row (zero rows are left as zeros)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+class Embedder(ABC):
+    """Base class for embedding models"""
+
+    name: str = "base"
+    model: str = ""
+    dimensions: int = 0
+    remote: bool = False  # Calls a paid/slow API, so results are worth caching
+
+    @abstractmethod
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed a batch of texts"""
+
+    async def aclose(self):
+        """Release pooled connections, if any"""
+
+class HashEmbedder(Embedder):
+    """
+    Deterministic local embedder (feature hashing of words and word bigrams).
+    Captures lexical overlap only, but needs no model or network, so it backs
+    tests, benchmarks and offline development.
+    """
+
+    name = "hash"
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+        self.model = f"hash-{dimensions}"
+
+    def _features(self, text: str) -> List[str]:
+        words = [word.lower() for word in _WORD.findall(text)]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed_sync(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vectors[row, value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        return normalize_rows(vectors)
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.embed_sync(texts)
+
+class OpenAIEmbedder(Embedder):
+    """OpenAI embeddings API over a long-lived pooled client"""
+
+    name = "openai"
+    remote = True
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        model: str = "text-embedding-3-small",
+        dimensions: int = 1536,
+        timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.model = model
+        self.dimensions = dimensions
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            http2=transport is None and _http2_available(),
+            transport=transport,
+        )
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        try:
+            response = await self.client.post("/v1/embeddings", json={
+                "model": self.model,
+                "input": list(texts),
+                "dimensions": self.dimensions,
+            })
+            response.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            code = exc.response.status_code
+            raise ProviderError(
+                f"{self.name} embeddings returned HTTP {code}",
+                provider=self.name,
+                status_code=code,
+                retryable=code == 429 or code >= 500,
+            )
+        except httpx.HTTPError as exc:
+            raise ProviderError(f"{self.name} embeddings request failed: {exc!r}", provider=self.name, retryable=True)
+
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return normalize_rows(np.array([item["embedding"] for item in data], dtype=np.float32))
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,165 @@
+"""Background embedding of new messages
+
+Chat routes `submit()` each persisted message; a single background task
+collects them into batches (up to `batch_size`, or whatever arrived within
+`max_delay` seconds), embeds each batch with one embedder call, upserts the
+vectors into the user's partition of the vector store and records
+`Message.embedding_id`. Submission never blocks a request: when the queue is
+full new messages are dropped and counted (they can be re-embedded later by
+selecting rows whose `embedding_id` is NULL).
+"""
+
+import asyncio
+import logging
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import bindparam, update
+
+from database import Message, SessionLocal
+from memory.embedders import Embedder
+from memory.stores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Embedding inputs are truncated to roughly the provider's 8k-token limit
+MAX_EMBED_CHARS = 24000
+
+@dataclass
+class PendingMessage:
+    message_id: UUID
+    user_id: UUID
+    conversation_id: UUID
+    content: str
+
+class EmbeddingPipeline:
+    """Batches, embeds and indexes new messages off the request path"""
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        store: VectorStore,
+        session_factory=SessionLocal,
+        batch_size: int = 64,
+        max_delay: float = 0.5,
+        max_queue: int = 10000,
+    ):
+        self.embedder = embedder
+        self.store = store
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self._pending: Deque[PendingMessage] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.submitted = 0
+        self.embedded = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.flush_failures = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, message_id: UUID, user_id: UUID, conversation_id: UUID, content: str) -> bool:
+        """Queue a persisted message for embedding (False if dropped)"""
+        if not content.strip():
+            return False
+        if len(self._pending) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self._pending.append(PendingMessage(message_id, user_id, conversation_id, content[:MAX_EMBED_CHARS]))
+        self.submitted += 1
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def start(self):
+        """Start the background batching task on the running loop"""
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.max_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.drain()
+
+    async def drain(self):
+        """Embed everything queued so far, then persist the store"""
+        if not self._pending:
+            return
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            await self._process(batch)
+        try:
+            await self.store.flush()
+        except Exception:
+            # Unwritten changes stay pending in the store and go out with the next flush
+            self.flush_failures += 1
+            logger.exception("Persisting the vector store failed")
+
+    async def _process(self, batch: List[PendingMessage]):
+        try:
+            vectors = await self.embedder.embed([item.content for item in batch])
+
+            by_user: Dict[UUID, List[int]] = defaultdict(list)
+            for i, item in enumerate(batch):
+                by_user[item.user_id].append(i)
+            for user_id, rows in by_user.items():
+                await self.store.upsert(
+                    user_id,
+                    [str(batch[i].message_id) for i in rows],
+                    vectors[rows],
+                    [str(batch[i].conversation_id) for i in rows],
+                )
+
+            table = Message.__table__
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("message_id"))
+                    .values(embedding_id=bindparam("vector_id")),
+                    [{"message_id": item.message_id, "vector_id": str(item.message_id)} for item in batch],
+                )
+                await db.commit()
+            self.embedded += len(batch)
+            self.batches += 1
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Embedding batch of %d messages failed", len(batch))
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop the background task, giving queued messages `timeout` seconds to drain"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Dropped %d messages still queued for embedding at shutdown", len(self._pending))
+            self._task = None
+        await self.store.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+            "embedded": self.embedded,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "flush_failures": self.flush_failures,
+        }
@@ -0,0 +1,389 @@
+"""Vector stores partitioned by user
+
+`LocalVectorStore` keeps one in-memory matrix per user (loaded lazily) and
+answers queries with an exact dot-product scan, so results are filtered by
+user for free and recall is perfect. Shards are persisted as append-only
+``.npz`` segments of upserts and deletes under a directory, and compacted
+into one snapshot once too many accumulate. Segment files are numbered
+under a file lock and named after the writing process, so the workers of
+one server can share the directory: each reloads segments it has not seen
+before answering from a shard it has not checked for REFRESH_SECONDS.
+`ChromaVectorStore` delegates to Chroma (optional dependency) with a
+`user_id` metadata filter, for approximate (HNSW) search at larger scale.
+"""
+
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no inter-process locking, so one process per directory
+    fcntl = None
+
+# Scans over more rows than this run in a worker thread (BLAS releases the GIL)
+THREAD_SCAN_ROWS = 20000
+
+# Rewrite a user's shard as one snapshot segment once it has this many segment files
+MAX_SEGMENTS = 32
+
+SNAPSHOT_SUFFIX = ".snapshot.npz"
+LOCK_FILE = ".lock"
+
+# How stale a shard may be relative to segments flushed by other processes
+REFRESH_SECONDS = 1.0
+
+@dataclass
+class VectorMatch:
+    id: str
+    score: float
+    conversation_id: Optional[str] = None
+
+class VectorStore(ABC):
+    """Base class for per-user vector indexes"""
+
+    name: str = "base"
+
+    @abstractmethod
+    async def upsert(self, user_id: UUID, ids: Sequence[str], vectors: np.ndarray, conversation_ids: Sequence[str]):
+        """Insert or replace vectors (rows of `vectors`, L2-normalized)"""
+
+    @abstractmethod
+    async def query(
+        self,
+        user_id: UUID,
+        vector: np.ndarray,
+        k: int = 5,
+        exclude_conversation_id: Optional[str] = None,
+    ) -> List[VectorMatch]:
+        """The `k` most similar vectors of the user, best first"""
+
+    @abstractmethod
+    async def delete(self, user_id: UUID, ids: Sequence[str]):
+        """Remove vectors by id"""
+
+    @abstractmethod
+    async def count(self, user_id: UUID) -> int:
+        """Number of vectors stored for the user"""
+
+    async def flush(self):
+        """Persist pending writes"""
+
+    async def close(self):
+        """Flush and release resources"""
+        await self.flush()
+
+class _Shard:
+    """One user's vectors: a growable matrix plus id and conversation columns"""
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.lock = asyncio.Lock()  # Serializes this shard's segment reads and writes
+        self.segments: Set[str] = set()  # Segment files applied to the matrix
+        self.checked_at: Optional[float] = None  # Last look for segments written by other processes
+        self.changed: Dict[str, None] = {}  # Ids upserted or deleted since the last flush, in order
+        self.clear()
+
+    def clear(self):
+        self.vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+        self.codes = np.zeros(0, dtype=np.int32)  # Conversation code per row, -1 = deleted
+        self.size = 0
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.conversations: List[str] = []
+        self.conversation_codes: Dict[str, int] = {}
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        if needed <= len(self.vectors):
+            return
+        capacity = max(needed, 2 * len(self.vectors), 1024)
+        vectors = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        codes = np.full(capacity, -1, dtype=np.int32)
+        codes[:self.size] = self.codes[:self.size]
+        self.vectors, self.codes = vectors, codes
+
+    def _code(self, conversation_id: str) -> int:
+        code = self.conversation_codes.get(conversation_id)
+        if code is None:
+            code = self.conversation_codes[conversation_id] = len(self.conversations)
+            self.conversations.append(conversation_id)
+        return code
+
+    def _set(self, ids: Sequence[str], vectors: np.ndarray, conversation_ids: Sequence[str]):
+        self._reserve(len(ids))
+        for id_, vector, conversation_id in zip(ids, vectors, conversation_ids):
+            row = self.rows.get(id_)
+            if row is None:
+                row = self.rows[id_] = self.size
+                self.ids.append(id_)
+                self.size += 1
+            self.vectors[row] = vector
+            self.codes[row] = self._code(conversation_id)
+
+    def _remove(self, ids: Sequence[str]):
+        for id_ in ids:
+            row = self.rows.pop(id_, None)
+            if row is not None:
+                self.vectors[row] = 0
+                self.codes[row] = -1
+                self.ids[row] = ""
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, conversation_ids: Sequence[str]):
+        self._set(ids, vectors, conversation_ids)
+        self.changed.update(dict.fromkeys(ids))
+
+    def delete(self, ids: Sequence[str]):
+        self._remove(ids)
+        self.changed.update(dict.fromkeys(ids))
+
+    def segment(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """The current state of `ids`: rows for the live ones, tombstones for the others"""
+        live = [id_ for id_ in ids if id_ in self.rows]
+        rows = [self.rows[id_] for id_ in live]
+        return {
+            "vectors": self.vectors[rows],
+            "ids": np.array(live, dtype=str),
+            "conversations": np.array([self.conversations[self.codes[row]] for row in rows], dtype=str),
+            "deleted": np.array([id_ for id_ in ids if id_ not in self.rows], dtype=str),
+        }
+
+    def apply(self, segment: Dict[str, np.ndarray]):
+        """Replay a segment written by `segment()` (or an older one without tombstones)"""
+        self._set(list(segment["ids"]), segment["vectors"], list(segment["conversations"]))
+        if "deleted" in segment:
+            self._remove(list(segment["deleted"]))
+
+    def search(self, vector: np.ndarray, k: int, exclude: Optional[str]) -> List[VectorMatch]:
+        # Snapshot against concurrent appends, deletes and reloads (clear() swaps every column)
+        n, vectors, codes, ids, conversations = self.size, self.vectors, self.codes, self.ids, self.conversations
+        excluded = self.conversation_codes.get(exclude) if exclude is not None else None
+        if n == 0 or k <= 0:
+            return []
+        scores = vectors[:n] @ vector
+        invalid = codes[:n] < 0
+        if excluded is not None:
+            invalid |= codes[:n] == excluded
+        scores[invalid] = -np.inf
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        matches = []
+        for i in top:
+            # Deleted meanwhile: _remove sets the code to -1 before blanking the id
+            id_, code = ids[i], codes[i]
+            if scores[i] != -np.inf and id_ and code >= 0:
+                matches.append(VectorMatch(id_, float(scores[i]), conversations[code]))
+        return matches
+
+def _segment_number(name: str) -> int:
+    return int(name.split(".")[0].split("-")[0])
+
+def _is_snapshot(name: str) -> bool:
+    return name.endswith(SNAPSHOT_SUFFIX)
+
+@contextmanager
+def _directory_lock(directory: str, exclusive: bool) -> Iterator[None]:
+    """Inter-process lock on a shard directory (shared for reads; a no-op without fcntl)"""
+    with open(os.path.join(directory, LOCK_FILE), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield  # Closing the file releases the lock
+
+class LocalVectorStore(VectorStore):
+    """
+    Exact-search in-process vector store, persisted under `directory` (None =
+    memory only). Several processes (server workers) may share the directory:
+    each writes its own segments, and a shard picks up the others' at most
+    `refresh_seconds` after they were flushed.
+    """
+
+    name = "local"
+
+    def __init__(self, dimensions: int, directory: Optional[str] = None, refresh_seconds: float = REFRESH_SECONDS):
+        self.dimensions = dimensions
+        self.directory = directory
+        self.refresh_seconds = refresh_seconds
+        self._shards: Dict[UUID, _Shard] = {}
+
+    def _user_dir(self, user_id: UUID) -> str:
+        return os.path.join(self.directory, str(user_id))
+
+    def _read(self, directory: str, name: str) -> Dict[str, np.ndarray]:
+        with np.load(os.path.join(directory, name)) as segment:
+            return {key: segment[key] for key in segment.files}
+
+    def _list(self, directory: str) -> List[str]:
+        names = [name for name in os.listdir(directory) if name.endswith(".npz")]
+        return sorted(names, key=lambda name: (_segment_number(name), name))
+
+    def _read_new(self, user_id: UUID, known: Set[str]) -> Tuple[List[str], List[Tuple[str, Dict[str, np.ndarray]]]]:
+        """Segment names on disk, and the contents of those not in `known`"""
+        directory = self._user_dir(user_id)
+        if not os.path.isdir(directory):
+            return [], []
+        with _directory_lock(directory, exclusive=False):
+            names = self._list(directory)
+            return names, [(name, self._read(directory, name)) for name in names if name not in known]
+
+    def _write(
+        self, user_id: UUID, known: Set[str], segment: Dict[str, np.ndarray], compact: bool
+    ) -> Tuple[List[str], List[Tuple[str, Dict[str, np.ndarray]]]]:
+        """
+        Append `segment` after every existing one (or, with `compact`, merge
+        them all into one snapshot); returns the segment names now on disk and
+        the contents of those not in `known`, in order
+        """
+        directory = self._user_dir(user_id)
+        os.makedirs(directory, exist_ok=True)
+        with _directory_lock(directory, exclusive=True):
+            names = self._list(directory)
+            number = _segment_number(names[-1]) + 1 if names else 0
+            if compact:
+                merged = _Shard(self.dimensions)
+                for name in names:
+                    merged.apply(self._read(directory, name))
+                merged.apply(segment)
+                name, snapshot = f"{number:08d}-{os.getpid()}{SNAPSHOT_SUFFIX}", merged.segment(list(merged.rows))
+                self._save(directory, name, snapshot)
+                # Only the segments merged above: nobody can add one while the lock is held
+                for merged_name in names:
+                    os.remove(os.path.join(directory, merged_name))
+                return [name], [(name, snapshot)]
+            name = f"{number:08d}-{os.getpid()}.npz"
+            self._save(directory, name, segment)
+            new = [(other, self._read(directory, other)) for other in names if other not in known]
+            return names + [name], new + [(name, segment)]
+
+    def _save(self, directory: str, name: str, segment: Dict[str, np.ndarray]):
+        path = os.path.join(directory, name)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **segment)
+        os.replace(path + ".tmp", path)
+
+    def _merge(self, shard: _Shard, names: List[str], segments: List[Tuple[str, Dict[str, np.ndarray]]]):
+        """Apply segments newer than the shard's; changes not yet flushed stay on top"""
+        pending = shard.segment(list(shard.changed))
+        snapshots = [i for i, (name, _) in enumerate(segments) if _is_snapshot(name)]
+        if snapshots:
+            # A snapshot supersedes every earlier segment, including ones applied here
+            shard.clear()
+            segments = segments[snapshots[-1]:]
+        for _, segment in segments:
+            shard.apply(segment)
+        shard.apply(pending)
+        shard.segments = set(names)
+
+    async def _refresh(self, user_id: UUID, shard: _Shard):
+        async with shard.lock:
+            if shard.checked_at is not None and time.monotonic() - shard.checked_at < self.refresh_seconds:
+                return  # Another task just did
+            names, segments = await asyncio.to_thread(self._read_new, user_id, set(shard.segments))
+            if segments:
+                self._merge(shard, names, segments)
+            shard.checked_at = time.monotonic()
+
+    async def _shard(self, user_id: UUID) -> _Shard:
+        shard = self._shards.get(user_id)
+        if shard is None:
+            shard = self._shards.setdefault(user_id, _Shard(self.dimensions))
+        if self.directory and (shard.checked_at is None or time.monotonic() - shard.checked_at >= self.refresh_seconds):
+            # The first load is awaited; later refreshes are skipped while a flush holds the shard
+            if shard.checked_at is None or not shard.lock.locked():
+                await self._refresh(user_id, shard)
+        return shard
+
+    async def upsert(self, user_id: UUID, ids: Sequence[str], vectors: np.ndarray, conversation_ids: Sequence[str]):
+        (await self._shard(user_id)).upsert(ids, vectors, conversation_ids)
+
+    async def query(
+        self,
+        user_id: UUID,
+        vector: np.ndarray,
+        k: int = 5,
+        exclude_conversation_id: Optional[str] = None,
+    ) -> List[VectorMatch]:
+        shard = await self._shard(user_id)
+        if shard.size > THREAD_SCAN_ROWS:
+            return await asyncio.to_thread(shard.search, vector, k, exclude_conversation_id)
+        return shard.search(vector, k, exclude_conversation_id)
+
+    async def delete(self, user_id: UUID, ids: Sequence[str]):
+        (await self._shard(user_id)).delete(ids)
+
+    async def count(self, user_id: UUID) -> int:
+        return len((await self._shard(user_id)).rows)
+
+    async def flush(self):
+        """Append each changed shard's upserts and deletes as a segment (a snapshot once there are too many)"""
+        if not self.directory:
+            return
+        for user_id, shard in list(self._shards.items()):
+            if not shard.changed:
+                continue
+            async with shard.lock:
+                changed, shard.changed = shard.changed, {}
+                segment = shard.segment(list(changed))
+                compact = len(shard.segments) >= MAX_SEGMENTS
+                try:
+                    names, segments = await asyncio.to_thread(
+                        self._write, user_id, set(shard.segments), segment, compact
+                    )
+                except BaseException:
+                    shard.changed = {**changed, **shard.changed}  # Written by the next flush
+                    raise
+                self._merge(shard, names, segments)
+                shard.checked_at = time.monotonic()
+
+class ChromaVectorStore(VectorStore):
+    """Chroma collection with a `user_id` metadata filter (requires chromadb)"""
+
+    name = "chroma"
+
+    def __init__(self, path: str, collection_name: str):
+        import chromadb
+
+        self._client = chromadb.PersistentClient(path=path)
+        self._collection = self._client.get_or_create_collection(collection_name, metadata={"hnsw:space": "cosine"})
+
+    async def upsert(self, user_id: UUID, ids: Sequence[str], vectors: np.ndarray, conversation_ids: Sequence[str]):
+        await asyncio.to_thread(
+            self._collection.upsert,
+            ids=list(ids),
+            embeddings=vectors.tolist(),
+            metadatas=[{"user_id": str(user_id), "conversation_id": c} for c in conversation_ids],
+        )
+
+    async def query(
+        self,
+        user_id: UUID,
+        vector: np.ndarray,
+        k: int = 5,
+        exclude_conversation_id: Optional[str] = None,
+    ) -> List[VectorMatch]:
+        where = {"user_id": str(user_id)}
+        if exclude_conversation_id is not None:
+            where = {"$and": [where, {"conversation_id": {"$ne": exclude_conversation_id}}]}
+        result = await asyncio.to_thread(
+            self._collection.query, query_embeddings=[vector.tolist()], n_results=k, where=where
+        )
+        return [
+            VectorMatch(id_, 1.0 - distance, metadata.get("conversation_id"))
+            for id_, distance, metadata in zip(result["ids"][0], result["distances"][0], result["metadatas"][0])
+        ]
+
+    async def delete(self, user_id: UUID, ids: Sequence[str]):
+        await asyncio.to_thread(self._collection.delete, ids=list(ids))
+
+    async def count(self, user_id: UUID) -> int:
+        result = await asyncio.to_thread(self._collection.get, where={"user_id": str(user_id)}, include=[])
+        return len(result["ids"])
@@ -0,0 +1,88 @@
+"""Process metrics exposed at /metrics in the Prometheus text format
+
+Each worker process keeps and serves its own values; they are not shared
+between processes. Behind the multi-worker server (app.server) set
+METRICS_PORT so every worker also listens on a port of its own
+(metrics.exporter); Prometheus scrapes each of them and aggregates, e.g.
+`sum without (instance) (rate(http_requests_total[5m]))`.
+"""
+
+from metrics.registry import CONTENT_TYPE, Counter, Gauge, Histogram, Registry
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to complete an HTTP response, body included", ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests currently being served")
+
+# `engine` is "primary" or the replica's name (see database.replicas)
+DB_CHECKOUT_SECONDS = REGISTRY.histogram(
+    "db_pool_checkout_seconds", "Time waiting for a database connection from the pool", ("engine",)
+)
+DB_POOL_CHECKED_OUT = REGISTRY.gauge(
+    "db_pool_checked_out", "Database connections currently checked out", ("engine",)
+)
+DB_QUERIES = REGISTRY.counter("db_queries_total", "SQL statements executed")
+DB_QUERIES_PER_REQUEST = REGISTRY.histogram(
+    "db_queries_per_request",
+    "SQL statements executed while serving one HTTP request",
+    ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+
+PASSWORD_HASH_SECONDS = REGISTRY.histogram(
+    "password_hash_seconds", "bcrypt time per call, excluding the pool queue", ("operation",)
+)
+PASSWORD_POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "password_pool_wait_seconds", "Time bcrypt jobs waited for a hashing thread"
+)
+JWT_DECODE_SECONDS = REGISTRY.histogram(
+    "jwt_decode_seconds",
+    "JWT signature verification and decoding time",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005),
+)
+LLM_TIME_TO_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "llm_time_to_first_token_seconds", "Time from a streamed model call to its first token", ("provider", "model")
+)
+LLM_COMPLETION_SECONDS = REGISTRY.histogram(
+    "llm_completion_seconds",
+    "Time for a non-streamed model call to return the full reply",
+    ("provider", "model"),
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+SSE_STREAMS_ACTIVE = REGISTRY.gauge("sse_streams_active", "Chat replies currently streaming")
+SSE_STREAMS_INTERRUPTED = REGISTRY.counter(
+    "sse_streams_interrupted_total", "Streams ended early because the worker was shutting down"
+)
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text format"""
+    return REGISTRY.render()
+
+__all__ = [
+    "CONTENT_TYPE",
+    "Counter",
+    "DB_CHECKOUT_SECONDS",
+    "DB_POOL_CHECKED_OUT",
+    "DB_QUERIES",
+    "DB_QUERIES_PER_REQUEST",
+    "Gauge",
+    "HTTP_IN_FLIGHT",
+    "HTTP_REQUESTS",
+    "HTTP_REQUEST_SECONDS",
+    "Histogram",
+    "JWT_DECODE_SECONDS",
+    "LLM_COMPLETION_SECONDS",
+    "LLM_TIME_TO_FIRST_TOKEN_SECONDS",
+    "PASSWORD_HASH_SECONDS",
+    "PASSWORD_POOL_WAIT_SECONDS",
+    "REGISTRY",
+    "Registry",
+    "SSE_STREAMS_ACTIVE",
+    "SSE_STREAMS_INTERRUPTED",
+    "render_metrics",
+]
@@ -0,0 +1,67 @@
+"""Per-worker metrics port
+
+Workers of a multi-process server share the API socket, so a scrape of
+/metrics there reaches whichever worker accepts it. With METRICS_PORT set,
+each worker also serves /metrics on a port of its own: the first free one
+in METRICS_PORT .. METRICS_PORT + WEB_CONCURRENCY - 1, so Prometheus
+scrapes every worker once per interval and sums across them.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from metrics import CONTENT_TYPE, render_metrics
+
+logger = logging.getLogger(__name__)
+
+class MetricsServer:
+    """Minimal HTTP server answering GET /metrics with this process's metrics"""
+
+    def __init__(self):
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str, first_port: int, ports: int) -> Optional[int]:
+        """Listen on the first free port of the range; returns it, or None when all are taken"""
+        if self._server is not None:
+            return self.port
+        for port in range(first_port, first_port + max(1, ports)):
+            try:
+                self._server = await asyncio.start_server(self._handle, host, port)
+            except OSError:
+                continue
+            self.port = port
+            return port
+        logger.warning("No free metrics port in %d-%d; this worker's metrics are not exported",
+                       first_port, first_port + max(1, ports) - 1)
+        return None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            while (await asyncio.wait_for(reader.readline(), timeout=5.0)) not in (b"\r\n", b"\n", b""):
+                pass  # Headers are not needed
+            parts = request_line.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+                status, content_type, body = "200 OK", CONTENT_TYPE, render_metrics().encode()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            self.port = None
+
+metrics_server = MetricsServer()
@@ -0,0 +1,73 @@
+"""ASGI middleware recording per-route HTTP metrics"""
+
+import time
+from typing import Dict, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metrics import DB_QUERIES_PER_REQUEST, HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, HTTP_REQUESTS
+from metrics.sql import request_queries
+
+class _RouteSeries:
+    """The series one (method, route) updates, resolved once instead of per request"""
+    __slots__ = ("method", "route", "duration", "queries", "statuses")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.duration = HTTP_REQUEST_SECONDS.labels(method, route)
+        self.queries = DB_QUERIES_PER_REQUEST.labels(route)
+        self.statuses = {}
+
+    def count(self, status: int):
+        counter = self.statuses.get(status)
+        if counter is None:
+            counter = self.statuses[status] = HTTP_REQUESTS.labels(self.method, self.route, str(status))
+        counter.value += 1
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request until its body is fully sent (so streamed
+    replies count their whole stream), counts it by status, tracks requests
+    in flight and records the SQL statements it executed. Routes are
+    labelled by their path template (e.g. /api/conversations/{conversation_id}),
+    and requests matching no route as "unmatched", which keeps the number of
+    series bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._series: Dict[Tuple[str, str], _RouteSeries] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        queries = [0]
+        token = request_queries.set(queries)
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT._default
+        in_flight.value += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.value -= 1
+            request_queries.reset(token)
+            route = scope.get("route")
+            key = (scope["method"], route.path if route is not None else "unmatched")
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _RouteSeries(*key)
+            series.duration.observe(elapsed)
+            series.queries.observe(queries[0])
+            series.count(status)
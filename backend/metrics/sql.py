@@ -0,0 +1,60 @@
+"""Database instrumentation: pool checkout wait and per-request query counts"""
+
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Type
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import Pool
+
+from metrics import DB_CHECKOUT_SECONDS, DB_POOL_CHECKED_OUT, DB_QUERIES
+
+# Statement count of the HTTP request being served, set by MetricsMiddleware
+request_queries: ContextVar[Optional[List[int]]] = ContextVar("request_queries", default=None)
+
+def timed_pool_class(pool_class: Type[Pool], engine_name: str) -> Type[Pool]:
+    """
+    `pool_class` recording how long each checkout takes (waiting for a free
+    connection, opening one and the pre-ping) under the `engine_name` label.
+    Pool events only fire once a connection is checked out, so the wait is
+    timed around `connect()`.
+    """
+    checkout_seconds = DB_CHECKOUT_SECONDS.labels(engine_name)
+
+    class TimedPool(pool_class):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                checkout_seconds.observe(time.perf_counter() - started)
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    DB_QUERIES.inc()
+    queries = request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+def instrument_engine(engine: AsyncEngine, engine_name: str):
+    """
+    Count the statements `engine` executes (per process and per request) and
+    its checked-out connections, labelled `engine_name`
+    """
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _count_statement):
+        return
+    checked_out = DB_POOL_CHECKED_OUT.labels(engine_name)
+
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out.inc()
+
+    def checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+    event.listen(sync_engine, "before_cursor_execute", _count_statement)
+    event.listen(sync_engine, "checkout", checkout)
+    event.listen(sync_engine, "checkin", checkin)
@@ -0,0 +1,32 @@
+"""Request rate limiting"""
+
+from typing import Optional
+
+from cache import RedisCache, get_cache
+from ratelimit.limiters import LocalRateLimiter, RateLimiter, RateLimitResult, RedisRateLimiter, gcra
+
+_limiter: Optional[RateLimiter] = None
+
+def get_limiter() -> RateLimiter:
+    """The process-wide limiter: Redis-backed when the shared cache is Redis, else per-process"""
+    global _limiter
+    if _limiter is None:
+        cache = get_cache()
+        local = LocalRateLimiter()
+        _limiter = RedisRateLimiter(cache.client, local) if isinstance(cache, RedisCache) else local
+    return _limiter
+
+def set_limiter(limiter: Optional[RateLimiter]):
+    """Replace the process-wide limiter (tests and benchmarks)"""
+    global _limiter
+    _limiter = limiter
+
+__all__ = [
+    "LocalRateLimiter",
+    "RateLimitResult",
+    "RateLimiter",
+    "RedisRateLimiter",
+    "gcra",
+    "get_limiter",
+    "set_limiter",
+]
@@ -0,0 +1,128 @@
+"""GCRA rate limiters (in-process and Redis-backed)
+
+The generic cell rate algorithm keeps one timestamp per key, the theoretical
+arrival time (TAT) of the next request. A key allowed `limit` requests per
+`window` seconds earns one request every ``window / limit`` seconds and may
+burst up to `limit` at once. A request is allowed unless it would push the
+TAT more than `window` ahead of now, so the decision is a single
+read-compare-write: an atomic Lua script in Redis, shared by every worker.
+"""
+
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # Seconds until the full quota is available again
+    retry_after: float  # Seconds until a request would be allowed (0 when allowed)
+
+def gcra(tat: float, now: float, limit: int, window: float) -> Tuple[RateLimitResult, float]:
+    """One GCRA decision: the result and the key's new TAT"""
+    emission = window / limit
+    tat = max(tat, now)
+    new_tat = tat + emission
+    allow_at = new_tat - window
+    if allow_at - now > 1e-9:  # Tolerate float rounding on exact boundaries
+        return RateLimitResult(False, limit, 0, tat - now, allow_at - now), tat
+    remaining = math.floor((window - (new_tat - now)) / emission + 1e-9)
+    return RateLimitResult(True, limit, remaining, new_tat - now, 0.0), new_tat
+
+# Mirrors gcra() in integer microseconds on the Redis clock, so workers never
+# disagree about time. ARGV: emission interval and window, in microseconds.
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + emission
+local allow_at = new_tat - window
+if now < allow_at then
+    return {0, 0, math.floor(tat - now), math.ceil(allow_at - now)}
+end
+redis.call('SET', KEYS[1], string.format('%.0f', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+return {1, math.floor((window - (new_tat - now)) / emission + 0.000001), math.floor(new_tat - now), 0}
+"""
+
+class RateLimiter(ABC):
+    """Base class for rate limiters"""
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        """Count one request against `key` and decide whether it is allowed"""
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+class LocalRateLimiter(RateLimiter):
+    """
+    Per-process GCRA. Limits are only exact within one worker, so it serves
+    single-worker deployments and as the fallback while Redis is down.
+    """
+
+    def __init__(self, maxsize: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._tats = TTLCache(maxsize=maxsize, ttl=86400)
+        self.allowed = 0
+        self.rejected = 0
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        now = self.clock()
+        result, tat = gcra(self._tats.get(key) or now, now, limit, window)
+        if result.allowed:
+            self._tats.set(key, tat, ttl=result.reset_after)
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {"allowed": self.allowed, "rejected": self.rejected, "keys": self._tats.stats()["size"]}
+
+class RedisRateLimiter(RateLimiter):
+    """
+    GCRA shared by all workers through an atomic Redis script. When Redis
+    fails, decisions fall back to `fallback` (per-process) and Redis is
+    skipped for `retry_after` seconds, mirroring RedisCache.
+    """
+
+    def __init__(self, client, fallback: RateLimiter, retry_after: float = 5.0):
+        import redis.asyncio as redis
+
+        self._errors = (redis.RedisError, OSError)
+        self.script = client.register_script(GCRA_SCRIPT)
+        self.fallback = fallback
+        self.retry_after = retry_after
+        self._down_until = 0.0
+        self.fallbacks = 0
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        if time.monotonic() >= self._down_until:
+            emission = window * 1_000_000 / limit
+            try:
+                allowed, remaining, reset_us, retry_us = await self.script(
+                    keys=[key], args=[emission, window * 1_000_000]
+                )
+                return RateLimitResult(bool(allowed), limit, int(remaining), reset_us / 1e6, retry_us / 1e6)
+            except self._errors as exc:
+                logger.warning("Redis rate limiting failed, limiting per process for %.0fs: %s", self.retry_after, exc)
+                self._down_until = time.monotonic() + self.retry_after
+        self.fallbacks += 1
+        return await self.fallback.hit(key, limit, window)
+
+    def stats(self) -> Dict[str, int]:
+        return {"fallbacks": self.fallbacks, **self.fallback.stats()}
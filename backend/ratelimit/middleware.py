@@ -0,0 +1,83 @@
+"""ASGI middleware authenticating API keys and enforcing their rate limits"""
+
+import json
+import math
+from typing import Dict
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from auth.api_keys import authenticate_api_key, presented_api_key
+from ratelimit import get_limiter
+from ratelimit.limiters import RateLimitResult
+
+def rate_limit_headers(result: RateLimitResult, window: int) -> Dict[str, str]:
+    """RateLimit-* response headers (IETF draft) for a decision"""
+    return {
+        "RateLimit-Limit": str(result.limit),
+        "RateLimit-Remaining": str(result.remaining),
+        "RateLimit-Reset": str(math.ceil(result.reset_after)),
+        "RateLimit-Policy": f"{result.limit};w={window}",
+    }
+
+class RateLimitMiddleware:
+    """
+    Requests bearing an API key are authenticated here, before routing: an
+    unknown, revoked or expired key gets 401, and a key over its
+    `rate_limit_requests` per `rate_limit_window` gets 429 with Retry-After,
+    without touching the route or the database. Allowed requests carry the
+    identity in `request.state.api_key` (read by get_current_user) and get
+    RateLimit-* headers. JWT and anonymous requests pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        key = presented_api_key(scope["headers"])
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        identity = await authenticate_api_key(key)
+        if identity is None:
+            await _respond(send, 401, "Invalid or expired API key", {"WWW-Authenticate": "Bearer"})
+            return
+        scope.setdefault("state", {})["api_key"] = identity
+        if not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        result = await get_limiter().hit(
+            f"ratelimit:{identity.id}", identity.rate_limit_requests, identity.rate_limit_window
+        )
+        headers = rate_limit_headers(result, identity.rate_limit_window)
+        if not result.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(result.retry_after)))
+            await _respond(send, 429, "Rate limit exceeded", headers)
+            return
+
+        raw_headers = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + raw_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+async def _respond(send: Send, status: int, detail: str, headers: Dict[str, str]):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *((name.lower().encode(), value.encode()) for name, value in headers.items()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
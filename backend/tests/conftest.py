@@ -0,0 +1,44 @@
+"""Shared test configuration"""
+
+import asyncio
+import os
+import pytest
+
+# Point the application at a local SQLite file (via aiosqlite) before app modules are imported
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./test.db")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("CACHE_BACKEND", "memory")
+os.environ.setdefault("VECTOR_STORE_DIR", "")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from database import Base, engine
+
+async def _recreate_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+@pytest.fixture
+def reset_db():
+    """Reset database before the test"""
+    asyncio.run(_recreate_tables())
+    yield
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+@pytest.fixture
+def auth_headers(reset_db, client):
+    """Register a fresh user and return its bearer auth header"""
+    response = client.post(
+        "/api/auth/register",
+        json={
+            "email": "fixture@example.com",
+            "username": "fixture",
+            "password": "Password123!"
+        }
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
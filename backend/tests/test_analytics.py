@@ -0,0 +1,127 @@
+"""Analytics event buffer tests (batching, back-pressure, spilling, route events)"""
+
+import asyncio
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import exc, func, select
+
+from analytics import EventBuffer, WRITERS, set_event_buffer
+from database import ConversationMetadata, SessionLocal, SessionLog, User
+
+@pytest.fixture
+def buffer():
+    events = EventBuffer(WRITERS, batch_size=3, max_delay=0.05, max_queue=10)
+    set_event_buffer(events)
+    yield events
+    set_event_buffer(None)
+
+def test_login_and_chat_events_are_written_in_batches(client, auth_headers, buffer):
+    login = client.post(
+        "/api/auth/login",
+        json={"email": "fixture@example.com", "password": "Password123!"},
+        headers={"User-Agent": "pytest"},
+    )
+    first = client.post("/api/chat/message", json={"message": "hello"}, headers=auth_headers).json()
+    client.post(
+        "/api/chat/message",
+        json={"message": "again", "conversation_id": first["conversation_id"]},
+        headers=auth_headers,
+    )
+    assert login.status_code == 200
+    assert buffer.pending == 3
+
+    async def drain_and_read():
+        await buffer.drain()
+        async with SessionLocal() as db:
+            sessions = (await db.scalars(select(SessionLog))).all()
+            metadata = (await db.scalars(select(ConversationMetadata))).all()
+        return sessions, metadata
+
+    sessions, metadata = asyncio.run(drain_and_read())
+    assert [s.user_agent for s in sessions] == ["pytest"]
+    assert len(metadata) == 1 and metadata[0].session_duration_seconds is not None
+    assert buffer.stats()["written"] == 3 and buffer.flushes == 1
+
+@pytest.mark.asyncio
+async def test_background_task_flushes_full_batches_and_drains_on_stop(reset_db):
+    async with SessionLocal() as db:
+        user = User(email="a@example.com", username="a", password_hash="x")
+        db.add(user)
+        await db.commit()
+
+    def session_row(i):
+        now = datetime.utcnow()
+        return {"id": uuid4(), "user_id": user.id, "session_token": f"t{i}", "ip_address": None,
+                "user_agent": None, "started_at": now, "ended_at": None, "created_at": now}
+
+    buffer = EventBuffer(WRITERS, batch_size=4, max_delay=60)
+    buffer.start()
+    for i in range(4):
+        buffer.submit("session_log", session_row(i))
+    await asyncio.sleep(0.1)
+    assert buffer.written == 4  # The full batch was written without waiting for max_delay
+    buffer.submit("session_log", session_row(4))
+    await buffer.stop()
+
+    async with SessionLocal() as db:
+        assert await db.scalar(select(func.count()).select_from(SessionLog)) == 5
+
+@pytest.mark.asyncio
+async def test_overflow_spills_to_disk_and_reloads_on_start(tmp_path):
+    written = []
+
+    async def record(db, rows):
+        written.extend(rows)
+
+    spilling = EventBuffer({"event": record}, max_queue=2, spill_dir=str(tmp_path))
+    ids = [uuid4() for _ in range(5)]
+    for event_id in ids:
+        spilling.submit("event", {"id": event_id})
+    assert spilling.stats()["spilled"] == 3 and spilling.pending == 2
+
+    dropping = EventBuffer({"event": record}, max_queue=2)
+    for event_id in ids:
+        dropping.submit("event", {"id": event_id})
+    assert dropping.dropped == 3
+
+    restarted = EventBuffer({"event": record}, max_delay=60, spill_dir=str(tmp_path))
+    restarted.start()
+    await restarted.stop()
+    assert [row["id"] for row in written] == ids[2:]  # UUIDs survive the round trip
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_unreachable_database_spills_the_batch(tmp_path):
+    async def fail(db, rows):
+        raise exc.OperationalError("INSERT", {}, ConnectionRefusedError("database down"))
+
+    buffer = EventBuffer({"event": fail}, spill_dir=str(tmp_path))
+    buffer.submit("event", {"n": 1})
+    await buffer.drain()
+    assert buffer.stats()["failed"] == 1 and buffer.spilled == 1 and buffer.rejected == 0
+
+@pytest.mark.asyncio
+async def test_rejected_rows_are_dropped_without_losing_the_rest(tmp_path):
+    """A poison row is dropped alone; the other rows and kinds in its batch are written, nothing is spilled"""
+    written = {"event": [], "other": []}
+
+    def writer(kind):
+        async def write(db, rows):
+            if any(row.get("poison") for row in rows):
+                raise exc.IntegrityError("INSERT", {}, Exception("FOREIGN KEY constraint failed"))
+            written[kind].extend(row["n"] for row in rows)
+        return write
+
+    buffer = EventBuffer({"event": writer("event"), "other": writer("other")}, batch_size=10, spill_dir=str(tmp_path))
+    for n in range(6):
+        buffer.submit("event", {"n": n, "poison": n == 3})
+    buffer.submit("other", {"n": 0})
+    buffer.submit("unknown", {"n": 0})
+    await buffer.drain()
+
+    assert sorted(written["event"]) == [0, 1, 2, 4, 5]
+    assert written["other"] == [0]
+    assert buffer.stats()["rejected"] == 2 and buffer.spilled == 0
+    assert list(tmp_path.iterdir()) == []
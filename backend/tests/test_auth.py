@@ -2,38 +2,14 @@
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from uuid import uuid4
 
 from app.main import app
-from database import Base, get_db, User
-from auth.security import hash_password
 
-# Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base.metadata.create_all(bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
 client = TestClient(app)
 
 @pytest.fixture(autouse=True)
-def reset_db():
+def _reset_db(reset_db):
     """Reset database before each test"""
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
     yield
 
 def test_register_success():
@@ -148,6 +124,16 @@ def test_refresh_token():
     data = response.json()
     assert "access_token" in data
 
+def test_refresh_token_with_non_uuid_subject():
+    """A signed refresh token whose subject is not a user id is rejected, not a server error"""
+    from auth.security import create_refresh_token
+
+    response = client.post(
+        "/api/auth/refresh",
+        json={"refresh_token": create_refresh_token("not-a-uuid")}
+    )
+    assert response.status_code == 401
+
 def test_get_current_user():
     """Test getting current user info"""
     # Register
@@ -174,3 +160,20 @@ def test_unauthorized_without_token():
     """Test that protected endpoints require authentication"""
     response = client.get("/api/auth/me")
     assert response.status_code == 403
+
+def test_update_settings_is_visible_on_read():
+    """Settings updates are written through to the cache"""
+    register_response = client.post(
+        "/api/auth/register",
+        json={
+            "email": "test@example.com",
+            "username": "testuser",
+            "password": "Password123!"
+        }
+    )
+    headers = {"Authorization": f"Bearer {register_response.json()['access_token']}"}
+    
+    assert client.get("/api/auth/settings", headers=headers).json()["theme"] == "light"
+    response = client.put("/api/auth/settings", headers=headers, json={"theme": "dark"})
+    assert response.status_code == 200
+    assert client.get("/api/auth/settings", headers=headers).json()["theme"] == "dark"
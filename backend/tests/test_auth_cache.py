@@ -0,0 +1,226 @@
+"""Verified-token, user and settings cache tests"""
+
+import asyncio
+import time
+from uuid import uuid4
+
+import pytest
+
+from auth.cache import (
+    INITIAL_GENERATION,
+    USER_KEY,
+    decode_access_token_cached,
+    invalidate_user,
+    load_user,
+    token_cache,
+    user_cache,
+)
+from auth.schemas import CurrentUser
+from auth.security import create_access_token, create_refresh_token
+from cache import InMemoryCache, SingleFlight, TTLCache, set_cache
+
+def make_user(**overrides) -> CurrentUser:
+    values = {
+        "id": uuid4(),
+        "email": "cache@example.com",
+        "username": "cache",
+        "is_active": True,
+        "is_verified": False,
+        "created_at": "2026-01-01T00:00:00",
+        "updated_at": "2026-01-01T00:00:00",
+    }
+    values.update(overrides)
+    return CurrentUser(**values)
+
+class CountingSession:
+    """Minimal AsyncSession stand-in that counts primary-key lookups"""
+
+    def __init__(self, row):
+        self.row = row
+        self.gets = 0
+
+    async def get(self, model, ident):
+        self.gets += 1
+        row = self.row
+        await asyncio.sleep(0.01)
+        return row
+
+@pytest.fixture
+def shared_cache():
+    backend = InMemoryCache()
+    set_cache(backend)
+    user_cache.clear()
+    yield backend
+    set_cache(None)
+
+def test_ttl_cache_evicts_lru_and_expired():
+    """Entries are evicted by LRU order and by expiry"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("short", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    assert cache.stats()["hits"] == 2
+
+def test_token_cache_hit():
+    """A repeated access token is served from the cache"""
+    token = create_access_token(str(uuid4()))
+    hits = token_cache.hits
+    first = decode_access_token_cached(token)
+    second = decode_access_token_cached(token)
+    assert first is second
+    assert token_cache.hits == hits + 1
+
+def test_token_cache_rejects_refresh_tokens():
+    """Refresh tokens are never accepted (or cached) as access tokens"""
+    assert decode_access_token_cached(create_refresh_token(str(uuid4()))) is None
+
+@pytest.mark.asyncio
+async def test_cold_user_loads_once(shared_cache):
+    """Concurrent lookups of a cold user issue one query and fill both tiers"""
+    user = make_user()
+    db = CountingSession(user)
+    results = await asyncio.gather(*(load_user(db, user.id) for _ in range(100)))
+
+    assert db.gets == 1
+    assert all(result == user for result in results)
+    assert await shared_cache.get(USER_KEY.format(user.id, INITIAL_GENERATION)) is not None
+
+    # Another worker (empty local tier) is served from the shared tier
+    user_cache.clear()
+    assert await load_user(db, user.id) == user
+    assert db.gets == 1
+
+@pytest.mark.asyncio
+async def test_invalidate_user(shared_cache):
+    """Invalidation drops the user from both tiers"""
+    user = make_user()
+    db = CountingSession(user)
+    await load_user(db, user.id)
+    await invalidate_user(str(user.id))
+
+    assert user_cache.get(user.id) is None
+    assert await load_user(db, user.id) == user
+    assert db.gets == 2
+
+@pytest.mark.asyncio
+async def test_load_overlapping_invalidation_is_not_served(shared_cache):
+    """A load that read the old row before an invalidation cannot cache it afterwards"""
+    old = make_user()
+    new = old.model_copy(update={"is_active": False})
+    db = CountingSession(old)
+    load = asyncio.ensure_future(load_user(db, old.id))
+    while db.gets == 0:  # Wait until the load has read its generation and is querying the old row
+        await asyncio.sleep(0)
+
+    db.row = new
+    await invalidate_user(old.id)
+    assert await load == old  # Its caller still gets what it read...
+
+    # ...but neither tier serves it afterwards
+    assert user_cache.get(old.id) is None
+    assert await load_user(db, old.id) == new
+    user_cache.clear()
+    assert await load_user(db, old.id) == new
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors():
+    """Followers see the leader's exception and the key is released"""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flight) == 0
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_leader_cancellation():
+    """A cancelled leader doesn't fail its followers; one of them reruns the loader"""
+    flight = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    leader = asyncio.ensure_future(flight.do("k", load))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.ensure_future(flight.do("k", load)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await asyncio.gather(*followers) == [2, 2]
+    assert leader.cancelled()
+    assert calls == 2
+    assert len(flight) == 0
+
+@pytest.mark.asyncio
+async def test_single_flight_follower_cancellation_propagates():
+    """Cancelling a follower cancels only that follower"""
+    flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    leader = asyncio.ensure_future(flight.do("k", load))
+    await asyncio.sleep(0.01)
+    follower = asyncio.ensure_future(flight.do("k", load))
+    await asyncio.sleep(0.01)
+    follower.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await follower
+    assert await leader == "ok"
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_other_workers():
+    """invalidate_user in one worker evicts the user from every worker's local tier"""
+    fakeredis = pytest.importorskip("fakeredis")
+    from auth.cache import USER_INVALIDATION_CHANNEL, user_invalidation_listener
+    from cache import RedisCache
+
+    server = fakeredis.FakeServer()
+    shared = RedisCache("redis://unused")
+    shared.client = fakeredis.aioredis.FakeRedis(server=server)
+    set_cache(shared)
+    other_worker = fakeredis.aioredis.FakeRedis(server=server)
+    user = make_user()
+    try:
+        user_invalidation_listener.start()
+        while await other_worker.pubsub_numsub(USER_INVALIDATION_CHANNEL) != [(USER_INVALIDATION_CHANNEL.encode(), 1)]:
+            await asyncio.sleep(0.01)
+        user_cache.set(user.id, user)
+
+        # The "other worker" invalidates the user; this worker's listener evicts it
+        assert await other_worker.publish(USER_INVALIDATION_CHANNEL, str(user.id).encode()) == 1
+        for _ in range(100):
+            if user_cache.get(user.id) is None:
+                break
+            await asyncio.sleep(0.01)
+        assert user_cache.get(user.id) is None
+        assert user_invalidation_listener.received == 1
+
+        # And this worker's invalidate_user is published for the others
+        pubsub = other_worker.pubsub()
+        await pubsub.subscribe(USER_INVALIDATION_CHANNEL)
+        await invalidate_user(user.id)
+        message = None
+        for _ in range(5):  # The first read may return the (ignored) subscribe confirmation
+            message = message or await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+        assert message["data"] == str(user.id).encode()
+        await pubsub.aclose()
+    finally:
+        await user_invalidation_listener.stop()
+        set_cache(None)
+        await other_worker.aclose()
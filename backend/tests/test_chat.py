@@ -0,0 +1,185 @@
+"""Chat route tests (SSE streaming and single replies)"""
+
+import asyncio
+import json
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.lifecycle import stream_drain
+from app.routes.chat import stream_reply
+from database import Message, SessionLocal
+from llm import FakeProvider, set_provider
+
+@pytest.fixture
+def provider():
+    fake = FakeProvider(tokens_per_second=0, first_token_latency=0, reply="Hello there friend")
+    set_provider(fake)
+    yield fake
+    set_provider(None)
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+async def fetch_messages(conversation_id):
+    async with SessionLocal() as db:
+        result = await db.scalars(
+            select(Message).where(Message.conversation_id == conversation_id).order_by(Message.created_at)
+        )
+        return list(result)
+
+def test_stream_message(client, auth_headers, provider):
+    """Tokens are streamed as SSE events and the reply is persisted once"""
+    response = client.get("/api/chat/stream", params={"message": "hi"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_events(response.text)
+    assert [name for name, _ in events] == ["start", "token", "token", "token", "done"]
+    assert "".join(data["content"] for name, data in events if name == "token") == "Hello there friend"
+
+    conversation_id = events[0][1]["conversation_id"]
+    messages = asyncio.run(fetch_messages(UUID(conversation_id)))
+    assert [(m.role, m.content) for m in messages] == [("user", "hi"), ("assistant", "Hello there friend")]
+
+def test_stream_unknown_conversation(client, auth_headers, provider):
+    """Streaming into another user's (or a missing) conversation is rejected"""
+    response = client.get(
+        "/api/chat/stream",
+        params={"message": "hi", "conversation_id": str(uuid4())},
+        headers=auth_headers,
+    )
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_generation():
+    """Closing the stream mid-reply stops the provider and persists nothing"""
+    provider = FakeProvider(tokens_per_second=1000, first_token_latency=0, response_tokens=1000)
+    events = stream_reply(provider, [{"role": "user", "content": "hi"}], uuid4(), "gpt-4")
+
+    async def consume():
+        async for _ in events:
+            pass
+
+    task = asyncio.ensure_future(consume())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert provider.cancelled == 1
+    assert provider.completed == 0
+    assert provider.tokens_generated < 1000
+
+@pytest.mark.asyncio
+async def test_shutdown_drain_ends_streams_early():
+    """Past the drain deadline a stream stops generating and tells the client to retry"""
+    provider = FakeProvider(tokens_per_second=1000, first_token_latency=0, response_tokens=1000)
+    events = stream_reply(provider, [{"role": "user", "content": "hi"}], uuid4(), "gpt-4")
+    received = [await events.__anext__() for _ in range(3)]
+    stream_drain.begin(0)
+    try:
+        received += [event async for event in events]
+    finally:
+        stream_drain.reset()
+
+    names = [name for name, _ in parse_events("".join(received))]
+    assert names == ["start", "token", "token", "error"]
+    assert provider.cancelled == 1
+    assert provider.completed == 0
+
+def test_send_message(client, auth_headers, provider):
+    """Non-streamed messages go through the provider and are persisted"""
+    response = client.post("/api/chat/message", json={"message": "hi"}, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["message"] == "Hello there friend"
+
+    messages = asyncio.run(fetch_messages(UUID(data["conversation_id"])))
+    assert [m.role for m in messages] == ["user", "assistant"]
+
+def test_send_message_includes_history(client, auth_headers, provider):
+    """Follow-up messages are sent with the earlier turns of the conversation"""
+    first = client.post("/api/chat/message", json={"message": "my name is Sam"}, headers=auth_headers).json()
+    client.post(
+        "/api/chat/message",
+        json={"message": "what is my name?", "conversation_id": first["conversation_id"]},
+        headers=auth_headers,
+    )
+
+    assert provider.last_messages == [
+        {"role": "user", "content": "my name is Sam"},
+        {"role": "assistant", "content": "Hello there friend"},
+        {"role": "user", "content": "what is my name?"},
+    ]
+
+def test_response_cache_reuses_standalone_replies(client, auth_headers, provider):
+    """Repeated low-temperature prompts are answered from the cache, per user"""
+    from cache import InMemoryCache
+    from llm.response_cache import ResponseCache, set_response_cache
+    from memory import HashEmbedder
+
+    response_cache = ResponseCache(HashEmbedder(128), InMemoryCache(), min_similarity=0.9)
+    set_response_cache(response_cache)
+    try:
+        client.put("/api/auth/settings", json={"temperature": 0.0}, headers=auth_headers)
+        first = client.post("/api/chat/message", json={"message": "What is the capital of France?"}, headers=auth_headers)
+        second = client.post("/api/chat/message", json={"message": "what is the capital of  France"}, headers=auth_headers)
+        assert second.json()["message"] == first.json()["message"] == "Hello there friend"
+        assert provider.completed == 1
+
+        # Follow-ups depend on the conversation so far and always reach the model
+        conversation_id = second.json()["conversation_id"]
+        client.post("/api/chat/message", json={
+            "message": "What is the capital of France?", "conversation_id": conversation_id,
+        }, headers=auth_headers)
+        assert provider.completed == 2
+
+        events = parse_events(client.get(
+            "/api/chat/stream", params={"message": "What is the capital of France?"}, headers=auth_headers
+        ).text)
+        assert [data["content"] for event, data in events if event == "token"] == ["Hello there friend"]
+        assert provider.completed == 2
+
+        # Warmer conversations skip the cache
+        client.put("/api/auth/settings", json={"temperature": 0.7}, headers=auth_headers)
+        client.post("/api/chat/message", json={"message": "What is the capital of France?"}, headers=auth_headers)
+        assert provider.completed == 3
+
+        stats = response_cache.stats()
+        assert (stats["hits"], stats["misses"], stats["skipped"]) == (2, 1, 1)
+        assert stats["saved_tokens"] > 0
+    finally:
+        set_response_cache(None)
+
+@pytest.mark.asyncio
+async def test_response_cache_partitions_by_recalled_memories():
+    """Replies are reused only under the same memories; only the matched answer is fetched"""
+    from cache import InMemoryCache
+    from llm.response_cache import ResponseCache
+    from memory import HashEmbedder
+
+    backend = InMemoryCache()
+    response_cache = ResponseCache(HashEmbedder(128), backend, min_similarity=0.9, max_entries=2)
+    user_id = uuid4()
+
+    async def ask(prompt, memories=()):
+        return await response_cache.lookup(user_id, "fake", 0.0, "", prompt, memories=memories)
+
+    for prompt in ("What is my name?", "Where do I live?", "What is my job?"):
+        lookup = await ask(prompt, memories=["user: my name is Sam"])
+        await response_cache.store(lookup, f"answer to {prompt}", 5)
+
+    assert (await ask("What is my name?", memories=["user: my name is Alex"])).hit is None
+    assert (await ask("What is my name?")).hit is None
+    hit = (await ask("where do I live", memories=["user: my name is Sam"])).hit
+    assert hit is not None and hit.answer == "answer to Where do I live?"
+
+    # The oldest entry was dropped past max_entries, together with its answer
+    assert (await ask("What is my name?", memories=["user: my name is Sam"])).hit is None
+    assert len([key for key in backend._data if key.count(":") == 3]) == 2
@@ -0,0 +1,122 @@
+"""Prompt context assembly and summary refresh tests"""
+
+from uuid import uuid4
+
+import pytest
+
+from app.config import settings
+from database import Conversation, SessionLocal, User
+from database.messages import add_messages
+from llm import FakeProvider
+from llm.context import assemble_context, refresh_summary
+from llm.tokenizer import count_tokens
+
+@pytest.fixture
+def small_window(monkeypatch):
+    """A 2000-token model with summaries after 10 messages of history"""
+    monkeypatch.setattr(settings, "CONTEXT_WINDOW_TOKENS", {"tiny": 2000})
+    monkeypatch.setattr(settings, "CONTEXT_KEEP_RECENT_MESSAGES", 10)
+    monkeypatch.setattr(settings, "CONTEXT_SUMMARY_BATCH_TOKENS", 1000)
+
+async def seed(count: int, tokens: int = 100) -> Conversation:
+    """A conversation on the `tiny` model with `count` messages of `tokens` each"""
+    async with SessionLocal() as db:
+        user = User(id=uuid4(), email=f"{uuid4().hex}@example.com", username=uuid4().hex, password_hash="x")
+        conversation = Conversation(id=uuid4(), user_id=user.id, model_used="tiny", system_prompt="Be brief.")
+        db.add_all([user, conversation])
+        await add_messages(db, conversation.id, [
+            ("user" if i % 2 == 0 else "assistant", f"message {i}", tokens) for i in range(count)
+        ])
+        await db.commit()
+        return await db.get(Conversation, conversation.id, populate_existing=True)
+
+@pytest.mark.asyncio
+async def test_assemble_context_packs_recent_history(reset_db, small_window):
+    """The newest messages that fit the budget are included, oldest first"""
+    conversation = await seed(50)
+    async with SessionLocal() as db:
+        context = await assemble_context(db, conversation, "next", custom_instructions="Use metric units.", max_tokens=500)
+
+    assert context.prompt[0]["role"] == "system"
+    assert "Be brief." in context.prompt[0]["content"]
+    assert "Use metric units." in context.prompt[0]["content"]
+    assert context.prompt[-1] == {"role": "user", "content": "next"}
+
+    history = [m["content"] for m in context.prompt[1:-1]]
+    assert 0 < len(history) < 50
+    assert history == [f"message {i}" for i in range(50 - len(history), 50)]
+    assert context.prompt_tokens <= 2000 - 500
+    assert context.truncated and context.needs_summary
+
+@pytest.mark.asyncio
+async def test_short_thread_fits_without_summary(reset_db, small_window):
+    conversation = await seed(4)
+    async with SessionLocal() as db:
+        context = await assemble_context(db, conversation, "next", max_tokens=500)
+
+    assert context.history_messages == 4
+    assert not context.truncated and not context.needs_summary
+
+@pytest.mark.asyncio
+async def test_refresh_summary_advances_cursor(reset_db, small_window):
+    """A refresh folds one batch of the oldest messages into the summary"""
+    conversation = await seed(30)
+    provider = FakeProvider(tokens_per_second=0, first_token_latency=0, reply="They discussed messages.")
+
+    assert await refresh_summary(conversation.id, provider)
+
+    async with SessionLocal() as db:
+        conversation = await db.get(Conversation, conversation.id)
+        assert conversation.summary == "They discussed messages."
+        context = await assemble_context(db, conversation, "next", max_tokens=500)
+
+    # A 1000-token batch covers the first 9 messages (104 tokens each with overhead)
+    assert "They discussed messages." in context.prompt[0]["content"]
+    history = [m["content"] for m in context.prompt[1:-1]]
+    assert "message 8" not in history
+    assert history[-1] == "message 29"
+
+    # Two more batches leave only the 10 most recent messages un-summarized
+    assert await refresh_summary(conversation.id, provider)
+    assert await refresh_summary(conversation.id, provider)
+    assert not await refresh_summary(conversation.id, provider)
+    async with SessionLocal() as db:
+        conversation = await db.get(Conversation, conversation.id)
+        context = await assemble_context(db, conversation, "next", max_tokens=500)
+    assert [m["content"] for m in context.prompt[1:-1]] == [f"message {i}" for i in range(20, 30)]
+
+class RecordingProvider(FakeProvider):
+    """Fake provider that keeps the prompts it was sent"""
+
+    def __init__(self):
+        super().__init__(tokens_per_second=0, first_token_latency=0, reply="Summary.")
+        self.prompts = []
+
+    async def complete(self, messages, model, temperature=0.7, max_tokens=None):
+        self.prompts.append((messages, max_tokens))
+        return await super().complete(messages, model, temperature, max_tokens)
+
+@pytest.mark.asyncio
+async def test_summary_prompts_fit_an_8k_model(reset_db, monkeypatch):
+    """Summary batches leave room for the instructions and reply; an oversized message is truncated"""
+    monkeypatch.setattr(settings, "CONTEXT_WINDOW_TOKENS", {})
+    monkeypatch.setattr(settings, "CONTEXT_KEEP_RECENT_MESSAGES", 10)
+    async with SessionLocal() as db:
+        user = User(id=uuid4(), email=f"{uuid4().hex}@example.com", username=uuid4().hex, password_hash="x")
+        conversation = Conversation(id=uuid4(), user_id=user.id, model_used="gpt-4")
+        db.add_all([user, conversation])
+        contents = ["abcd " * 16000] + ["wxyz " * 1000 for _ in range(19)]
+        await add_messages(db, conversation.id, [
+            ("user", content, count_tokens(content, "gpt-4")) for content in contents
+        ])
+        await db.commit()
+
+    provider = RecordingProvider()
+    while await refresh_summary(conversation.id, provider):
+        pass
+
+    assert len(provider.prompts) == 3  # The oversized message alone, then two batches of the other nine
+    for messages, max_tokens in provider.prompts:
+        prompt_tokens = sum(count_tokens(m["content"], "gpt-4") + 4 for m in messages)
+        assert prompt_tokens + max_tokens <= 8192
+    assert "abcd" in provider.prompts[0][0][1]["content"] and "wxyz" not in provider.prompts[0][0][1]["content"]
@@ -0,0 +1,252 @@
+"""Conversation listing tests"""
+
+import asyncio
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import select
+
+from database import Conversation, SessionLocal, User
+
+async def seed_conversations(email: str, count: int, pinned=()):
+    """Insert `count` conversations for the user, newest last"""
+    async with SessionLocal() as db:
+        user_id = await db.scalar(select(User.id).where(User.email == email))
+        base = datetime(2026, 1, 1)
+        for i in range(count):
+            db.add(Conversation(
+                id=uuid4(),
+                user_id=user_id,
+                title=f"conversation {i}",
+                is_pinned=i in pinned,
+                updated_at=base + timedelta(minutes=i % 7),  # Repeated timestamps exercise the id tiebreak
+            ))
+        await db.commit()
+
+def test_list_conversations_keyset_pages(client, auth_headers):
+    """Walking the cursor visits every conversation once, pinned first"""
+    asyncio.run(seed_conversations("fixture@example.com", 25, pinned={3, 17}))
+
+    titles, cursor = [], None
+    while True:
+        params = {"limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/conversations", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        page = response.json()
+        titles += [item["title"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(titles) == 25
+    assert len(set(titles)) == 25
+    assert set(titles[:2]) == {"conversation 3", "conversation 17"}
+
+def test_list_conversations_rejects_bad_cursor(client, auth_headers):
+    response = client.get("/api/conversations", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+
+async def conversation_counts(conversation_id):
+    async with SessionLocal() as db:
+        row = (await db.execute(
+            select(Conversation.message_count, Conversation.token_count).where(Conversation.id == conversation_id)
+        )).one()
+        return row.message_count, row.token_count
+
+def test_message_insert_updates_counters(auth_headers):
+    """Counters are maintained in the same transaction as message inserts"""
+    from database.messages import add_message, add_messages
+
+    async def scenario():
+        async with SessionLocal() as db:
+            user_id = await db.scalar(select(User.id))
+            conversation = Conversation(id=uuid4(), user_id=user_id)
+            db.add(conversation)
+            await add_messages(db, conversation.id, [("user", "hi", 2), ("assistant", "hello", 3)])
+            await add_message(db, conversation.id, "user", "again", 4)
+            await db.commit()
+        return await conversation_counts(conversation.id)
+
+    assert asyncio.run(scenario()) == (3, 9)
+
+def test_reconcile_repairs_drift(auth_headers):
+    """The reconciliation job restores counters that drifted from the messages table"""
+    from sqlalchemy import update
+    from database.messages import add_messages
+    from database.reconcile import reconcile_conversation_counters
+
+    async def scenario():
+        async with SessionLocal() as db:
+            user_id = await db.scalar(select(User.id))
+            ids = [uuid4() for _ in range(5)]
+            for conversation_id in ids:
+                db.add(Conversation(id=conversation_id, user_id=user_id))
+                await add_messages(db, conversation_id, [("user", "hi", 1), ("assistant", "hello", 1)])
+            await db.execute(update(Conversation).where(Conversation.id == ids[2]).values(message_count=99))
+            await db.commit()
+
+        repaired = await reconcile_conversation_counters(batch_size=2)
+        return repaired, [await conversation_counts(i) for i in ids]
+
+    repaired, counts = asyncio.run(scenario())
+    assert repaired == 1
+    assert counts == [(2, 2)] * 5
+
+async def seed_thread(email: str, count: int, title="export me"):
+    """Create one conversation with `count` alternating messages"""
+    from database.messages import add_messages
+
+    async with SessionLocal() as db:
+        user_id = await db.scalar(select(User.id).where(User.email == email))
+        conversation = Conversation(id=uuid4(), user_id=user_id, title=title)
+        db.add(conversation)
+        await add_messages(db, conversation.id, [
+            ("user" if i % 2 == 0 else "assistant", f"message {i}", 1) for i in range(count)
+        ])
+        await db.commit()
+        return conversation.id
+
+def test_export_conversation_formats(client, auth_headers):
+    """Each export format streams every message in order"""
+    import json
+
+    conversation_id = asyncio.run(seed_thread("fixture@example.com", 5))
+    url = f"/api/conversations/{conversation_id}/export"
+
+    response = client.post(url, params={"format": "ndjson"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["type"] == "conversation"
+    assert [line["content"] for line in lines[1:]] == [f"message {i}" for i in range(5)]
+
+    response = client.post(url, params={"format": "json"}, headers=auth_headers)
+    document = response.json()
+    assert document["conversation"]["message_count"] == 5
+    assert [m["role"] for m in document["messages"]][:2] == ["user", "assistant"]
+
+    response = client.post(url, params={"format": "markdown"}, headers=auth_headers)
+    assert response.text.startswith("# export me")
+    assert "message 4" in response.text
+
+    assert client.post(url, params={"format": "pdf"}, headers=auth_headers).status_code == 400
+    assert client.post(f"/api/conversations/{uuid4()}/export", headers=auth_headers).status_code == 404
+
+def test_export_gzip_and_zip(client, auth_headers):
+    """Gzipped single exports and the bulk zip decode to the same content"""
+    import gzip
+    import io
+    import json
+    import zipfile
+
+    first = asyncio.run(seed_thread("fixture@example.com", 3, title="first"))
+    second = asyncio.run(seed_thread("fixture@example.com", 2, title="second"))
+
+    response = client.post(
+        f"/api/conversations/{first}/export", params={"format": "json", "gzip": True}, headers=auth_headers
+    )
+    assert response.headers["content-disposition"].endswith('.json.gz"')
+    assert len(json.loads(gzip.decompress(response.content))["messages"]) == 3
+
+    response = client.post("/api/conversations/export", headers=auth_headers)
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        names = sorted(archive.namelist())
+        assert len(names) == 2
+        counts = {
+            json.loads(archive.read(name).splitlines()[0])["title"]: len(archive.read(name).splitlines()) - 1
+            for name in names
+        }
+    assert counts == {"first": 3, "second": 2}
+
+def test_get_conversation_message_window(client, auth_headers):
+    """Opening a thread returns the latest window; cursors walk older and newer"""
+    conversation_id = asyncio.run(seed_thread("fixture@example.com", 25))
+    url = f"/api/conversations/{conversation_id}"
+
+    page = client.get(url, params={"limit": 10}, headers=auth_headers).json()
+    assert page["message_count"] == 25
+    assert [m["content"] for m in page["messages"]] == [f"message {i}" for i in range(15, 25)]
+    assert "embedding_id" not in page["messages"][0]
+    assert page["newer_cursor"] is None
+
+    contents = [m["content"] for m in page["messages"]]
+    while page["older_cursor"]:
+        page = client.get(url, params={"limit": 10, "before": page["older_cursor"]}, headers=auth_headers).json()
+        contents = [m["content"] for m in page["messages"]] + contents
+    assert contents == [f"message {i}" for i in range(25)]
+
+    page = client.get(url, params={"limit": 10, "after": page["newer_cursor"]}, headers=auth_headers).json()
+    assert [m["content"] for m in page["messages"]] == [f"message {i}" for i in range(5, 15)]
+    assert page["newer_cursor"] is not None
+
+    assert client.get(url, params={"before": "junk"}, headers=auth_headers).status_code == 400
+    assert client.get(f"/api/conversations/{uuid4()}", headers=auth_headers).status_code == 404
+
+async def seed_contents(email: str, contents, memory=None):
+    """One conversation holding `contents` as user messages, optionally embedded into `memory`"""
+    from database.messages import add_messages
+
+    async with SessionLocal() as db:
+        user_id = await db.scalar(select(User.id).where(User.email == email))
+        conversation = Conversation(id=uuid4(), user_id=user_id, title="notes")
+        db.add(conversation)
+        rows = await add_messages(db, conversation.id, [("user", content, 1) for content in contents])
+        await db.commit()
+    if memory is not None:
+        for row in rows:
+            memory.submit(row.id, user_id, row.conversation_id, row.content)
+        await memory.drain()
+    return conversation.id
+
+def test_search_conversations_hybrid(client, auth_headers):
+    """Keyword and semantic matches are fused; other users' messages never match"""
+    from memory import EmbeddingPipeline, HashEmbedder, LocalVectorStore, set_memory
+
+    memory = EmbeddingPipeline(HashEmbedder(128), LocalVectorStore(128))
+    set_memory(memory)
+    try:
+        asyncio.run(seed_contents("fixture@example.com", [
+            "I planted tomatoes in the garden last weekend",
+            "remember the quarterly tax filing on Friday",
+            "<b>gardening</b> tips: water tomatoes in the morning",
+        ], memory))
+        client.post("/api/auth/register", json={
+            "email": "other@example.com", "username": "other", "password": "Password123!",
+        })
+        asyncio.run(seed_contents("other@example.com", ["my tomatoes are in the garden too"], memory))
+
+        response = client.get("/api/conversations/search", params={"q": "tomatoes garden"}, headers=auth_headers)
+        assert response.status_code == 200
+        items = response.json()["items"]
+        snippets = [item["snippet"] for item in items[:2]]
+        assert "I planted <mark>tomatoes</mark> in the <mark>garden</mark> last weekend" in snippets
+        assert "&lt;b&gt;<mark>gardening</mark>&lt;/b&gt; tips: water <mark>tomatoes</mark> in the morning" in snippets
+        assert all("too" not in item["snippet"] for item in items)
+        assert items[0]["conversation_title"] == "notes"
+
+        # No message contains "deadline", so this hit comes from the vector side alone
+        items = client.get(
+            "/api/conversations/search", params={"q": "tax filing deadline"}, headers=auth_headers
+        ).json()["items"]
+        assert items[0]["snippet"] == "remember the quarterly <mark>tax</mark> <mark>filing</mark> on Friday"
+    finally:
+        set_memory(None)
+
+    client.put("/api/auth/settings", json={"search_history_enabled": False}, headers=auth_headers)
+    response = client.get("/api/conversations/search", params={"q": "tomatoes"}, headers=auth_headers)
+    assert response.status_code == 403
+
+def test_search_fusion_and_snippets():
+    from app.search import make_snippet, reciprocal_rank_fusion
+
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    assert [item for item, _ in fused] == ["a", "c", "b"]
+
+    text = " ".join(f"word{i}" for i in range(100)) + " needle " + " ".join(f"tail{i}" for i in range(100))
+    snippet = make_snippet(text, ["needle"], length=80)
+    assert snippet.startswith("…word") and snippet.endswith("…")
+    assert "<mark>needle</mark>" in snippet
+    assert len(snippet) < 120
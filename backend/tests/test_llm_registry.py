@@ -0,0 +1,164 @@
+"""Provider registry tests against the local LLM API stub"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from llm import AnthropicProvider, FakeProvider, OpenAIProvider, ProviderError, ProviderRegistry
+from llm.limits import TokenBudget
+from llm.stub_server import StubBehavior, create_stub_app
+
+PROMPT = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "hello"}]
+
+def stub_provider(cls, **behavior):
+    stub = StubBehavior(**behavior)
+    transport = httpx.ASGITransport(app=create_stub_app(stub))
+    return cls("test-key", "http://stub", transport=transport), stub
+
+def make_registry(primary, fallback, **kwargs):
+    registry = ProviderRegistry(fallback_models={"gpt-4": "claude-3-haiku"}, **kwargs)
+    registry.register(primary)
+    registry.register(fallback)
+    return registry
+
+@pytest.mark.asyncio
+async def test_complete_and_stream_parse_both_apis():
+    """OpenAI and Anthropic wire formats are parsed for full and streamed replies"""
+    for cls in (OpenAIProvider, AnthropicProvider):
+        provider, _ = stub_provider(cls, reply="stub says hi")
+        completion = await provider.complete(PROMPT, "model")
+        assert completion.content == "stub says hi"
+        assert completion.completion_tokens == 3
+        assert "".join([t async for t in provider.stream(PROMPT, "model")]) == "stub says hi"
+        await provider.aclose()
+
+@pytest.mark.asyncio
+async def test_fails_over_on_server_error():
+    """A 5xx from the primary fails over to the fallback model"""
+    openai, _ = stub_provider(OpenAIProvider, error_rate=1.0, error_status=503)
+    anthropic, _ = stub_provider(AnthropicProvider, reply="from fallback")
+    registry = make_registry(openai, anthropic)
+
+    completion = await registry.complete(PROMPT, "gpt-4")
+    assert completion.provider == "anthropic"
+    assert registry.failovers == 1
+
+    assert "".join([t async for t in registry.stream(PROMPT, "gpt-4")]) == "from fallback"
+
+@pytest.mark.asyncio
+async def test_fails_over_on_timeout_and_rate_limit():
+    """Timeouts and 429s are retryable; other 4xx are not"""
+    slow, _ = stub_provider(OpenAIProvider, latency=1.0)
+    anthropic, _ = stub_provider(AnthropicProvider, reply="fast")
+    registry = make_registry(slow, anthropic, timeout=0.05)
+    assert (await registry.complete(PROMPT, "gpt-4")).content == "fast"
+
+    limited, _ = stub_provider(OpenAIProvider, requests_per_second=1)
+    await limited.complete(PROMPT, "gpt-4")
+    registry = make_registry(limited, anthropic)
+    assert (await registry.complete(PROMPT, "gpt-4")).provider == "anthropic"
+
+    bad, _ = stub_provider(OpenAIProvider, error_rate=1.0, error_status=400)
+    registry = make_registry(bad, anthropic)
+    with pytest.raises(ProviderError) as excinfo:
+        await registry.complete(PROMPT, "gpt-4")
+    assert excinfo.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_hedged_request_returns_faster_provider():
+    """A slow primary is hedged with the fallback after hedge_after seconds"""
+    slow, _ = stub_provider(OpenAIProvider, latency=0.5, reply="slow")
+    fast, _ = stub_provider(AnthropicProvider, latency=0.01, reply="fast")
+    registry = make_registry(slow, fast, hedge_after=0.05)
+
+    started = time.perf_counter()
+    completion = await registry.complete(PROMPT, "gpt-4", hedge=True)
+    assert completion.content == "fast"
+    assert time.perf_counter() - started < 0.4
+    assert registry.hedges == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_hedged_call_cancels_the_primary():
+    """A caller cancelled before the hedge starts does not leave the primary running"""
+    slow, _ = stub_provider(OpenAIProvider, latency=1.0)
+    fast, _ = stub_provider(AnthropicProvider)
+    registry = make_registry(slow, fast, hedge_after=0.5)
+
+    call = asyncio.ensure_future(registry.complete(PROMPT, "gpt-4", hedge=True))
+    await asyncio.sleep(0.05)
+    assert registry.stats()["openai"]["in_flight"] == 1
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    assert registry.stats()["openai"]["in_flight"] == 0 and registry.hedges == 0
+
+@pytest.mark.asyncio
+async def test_broken_streams_raise_retryable_provider_errors():
+    """Unparseable events, error events and cut-off streams are retryable provider errors"""
+    for cls in (OpenAIProvider, AnthropicProvider):
+        for failure in ("malformed", "error", "truncated"):
+            provider, _ = stub_provider(cls, reply="partial reply", stream_failure=failure)
+            with pytest.raises(ProviderError) as excinfo:
+                [t async for t in provider.stream(PROMPT, "model")]
+            assert excinfo.value.retryable, (cls.name, failure)
+            await provider.aclose()
+
+    # After the first token there is no failover: the registry surfaces the error to the caller
+    broken, _ = stub_provider(AnthropicProvider, reply="cut off", stream_failure="error")
+    openai, _ = stub_provider(OpenAIProvider, reply="from fallback")
+    registry = ProviderRegistry(fallback_models={"claude-3-haiku": "gpt-4"})
+    registry.register(broken)
+    registry.register(openai)
+    tokens = []
+    with pytest.raises(ProviderError, match="overloaded_error"):
+        async for token in registry.stream(PROMPT, "claude-3-haiku"):
+            tokens.append(token)
+    assert tokens == ["cut"]
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    """No more than max_concurrency calls reach a provider at once"""
+    provider = FakeProvider(tokens_per_second=0, first_token_latency=0.02, reply="ok")
+    registry = ProviderRegistry()
+    registry.register(provider, max_concurrency=2)
+
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        task = asyncio.ensure_future(registry.complete(PROMPT, "fake"))
+        await asyncio.sleep(0.01)
+        peak = max(peak, registry.stats()["fake"]["in_flight"])
+        await task
+
+    await asyncio.gather(*(call() for _ in range(6)))
+    assert peak == 2
+
+@pytest.mark.asyncio
+async def test_token_budget_rejects_long_waits():
+    """Reservations that would wait longer than max_wait raise a retryable error"""
+    budget = TokenBudget(tokens_per_minute=600, max_wait=0.5)
+    await budget.acquire(600)
+    with pytest.raises(ProviderError) as excinfo:
+        await budget.acquire(600)
+    assert excinfo.value.retryable
+
+@pytest.mark.asyncio
+async def test_full_replies_and_streams_use_separate_latency_histograms():
+    """Non-streamed calls go to llm_completion_seconds; only streams feed time-to-first-token"""
+    from metrics import LLM_COMPLETION_SECONDS, LLM_TIME_TO_FIRST_TOKEN_SECONDS
+
+    registry = ProviderRegistry()
+    registry.register(FakeProvider(tokens_per_second=0, first_token_latency=0, reply="ok"))
+    completions = LLM_COMPLETION_SECONDS.snapshot("fake", "fake-model")["count"]
+    first_tokens = LLM_TIME_TO_FIRST_TOKEN_SECONDS.snapshot("fake", "fake-model")["count"]
+
+    await registry.complete(PROMPT, "fake-model")
+    assert LLM_COMPLETION_SECONDS.snapshot("fake", "fake-model")["count"] == completions + 1
+    assert LLM_TIME_TO_FIRST_TOKEN_SECONDS.snapshot("fake", "fake-model")["count"] == first_tokens
+
+    assert "".join([t async for t in registry.stream(PROMPT, "fake-model")]) == "ok"
+    assert LLM_COMPLETION_SECONDS.snapshot("fake", "fake-model")["count"] == completions + 1
+    assert LLM_TIME_TO_FIRST_TOKEN_SECONDS.snapshot("fake", "fake-model")["count"] == first_tokens + 1
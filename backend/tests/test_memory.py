@@ -0,0 +1,222 @@
+"""Long-term memory tests (embedders, vector store, pipeline, recall in chat)"""
+
+import asyncio
+import os
+from uuid import uuid4
+
+import httpx
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from cache import InMemoryCache
+from database import Conversation, Message, SessionLocal, User
+from database.messages import add_messages
+from llm import FakeProvider, set_provider
+from llm.stub_server import StubBehavior, create_stub_app
+from memory import CachedEmbedder, EmbeddingPipeline, HashEmbedder, LocalVectorStore, OpenAIEmbedder, recall, set_memory
+
+@pytest.fixture
+def memory():
+    pipeline = EmbeddingPipeline(HashEmbedder(128), LocalVectorStore(128))
+    set_memory(pipeline)
+    yield pipeline
+    set_memory(None)
+
+def test_hash_embedder_is_deterministic_and_lexical():
+    embedder = HashEmbedder(256)
+    a, b, c = embedder.embed_sync(["my dog is called Rex", "what is my dog called", "quarterly tax filing"])
+    assert np.allclose(embedder.embed_sync(["my dog is called Rex"])[0], a)
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    assert a @ b > a @ c
+
+@pytest.mark.asyncio
+async def test_openai_embedder_against_stub():
+    transport = httpx.ASGITransport(app=create_stub_app(StubBehavior()))
+    embedder = OpenAIEmbedder("test-key", "http://stub", dimensions=32, transport=transport)
+    vectors = await embedder.embed(["one", "two", "one"])
+    await embedder.aclose()
+
+    assert vectors.shape == (3, 32)
+    assert np.allclose(vectors[0], vectors[2])
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+
+@pytest.mark.asyncio
+async def test_local_store_partitions_by_user_and_persists(tmp_path):
+    embedder = HashEmbedder(64)
+    alice, bob = uuid4(), uuid4()
+    store = LocalVectorStore(64, str(tmp_path))
+    await store.upsert(alice, ["a1", "a2"], embedder.embed_sync(["apples and pears", "car engines"]), ["c1", "c2"])
+    await store.upsert(bob, ["b1"], embedder.embed_sync(["apples and pears"]), ["c3"])
+    await store.flush()
+    await store.upsert(alice, ["a3"], embedder.embed_sync(["pears in syrup"]), ["c1"])
+    await store.delete(alice, ["a2"])
+    await store.close()
+
+    reloaded = LocalVectorStore(64, str(tmp_path))
+    query = embedder.embed_sync(["pears"])[0]
+    matches = await reloaded.query(alice, query, k=5)
+    assert sorted(m.id for m in matches) == ["a1", "a3"]
+    assert await reloaded.count(alice) == 2
+    assert [m.id for m in await reloaded.query(bob, query, k=5)] == ["b1"]
+    assert [m.id for m in await reloaded.query(alice, query, k=5, exclude_conversation_id="c1")] == []
+
+@pytest.mark.asyncio
+async def test_local_stores_sharing_a_directory_see_each_others_writes(tmp_path, monkeypatch):
+    """Two workers' stores on one directory: distinct segments, reloads on read, compaction keeps both"""
+    from memory import stores
+
+    embedder = HashEmbedder(64)
+    user = uuid4()
+    first = LocalVectorStore(64, str(tmp_path), refresh_seconds=0)
+    second = LocalVectorStore(64, str(tmp_path), refresh_seconds=0)
+    query = embedder.embed_sync(["pears"])[0]
+
+    await first.upsert(user, ["a1", "a2"], embedder.embed_sync(["pears", "car engines"]), ["c1", "c2"])
+    await second.upsert(user, ["b1"], embedder.embed_sync(["pears in syrup"]), ["c3"])
+    await first.flush()
+    await second.flush()
+    segments = sorted(os.listdir(tmp_path / str(user)))
+    assert len([name for name in segments if name.endswith(".npz")]) == 2
+    assert sorted(m.id for m in await first.query(user, query, k=5)) == ["a1", "a2", "b1"]
+
+    # A delete in one worker reaches the other; an unflushed local write survives the reload
+    await second.delete(user, ["a2"])
+    await second.flush()
+    await first.upsert(user, ["a3"], embedder.embed_sync(["pear tart"]), ["c1"])
+    assert sorted(m.id for m in await first.query(user, query, k=5)) == ["a1", "a3", "b1"]
+
+    # Compaction merges the other worker's segments it had not read yet and removes only what it merged
+    monkeypatch.setattr(stores, "MAX_SEGMENTS", 3)
+    await second.upsert(user, ["b2"], embedder.embed_sync(["pear jam"]), ["c3"])
+    await second.flush()
+    await first.flush()
+    segments = [name for name in os.listdir(tmp_path / str(user)) if name.endswith(".npz")]
+    assert len(segments) == 1 and segments[0].endswith(stores.SNAPSHOT_SUFFIX)
+    expected = ["a1", "a3", "b1", "b2"]
+    assert sorted(m.id for m in await first.query(user, query, k=5)) == expected
+    assert sorted(m.id for m in await second.query(user, query, k=5)) == expected
+    reloaded = LocalVectorStore(64, str(tmp_path))
+    assert sorted(m.id for m in await reloaded.query(user, query, k=5)) == expected
+
+def test_search_is_consistent_when_the_shard_reloads_mid_scan():
+    """A scan running in a thread keeps the columns it started with when the loop clears the shard"""
+    from memory.stores import _Shard
+
+    embedder = HashEmbedder(64)
+    shard = _Shard(64)
+    shard.upsert(["a1", "a2"], embedder.embed_sync(["pears", "car engines"]), ["c1", "c2"])
+    query = embedder.embed_sync(["pears"])[0]
+
+    class ReloadDuringScan:
+        __array_ufunc__ = None  # Makes `vectors @ self` call __rmatmul__
+
+        def __rmatmul__(self, vectors):
+            shard.clear()
+            shard.upsert(["b1"], embedder.embed_sync(["other"]), ["c9"])
+            shard.delete(["b1"])
+            return vectors @ query
+
+    matches = shard.search(ReloadDuringScan(), 5, exclude="c2")
+    assert [(m.id, m.conversation_id) for m in matches] == [("a1", "c1")]
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_retried_and_does_not_stop_the_pipeline(reset_db, tmp_path, monkeypatch):
+    store = LocalVectorStore(128, str(tmp_path))
+    pipeline = EmbeddingPipeline(HashEmbedder(128), store)
+    user_id, rows = await seed_messages(["first note", "second note"])
+    real_write = store._write
+
+    def failing_write(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write", failing_write)
+    pipeline.submit(rows[0].id, user_id, rows[0].conversation_id, rows[0].content)
+    await pipeline.drain()
+    assert pipeline.stats()["flush_failures"] == 1 and pipeline.embedded == 1
+
+    monkeypatch.setattr(store, "_write", real_write)
+    pipeline.submit(rows[1].id, user_id, rows[1].conversation_id, rows[1].content)
+    await pipeline.drain()
+    assert await LocalVectorStore(128, str(tmp_path)).count(user_id) == 2
+
+async def seed_messages(texts):
+    async with SessionLocal() as db:
+        user = User(id=uuid4(), email=f"{uuid4().hex}@example.com", username=uuid4().hex, password_hash="x")
+        conversation = Conversation(id=uuid4(), user_id=user.id)
+        db.add_all([user, conversation])
+        rows = await add_messages(db, conversation.id, [("user", text, 1) for text in texts])
+        await db.commit()
+        return user.id, rows
+
+@pytest.mark.asyncio
+async def test_pipeline_embeds_batches_and_recalls(reset_db, memory):
+    user_id, rows = await seed_messages([f"note {i} about gardening" for i in range(9)] + ["my cat is named Miso"])
+    for row in rows:
+        memory.submit(row.id, user_id, row.conversation_id, row.content)
+    memory.batch_size = 4
+    await memory.drain()
+
+    assert memory.stats()["embedded"] == 10 and memory.batches == 3
+    async with SessionLocal() as db:
+        ids = (await db.scalars(select(Message.embedding_id).where(Message.embedding_id.isnot(None)))).all()
+        assert len(ids) == 10
+        found = await recall(memory, db, user_id, "what is my cat named?", k=1)
+    assert found[0].content == "my cat is named Miso"
+
+def test_send_message_recalls_other_conversations(client, auth_headers, memory):
+    provider = FakeProvider(tokens_per_second=0, first_token_latency=0, reply="Noted.")
+    set_provider(provider)
+    try:
+        client.post("/api/chat/message", json={"message": "my favourite colour is teal"}, headers=auth_headers)
+        asyncio.run(memory.drain())
+        client.post("/api/chat/message", json={"message": "what is my favourite colour?"}, headers=auth_headers)
+    finally:
+        set_provider(None)
+
+    system = provider.last_messages[0]
+    assert system["role"] == "system"
+    assert "my favourite colour is teal" in system["content"]
+
+class CountingEmbedder(HashEmbedder):
+    """Hash embedder that records every text it is asked to embed"""
+
+    def __init__(self, dimensions=64):
+        super().__init__(dimensions)
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        return await super().embed(texts)
+
+@pytest.mark.asyncio
+async def test_embedding_cache_tiers_and_normalization():
+    shared = InMemoryCache()
+    inner = CountingEmbedder()
+    cached = CachedEmbedder(inner, shared=shared, maxsize=100)
+
+    first = await cached.embed(["hello  world", "other", "hello world"])
+    assert inner.calls == [["hello  world", "other"]]  # Duplicates in a batch are embedded once
+    assert np.allclose(first[0], first[2])
+    assert np.allclose(first[0], inner.embed_sync(["hello world"])[0], atol=1e-3)  # float16 round trip
+
+    await cached.embed([" hello world\n"])
+    assert len(inner.calls) == 1
+    assert cached.stats()["local_hits"] == 1
+
+    # A second process shares vectors through the shared tier
+    other = CachedEmbedder(CountingEmbedder(), shared=shared, maxsize=100)
+    await other.embed(["other"])
+    assert other.embedder.calls == []
+    assert other.stats()["shared_hits"] == 1
+    assert len(await shared.get(other.key("other"))) == 64 * 2  # float16 bytes
+
+@pytest.mark.asyncio
+async def test_embedding_cache_is_size_bounded():
+    cached = CachedEmbedder(CountingEmbedder(), maxsize=2, dtype="float32")
+    await cached.embed(["a", "b", "c"])
+    stats = cached.stats()
+    assert stats["local_size"] == 2
+    assert stats["local_evictions"] == 1
+    await cached.embed(["a"])
+    assert cached.stats()["embedded"] == 4
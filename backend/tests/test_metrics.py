@@ -0,0 +1,85 @@
+"""Metrics tests (exposition format and the /metrics endpoint)"""
+
+from metrics import Registry
+
+def _samples(text: str) -> dict:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = float(value)
+    return samples
+
+def test_histograms_render_cumulative_buckets_per_label():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.labels('/a"b').observe(value)
+    requests.labels("/a").inc(2)
+
+    text = registry.render()
+    samples = _samples(text)
+    assert "# TYPE latency_seconds histogram" in text
+    assert samples['latency_seconds_bucket{route="/a\\"b",le="0.1"}'] == 1
+    assert samples['latency_seconds_bucket{route="/a\\"b",le="1.0"}'] == 3
+    assert samples['latency_seconds_bucket{route="/a\\"b",le="+Inf"}'] == 4
+    assert samples['latency_seconds_count{route="/a\\"b"}'] == 4
+    assert samples['latency_seconds_sum{route="/a\\"b"}'] == 4.05
+    assert samples['requests_total{route="/a"}'] == 2
+
+def test_metrics_endpoint_reports_routes_queries_and_auth_timings(client, auth_headers):
+    before = _samples(client.get("/metrics").text)
+    client.get("/api/conversations", headers=auth_headers)
+    client.get("/api/conversations", headers=auth_headers)
+    client.get("/no-such-route")
+
+    response = client.get("/metrics")
+    after = _samples(response.text)
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    assert delta('http_request_duration_seconds_count{method="GET",route="/api/conversations"}') == 2
+    assert delta('http_requests_total{method="GET",route="/api/conversations",status="200"}') == 2
+    assert delta('http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+    assert delta('db_queries_per_request_sum{route="/api/conversations"}') >= 2
+    assert after['db_pool_checkout_seconds_count{engine="primary"}'] > 0
+    assert after['password_hash_seconds_count{operation="hash_password"}'] >= 1
+    assert after["jwt_decode_seconds_count"] >= 1
+    assert after["http_requests_in_flight"] == 1  # The scrape itself
+
+def test_engine_options_follow_pool_settings(monkeypatch):
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+    from app.config import settings
+    from database.connection import engine_options
+
+    postgres = make_url("postgresql+asyncpg://user:secret@db/personalgpt")
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 15)
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+    options = engine_options(postgres)
+    assert issubclass(options["poolclass"], AsyncAdaptedQueuePool)
+    assert options["pool_size"] == 15 and options["pool_pre_ping"] is False and options["echo"] is False
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_name_func"]() != options["connect_args"]["prepared_statement_name_func"]()
+
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 0)
+    options = engine_options(postgres, pool_pre_ping=True)
+    assert issubclass(options["poolclass"], NullPool) and "pool_size" not in options
+    assert options["pool_pre_ping"] is True
+
+def test_admin_pool_endpoint_requires_admin_token(client, auth_headers, monkeypatch):
+    from app.config import settings
+
+    assert client.get("/api/admin/db-pool").status_code == 404
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/api/admin/db-pool", headers={"Authorization": "Bearer wrong"}).status_code == 403
+
+    response = client.get("/api/admin/db-pool", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    status = response.json()
+    assert status["checked_out"] == 0
+    assert status["checkout_wait"]["count"] > 0 and "+Inf" in status["checkout_wait"]["buckets"]
@@ -0,0 +1,53 @@
+"""Password hashing pool tests"""
+
+import asyncio
+import threading
+import time
+import pytest
+
+from auth.password_pool import PasswordHashPool, PasswordPoolSaturated
+
+def slow_hash(delay: float) -> str:
+    time.sleep(delay)
+    return threading.current_thread().name
+
+@pytest.mark.asyncio
+async def test_runs_off_the_event_loop_thread():
+    """Hashing runs on a pool thread and records timing metrics"""
+    pool = PasswordHashPool(max_workers=1, max_queue=0)
+    try:
+        thread_name = await pool.run(slow_hash, 0.01)
+    finally:
+        pool.shutdown()
+    assert thread_name.startswith("password-hash")
+    stats = pool.stats()
+    assert stats["completed"] == 1
+    assert stats["hash_seconds_max"] >= 0.01
+
+@pytest.mark.asyncio
+async def test_rejects_when_saturated():
+    """Calls beyond workers + queue are rejected instead of queued"""
+    pool = PasswordHashPool(max_workers=1, max_queue=1)
+    try:
+        running = [asyncio.ensure_future(pool.run(slow_hash, 0.1)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordPoolSaturated):
+            await pool.run(slow_hash, 0.1)
+        await asyncio.gather(*running)
+    finally:
+        pool.shutdown()
+    assert pool.rejected == 1
+    assert pool.completed == 2
+    assert pool.pending == 0
+
+@pytest.mark.asyncio
+async def test_usable_again_after_shutdown():
+    """A second app lifespan in the same process can hash after the first shut the pool down"""
+    pool = PasswordHashPool(max_workers=1, max_queue=0)
+    await pool.run(slow_hash, 0)
+    pool.shutdown()
+    try:
+        assert (await pool.run(slow_hash, 0)).startswith("password-hash")
+    finally:
+        pool.shutdown()
+    assert pool.completed == 2
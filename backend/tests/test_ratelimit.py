@@ -0,0 +1,180 @@
+"""API key authentication and rate limiting tests"""
+
+import asyncio
+import os
+import random
+import time
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from auth.api_keys import api_key_cache, key_prefix, last_used_recorder
+from database import APIKey, SessionLocal
+from ratelimit import LocalRateLimiter, RedisRateLimiter, gcra, set_limiter
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def redis_clock(monkeypatch):
+    """
+    Pins the wall clock that fakeredis serves to TIME and uses for key
+    expiry, so the Lua script can be compared with gcra() exactly.
+    """
+    clock = Clock()
+    clock.now = 1_700_000_000.0
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+@pytest.fixture
+def redis_server():
+    """One fake Redis server (with Lua, so GCRA_SCRIPT really runs); call it for a client"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    return lambda: fakeredis.aioredis.FakeRedis(server=server)
+
+@pytest.mark.asyncio
+async def test_local_gcra_allows_burst_then_steady_rate():
+    clock = Clock()
+    limiter = LocalRateLimiter(clock=clock)
+    results = [await limiter.hit("k", 5, 1.0) for _ in range(6)]
+    assert [r.allowed for r in results] == [True] * 5 + [False]
+    assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+    assert results[5].retry_after == pytest.approx(0.2)
+
+    clock.now += 0.2
+    assert (await limiter.hit("k", 5, 1.0)).allowed
+    assert not (await limiter.hit("k", 5, 1.0)).allowed
+    assert (await limiter.hit("other", 5, 1.0)).allowed
+
+@pytest.mark.asyncio
+async def test_redis_script_matches_reference_gcra(redis_server, redis_clock):
+    """The Lua script makes the same decisions as gcra() in integer microseconds"""
+    limiter = RedisRateLimiter(redis_server(), LocalRateLimiter())
+    rng = random.Random(7)
+    tats = {}
+    for _ in range(2000):
+        redis_clock.now += rng.choice((0, 0, 0.0005, 0.003, 0.02, 0.4))
+        key, limit, window = rng.choice((("a", 5, 1.0), ("b", 50, 10.0), ("c", 3, 60.0)))
+        now = round(redis_clock.now * 1_000_000)
+        window_us = window * 1_000_000
+        expected, tat = gcra(tats.get(key, now), now, limit, window_us)
+        if expected.allowed:
+            tats[key] = tat
+
+        result = await limiter.hit(key, limit, window)
+        assert (result.allowed, result.remaining) == (expected.allowed, expected.remaining)
+        assert result.reset_after == pytest.approx(expected.reset_after / 1e6, abs=2e-6)
+        assert result.retry_after == pytest.approx(expected.retry_after / 1e6, abs=2e-6)
+    assert limiter.fallbacks == 0
+
+@pytest.mark.asyncio
+async def test_shared_limit_is_exact_across_workers_at_10k_rps(redis_server, redis_clock):
+    """Four workers (one client each) racing on one key admit exactly burst + elapsed / interval"""
+    workers = [RedisRateLimiter(redis_server(), LocalRateLimiter()) for _ in range(4)]
+    limit, window, per_tick, ticks = 1000, 1.0, 10, 500  # 10 concurrent requests per ms for 0.5 s
+    start = redis_clock.now
+    admitted = 0
+    for tick in range(ticks):
+        redis_clock.now = start + tick / 1000
+        results = await asyncio.gather(*(
+            workers[i % len(workers)].hit("ratelimit:key", limit, window) for i in range(per_tick)
+        ))
+        admitted += sum(result.allowed for result in results)
+
+    elapsed = (ticks - 1) / 1000
+    assert admitted == limit + round(elapsed / (window / limit))
+    assert all(worker.fallbacks == 0 for worker in workers)
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_local_limits():
+    """While Redis is down each worker falls back to limiting on its own"""
+    import redis.asyncio as redis
+
+    client = redis.Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.1)
+    limiter = RedisRateLimiter(client, LocalRateLimiter())
+    assert (await limiter.hit("ratelimit:key", 2, 60)).allowed
+    assert (await limiter.hit("ratelimit:key", 2, 60)).allowed
+    assert not (await limiter.hit("ratelimit:key", 2, 60)).allowed
+    assert limiter.stats()["fallbacks"] == 3
+    await client.aclose()
+
+@pytest.mark.skipif(not os.environ.get("REDIS_TEST_URL"), reason="REDIS_TEST_URL not set")
+@pytest.mark.asyncio
+async def test_redis_script_against_real_server():
+    import redis.asyncio as redis
+
+    client = redis.Redis.from_url(os.environ["REDIS_TEST_URL"])
+    key = f"ratelimit:test:{uuid4()}"
+    workers = [RedisRateLimiter(client, LocalRateLimiter()) for _ in range(4)]
+    results = await asyncio.gather(*(workers[i % 4].hit(key, 50, 60) for i in range(200)))
+    await client.aclose()
+
+    assert sum(r.allowed for r in results) == 50
+    assert all(w.fallbacks == 0 for w in workers)
+    assert min(r.remaining for r in results if r.allowed) == 0
+
+def test_api_key_requests_are_authenticated_and_limited(client, auth_headers):
+    set_limiter(LocalRateLimiter())
+    api_key_cache.clear()
+    try:
+        key = client.post("/api/auth/api-keys", json={"name": "extension"}, headers=auth_headers).json()["key"]
+        asyncio.run(set_rate_limit(key, 3))
+        headers = {"Authorization": f"Bearer {key}"}
+
+        responses = [client.get("/api/auth/me", headers=headers) for _ in range(4)]
+        assert [r.status_code for r in responses] == [200, 200, 200, 429]
+        assert responses[0].json()["email"] == "fixture@example.com"
+        assert [r.headers["RateLimit-Remaining"] for r in responses[:3]] == ["2", "1", "0"]
+        assert responses[0].headers["RateLimit-Policy"] == "3;w=60"
+        assert int(responses[3].headers["Retry-After"]) >= 1
+
+        # JWT requests are not API-key limited
+        response = client.get("/api/auth/me", headers=auth_headers)
+        assert response.status_code == 200
+        assert "RateLimit-Limit" not in response.headers
+    finally:
+        set_limiter(None)
+        api_key_cache.clear()
+
+async def set_rate_limit(key, limit):
+    async with SessionLocal() as db:
+        api_key = await db.scalar(select(APIKey).where(APIKey.prefix == key_prefix(key)))
+        api_key.rate_limit_requests = limit
+        await db.commit()
+
+def test_api_key_issue_verify_and_revoke(client, auth_headers):
+    api_key_cache.clear()
+    created = client.post("/api/auth/api-keys", json={"name": "cli", "expires_in_days": 30}, headers=auth_headers)
+    assert created.status_code == 200
+    key = created.json()["key"]
+    prefix = created.json()["prefix"]
+    assert key.startswith(f"pgpt_{prefix}_")
+    headers = {"Authorization": f"Bearer {key}"}
+
+    listed = client.get("/api/auth/api-keys", headers=auth_headers).json()
+    assert [item["prefix"] for item in listed] == [prefix]
+    assert "key" not in listed[0]
+
+    assert client.get("/api/conversations", headers=headers).status_code == 200
+    # Right prefix, wrong secret; malformed and unknown keys
+    for bad in (f"pgpt_{prefix}_guess", "pgpt_nounderscore", "pgpt_000000000000_secret"):
+        assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {bad}"}).status_code == 401
+
+    # Usage is written in one batch, not per request
+    assert asyncio.run(last_used_at(prefix)) is None
+    asyncio.run(last_used_recorder.flush())
+    assert asyncio.run(last_used_at(prefix)) is not None
+
+    revoked = client.delete(f"/api/auth/api-keys/{created.json()['id']}", headers=auth_headers)
+    assert revoked.json()["is_active"] is False
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+async def last_used_at(prefix):
+    async with SessionLocal() as db:
+        return await db.scalar(select(APIKey.last_used_at).where(APIKey.prefix == prefix))
@@ -0,0 +1,88 @@
+"""Read-replica routing tests (a second SQLite file stands in for the replica)"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import Base, Conversation, SessionLocal, User
+from database.replicas import ReplicaSet, read_session, recent_writes, set_replicas
+
+@pytest.fixture
+def replica(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    replicas = ReplicaSet({"replica": engine})
+    set_replicas(replicas)
+    yield replicas
+    set_replicas(None)
+    recent_writes.clear()
+    asyncio.run(engine.dispose())
+
+def test_reads_follow_writes_then_move_to_the_replica(client, auth_headers, replica, monkeypatch):
+    client.post("/api/chat/message", json={"message": "hello"}, headers=auth_headers)
+
+    # The user just wrote, so their reads stay on the primary
+    assert len(client.get("/api/conversations", headers=auth_headers).json()["items"]) == 1
+    assert replica.replicas[0].reads == 0
+
+    # Outside the window reads go to the replica, which has not replicated anything
+    monkeypatch.setattr(recent_writes, "window", 0)
+    assert client.get("/api/conversations", headers=auth_headers).json()["items"] == []
+    assert replica.replicas[0].reads == 1
+
+@pytest.mark.asyncio
+async def test_writes_in_a_replica_session_go_to_the_primary(reset_db, replica):
+    async with read_session() as db:
+        assert await db.scalar(select(User)) is None  # Read from the (empty) replica
+        user = User(email="w@example.com", username="w", password_hash="x")
+        db.add(user)
+        await db.flush()
+        db.add(Conversation(user_id=user.id, title="t"))
+        await db.commit()
+        # Once the session wrote, its reads see the primary
+        assert await db.scalar(select(Conversation.title)) == "t"
+
+    async with SessionLocal() as db:
+        assert await db.scalar(select(User.email)) == "w@example.com"
+    async with replica.replicas[0].engine.connect() as conn:
+        assert await conn.scalar(select(User.id)) is None
+
+@pytest.mark.asyncio
+async def test_round_robin_skips_unhealthy_and_lagging_replicas(tmp_path):
+    healthy = [create_async_engine(f"sqlite+aiosqlite:///{tmp_path / f'r{i}.db'}") for i in range(2)]
+    broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'r.db'}")
+    replicas = ReplicaSet({"a": healthy[0], "b": healthy[1], "broken": broken}, max_lag=5)
+    await replicas.check()
+    assert [r.healthy for r in replicas.replicas] == [True, True, False]
+
+    names = [replicas.choose().name for _ in range(6)]
+    assert (names.count("a"), names.count("b")) == (3, 3)
+
+    replicas.replicas[0].lag_seconds = 30
+    assert {replicas.choose().name for _ in range(3)} == {"b"}
+    replicas.replicas[1].healthy = False
+    assert replicas.choose() is None and replicas.fallbacks == 1
+    await replicas.dispose()
+
+def test_pool_status_and_metrics_cover_each_engine(client, auth_headers, replica, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(recent_writes, "window", 0)
+    client.get("/api/conversations", headers=auth_headers)  # Served by the replica
+
+    status = client.get("/api/admin/db-pool", headers={"Authorization": "Bearer s3cret"}).json()
+    assert status["engine"] == "primary" and status["checkout_wait"]["count"] > 0
+    assert [(r["engine"], r["checked_out"]) for r in status["replicas"]] == [("replica", 0)]
+
+    metrics = client.get("/metrics").text
+    assert 'db_pool_checked_out{engine="primary"}' in metrics
+    assert 'db_pool_checked_out{engine="replica"} 0' in metrics
+    assert 'db_pool_checkout_seconds_count{engine="primary"}' in metrics
@@ -0,0 +1,66 @@
+"""Startup schema check and import-cost tests"""
+
+import ast
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database.schema import SCHEMA_REVISION, database_revision, prepare_schema
+
+VERSIONS_DIR = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+def _migration_head() -> str:
+    revisions, parents = set(), set()
+    for path in VERSIONS_DIR.glob("*.py"):
+        for node in ast.parse(path.read_text()).body:
+            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+                if node.targets[0].id == "revision":
+                    revisions.add(node.value.value)
+                elif node.targets[0].id == "down_revision" and node.value.value:
+                    parents.add(node.value.value)
+    (head,) = revisions - parents
+    return head
+
+def test_schema_revision_is_the_migration_head():
+    assert SCHEMA_REVISION == _migration_head()
+
+@pytest.mark.asyncio
+async def test_prepare_schema_modes(tmp_path, caplog):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+
+    # An unmigrated database is reported, not created
+    assert await prepare_schema(engine, "revision") is None
+    assert "no revision" in caplog.text
+    await prepare_schema(engine, "off")
+    async with engine.connect() as conn:
+        assert await conn.run_sync(lambda sync: inspect(sync).get_table_names()) == []
+
+    await prepare_schema(engine, "create")
+    async with engine.connect() as conn:
+        assert "users" in await conn.run_sync(lambda sync: inspect(sync).get_table_names())
+
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        await conn.execute(text("INSERT INTO alembic_version VALUES (:v)"), {"v": SCHEMA_REVISION})
+    caplog.clear()
+    assert await prepare_schema(engine, "revision") == SCHEMA_REVISION
+    assert await database_revision(engine) == SCHEMA_REVISION
+    assert caplog.text == ""
+
+    with pytest.raises(ValueError):
+        await prepare_schema(engine, "migrate")
+    await engine.dispose()
+
+def test_app_import_leaves_password_and_jwt_libraries_unloaded():
+    script = "import sys, app.main; print(sorted({'passlib', 'jose'} & set(sys.modules)))"
+    env = dict(os.environ, DATABASE_URL="sqlite+aiosqlite:///./test.db", VECTOR_STORE_DIR="")
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip().splitlines()[-1] == "[]"
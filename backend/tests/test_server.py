@@ -0,0 +1,64 @@
+"""Production server configuration tests"""
+
+import pytest
+
+from app import server
+from app.config import settings
+
+def test_worker_count_defaults_to_available_cpus(monkeypatch):
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 0)
+    monkeypatch.setattr(server, "available_cpus", lambda: 6)
+    assert server.worker_count() == 6
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 2)
+    assert server.worker_count() == 2
+
+def test_cgroup_quota_caps_cpus(monkeypatch):
+    monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    monkeypatch.setattr(server, "_cgroup_cpu_limit", lambda: 3)
+    assert server.available_cpus() == 3
+    monkeypatch.setattr(server, "_cgroup_cpu_limit", lambda: None)
+    assert server.available_cpus() == 8
+
+def test_config_uses_fast_loop_and_parser_with_graceful_shutdown(monkeypatch):
+    monkeypatch.setattr(settings, "SHUTDOWN_GRACE_SECONDS", 12.0)
+    config = server.build_config("127.0.0.1", 8000, 4)
+    assert (config.workers, config.timeout_graceful_shutdown, config.access_log) == (4, 12.0, False)
+    assert config.loop == server.LOOP and config.http == server.HTTP
+
+def test_shutdown_signal_starts_draining_streams(monkeypatch):
+    import signal
+    import time
+
+    from app.lifecycle import STREAM_DRAIN_MARGIN_SECONDS, stream_drain
+
+    monkeypatch.setattr(settings, "SHUTDOWN_GRACE_SECONDS", 10.0)
+    draining = server.DrainingServer(server.build_config("127.0.0.1", 8000, 1))
+    try:
+        before = time.monotonic()
+        draining.handle_exit(signal.SIGTERM, None)
+        assert draining.should_exit
+        assert before + 10.0 - STREAM_DRAIN_MARGIN_SECONDS <= stream_drain.deadline <= time.monotonic() + 9.0
+        assert not stream_drain.expired
+    finally:
+        stream_drain.reset()
+
+@pytest.mark.asyncio
+async def test_each_worker_exports_metrics_on_its_own_port(unused_tcp_port):
+    import httpx
+
+    from metrics.exporter import MetricsServer
+
+    workers = [MetricsServer(), MetricsServer(), MetricsServer()]
+    try:
+        ports = [await worker.start("127.0.0.1", unused_tcp_port, 2) for worker in workers]
+        assert ports == [unused_tcp_port, unused_tcp_port + 1, None]  # The third has no free port
+
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"http://127.0.0.1:{unused_tcp_port + 1}/metrics")
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+            assert "# TYPE http_requests_total counter" in response.text
+            assert (await client.get(f"http://127.0.0.1:{unused_tcp_port}/")).status_code == 404
+    finally:
+        for worker in workers:
+            await worker.stop()
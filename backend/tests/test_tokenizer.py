@@ -0,0 +1,87 @@
+"""Tokenizer and token count backfill tests"""
+
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from database import Conversation, Message, SessionLocal, User
+from database.backfill_tokens import backfill_token_counts
+from database.messages import add_messages
+from llm import tokenizer
+
+class WordEncoding:
+    """Stand-in tiktoken encoding: one token per whitespace-separated word"""
+
+    def encode_ordinary(self, text):
+        return text.split()
+
+    def encode_ordinary_batch(self, texts, num_threads=1):
+        return [self.encode_ordinary(text) for text in texts]
+
+@pytest.fixture
+def word_encoding(monkeypatch):
+    loaded = []
+
+    def fake_encoding(name):
+        loaded.append(name)
+        return WordEncoding()
+
+    monkeypatch.setattr(tokenizer, "_encoding", fake_encoding)
+    return loaded
+
+def test_openai_models_use_their_encoding(word_encoding):
+    assert tokenizer.count_tokens("one two three", "gpt-4") == 3
+    assert tokenizer.count_tokens_batch(["a b", "c"], "gpt-4o-mini") == [2, 1]
+    assert word_encoding == ["cl100k_base", "o200k_base"]
+
+def test_other_families_are_estimated(word_encoding):
+    assert tokenizer.count_tokens("x" * 35, "claude-3-haiku") == 10
+    assert tokenizer.count_tokens("x" * 40, "llama-3") == 10
+    assert tokenizer.count_tokens("", "claude-3-haiku") == 0
+    assert word_encoding == []
+
+def test_missing_tiktoken_falls_back_to_estimate(monkeypatch):
+    monkeypatch.setattr(tokenizer, "_encoding", lambda name: None)
+    assert tokenizer.count_tokens("x" * 40, "gpt-4") == 10
+
+@pytest.mark.asyncio
+async def test_prewarm_loads_configured_encodings_off_the_event_loop(monkeypatch):
+    import threading
+
+    from app.config import settings
+    from app.lifecycle import prewarm
+
+    threads = []
+
+    def fake_encoding(name):
+        threads.append((name, threading.current_thread()))
+        return WordEncoding()
+
+    monkeypatch.setattr(tokenizer, "_encoding", fake_encoding)
+    monkeypatch.setattr(settings, "TOKENIZER_PREWARM_MODELS", ["gpt-4", "gpt-4-turbo", "claude-3-haiku"])
+    monkeypatch.setattr(settings, "LLM_FALLBACK_MODELS", {"claude-3-haiku": "gpt-4o-mini"})
+    await prewarm(0)
+    assert [name for name, _ in threads] == ["cl100k_base", "o200k_base"]
+    assert all(thread is not threading.main_thread() for _, thread in threads)
+
+@pytest.mark.asyncio
+async def test_backfill_fills_counts_and_conversation_totals(reset_db, word_encoding):
+    async with SessionLocal() as db:
+        user = User(id=uuid4(), email="backfill@example.com", username="backfill", password_hash="x")
+        conversation = Conversation(id=uuid4(), user_id=user.id, model_used="gpt-4")
+        db.add_all([user, conversation])
+        await add_messages(db, conversation.id, [("user", f"word " * (i + 1), 0) for i in range(7)])
+        await add_messages(db, conversation.id, [("assistant", "already counted", 5)])
+        await db.commit()
+
+    assert await backfill_token_counts(batch_size=3) == 7
+
+    async with SessionLocal() as db:
+        counts = sorted((await db.scalars(select(Message.token_count))).all())
+        total = await db.scalar(select(Conversation.token_count))
+    assert counts == [1, 2, 3, 4, 5, 5, 6, 7]
+    assert total == sum(counts)
+
+    # Nothing left to do on a second run
+    assert await backfill_token_counts(batch_size=3) == 0